@@ -1,8 +1,14 @@
 # Gerekli kütüphaneleri import et
-from flask import Flask, jsonify, abort, request
+from flask import Flask, jsonify, abort, request, g
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
+import atexit
+import hmac
+import logging
+from contextlib import contextmanager
 import os
 import sys
+import numpy as np
 import pandas as pd
 import requests # Hem TMDB hem model indirme için
 import time # API rate limiting için eklenebilir
@@ -13,6 +19,12 @@ from dotenv import load_dotenv # .env dosyasını yüklemek için
 # Ortam değişkenlerini .env dosyasından yükle
 load_dotenv()
 
+# Loglama: seviye LOG_LEVEL ile seçilir (DEBUG, INFO, WARNING, ERROR). İstek başına ayrıntılar DEBUG seviyesindedir.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format='%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s')
+logger = logging.getLogger(__name__)
+
 # Model sınıfımızı import etmek için path ayarlaması
 try:
     from models.collaborative_filter import CollaborativeFilteringModel
@@ -24,13 +36,47 @@ except ModuleNotFoundError:
     try:
          from backend.models.collaborative_filter import CollaborativeFilteringModel
     except ModuleNotFoundError:
-         print("HATA: CollaborativeFilteringModel import edilemedi!")
+         logger.error("CollaborativeFilteringModel import edilemedi!")
          CollaborativeFilteringModel = None
 
+# models/ ve utils/ altındaki yardımcı modüller için backend klasörünü path'e ekle
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+from utils.memstat import process_memory
+from utils.movie_catalog import MovieCatalog
+from utils.search_index import TitleSearchIndex
+from utils.metadata_cache import (MetadataCache, MetadataStore, DEFAULT_MAX_ENTRIES, DEFAULT_TTL, DEFAULT_NEGATIVE_TTL,
+                                  DEFAULT_ERROR_TTL)
+from utils.tmdb_client import TMDBClient
+from utils.user_store import UserProfileStore, valid_handle
+from utils.result_cache import ResultCache, profile_key
+from utils.model_reloader import ModelReloader
+from utils.fold_in_journal import FoldInJournal, FoldInCompactor, apply_journal, user_event, item_event
+from utils.metrics import MetricsRegistry
+
 # --- Model Yükleme (URL'den İndirme ile) ---
 MODEL_FILENAME = "cf_svd_model_data_k20_v2.joblib"
 MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
 MODEL_PATH = os.path.join(MODELS_DIR, MODEL_FILENAME)
+# Bellek eşlemeli (mmap) model klasörü varsa joblib yerine o kullanılır; worker'lar milisaniyeler
+# içinde başlar ve dizileri sayfa önbelleği üzerinden paylaşır.
+# Dönüştürmek için: python models/artifact.py models/cf_svd_model_data_k20_v2.joblib models/cf_svd_model_data_k20_v2
+MODEL_DIR_PATH = os.getenv("MODEL_DIR_PATH") or os.path.join(MODELS_DIR, os.path.splitext(MODEL_FILENAME)[0])
+
+# Yeni kullanıcı komşu araması için indeks türü ('exact' veya 'ivf'); boşsa model dosyasındaki kullanılır
+NEIGHBOR_INDEX_KIND = os.getenv("NEIGHBOR_INDEX_KIND") or None
+# Fold-in: bu kadar bekleyen kullanıcı/film olunca arka planda compaction yapılır (yeni artifact yazılır ve
+# yeniden yüklenir); 0 = sadece POST /api/admin/fold-in/compact veya python utils/fold_in_journal.py compact ile
+FOLD_IN_COMPACT_THRESHOLD = int(os.getenv("FOLD_IN_COMPACT_THRESHOLD", "1000"))
+# Fold-in kayıtlarının günlüğü (SQLite, WAL): worker'lar paylaşır, yeniden başlatma ve model yeniden yüklemede
+# korunur. Devre dışı bırakmak için FOLD_IN_JOURNAL_PATH="" (bu durumda ?user_id= fold-in kapalıdır).
+FOLD_IN_JOURNAL_PATH = os.getenv("FOLD_IN_JOURNAL_PATH", os.path.join(BACKEND_DIR, "data", "fold_in_journal.sqlite3")) or None
+# Öneri endpoint'lerinde günlüğe en fazla bu sıklıkla bakılır (sn); aradaki istekler worker'daki tamponu kullanır
+FOLD_IN_SYNC_INTERVAL = float(os.getenv("FOLD_IN_SYNC_INTERVAL", "0.5"))
+# Model dosyası/klasörü bu aralıkla (sn) kontrol edilir; değişirse her worker yeni modeli arka planda yükler.
+# 0 = izleme kapalı (yeniden yükleme sadece POST /api/admin/model/reload ile)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
 
 # İndirme için Model URL'si - BUNU YENİ URL İLE DEĞİŞTİR!
 MODEL_DOWNLOAD_URL = "https://aliqo-movie-rec-model.s3.eu-north-1.amazonaws.com/cf_svd_model_data_k20_v2.joblib" # Placeholder URL - Güncellenecek
@@ -40,7 +86,7 @@ def download_model_from_url(url, local_path):
     # Modelin kaydedileceği klasörün var olduğundan emin ol
     os.makedirs(os.path.dirname(local_path), exist_ok=True)
     
-    print(f"URL'den model indirme deneniyor: {url} -> {local_path}")
+    logger.info("URL'den model indirme deneniyor: %s -> %s", url, local_path)
     try:
         response = requests.get(url, stream=True, timeout=300) # stream=True büyük dosyalar için, timeout artırıldı
         response.raise_for_status() # HTTP hatalarını kontrol et (4xx, 5xx)
@@ -57,10 +103,10 @@ def download_model_from_url(url, local_path):
                 # done = int(50 * downloaded_size / total_size)
                 # sys.stdout.write(f"\r[{'=' * done}{' ' * (50-done)}] {downloaded_size/1024/1024:.2f} MB / {total_size/1024/1024:.2f} MB")
                 # sys.stdout.flush()
-        print("\nModel başarıyla URL'den indirildi.")
+        logger.info("Model başarıyla URL'den indirildi.")
         return True
     except requests.exceptions.RequestException as e:
-        print(f"HATA: Model URL'sine bağlanırken veya indirirken hata oluştu: {e}")
+        logger.error("Model URL'sine bağlanırken veya indirirken hata oluştu: %s", e)
         # İndirme başarısız olursa yarım kalan dosyayı silmek iyi olabilir
         if os.path.exists(local_path):
             try:
@@ -69,7 +115,7 @@ def download_model_from_url(url, local_path):
                 pass
         return False
     except Exception as e:
-        print(f"HATA: Model indirme sırasında beklenmedik bir hata: {e}")
+        logger.exception("Model indirme sırasında beklenmedik bir hata: %s", e)
         if os.path.exists(local_path):
             try:
                 os.remove(local_path)
@@ -80,33 +126,39 @@ def download_model_from_url(url, local_path):
 # Uygulama başlangıcında modeli kontrol et ve gerekirse indir
 recommendation_model = None # Başlangıçta None olarak ayarla
 
-if not os.path.exists(MODEL_PATH):
-    print(f"Model dosyası yerelde bulunamadı: {MODEL_PATH}")
+if os.path.isdir(MODEL_DIR_PATH) and CollaborativeFilteringModel:
+    logger.info("Model klasörü bulundu (mmap ile yüklenecek): %s", MODEL_DIR_PATH)
+    recommendation_model = CollaborativeFilteringModel.load_model(MODEL_DIR_PATH, neighbor_index_kind=NEIGHBOR_INDEX_KIND)
+    if recommendation_model is None:
+        logger.warning("Model klasörü yüklenemedi! joblib dosyası denenecek.")
+
+if recommendation_model is None and not os.path.exists(MODEL_PATH):
+    logger.info("Model dosyası yerelde bulunamadı: %s", MODEL_PATH)
     if not MODEL_DOWNLOAD_URL:
-        print("UYARI: MODEL_DOWNLOAD_URL ayarlanmamış. Model indirilemiyor.")
+        logger.warning("MODEL_DOWNLOAD_URL ayarlanmamış. Model indirilemiyor.")
     else:
         download_successful = download_model_from_url(MODEL_DOWNLOAD_URL, MODEL_PATH)
         if not download_successful:
-            print("UYARI: Model URL'den indirilemedi. Öneri sistemi çalışmayabilir.")
+            logger.warning("Model URL'den indirilemedi. Öneri sistemi çalışmayabilir.")
         else:
             # İndirme başarılıysa modeli yükle
             if CollaborativeFilteringModel:
-                print(f"İndirilen model yükleniyor: {MODEL_PATH}")
-                recommendation_model = CollaborativeFilteringModel.load_model(MODEL_PATH)
+                logger.info("İndirilen model yükleniyor: %s", MODEL_PATH)
+                recommendation_model = CollaborativeFilteringModel.load_model(MODEL_PATH, neighbor_index_kind=NEIGHBOR_INDEX_KIND)
                 if recommendation_model is None:
-                    print("UYARI: İndirilen model yüklenemedi!")
+                    logger.warning("İndirilen model yüklenemedi!")
             else:
-                 print("UYARI: Model sınıfı yüklenemedi!")
-else:
+                 logger.warning("Model sınıfı yüklenemedi!")
+elif recommendation_model is None:
     # Model zaten yerelde varsa doğrudan yükle
-    print(f"Model dosyası yerelde bulundu: {MODEL_PATH}")
+    logger.info("Model dosyası yerelde bulundu: %s", MODEL_PATH)
     if CollaborativeFilteringModel:
-        print(f"Mevcut model yükleniyor: {MODEL_PATH}")
-        recommendation_model = CollaborativeFilteringModel.load_model(MODEL_PATH)
+        logger.info("Mevcut model yükleniyor: %s", MODEL_PATH)
+        recommendation_model = CollaborativeFilteringModel.load_model(MODEL_PATH, neighbor_index_kind=NEIGHBOR_INDEX_KIND)
         if recommendation_model is None:
-            print("UYARI: Mevcut model yüklenemedi!")
+            logger.warning("Mevcut model yüklenemedi!")
     else:
-         print("UYARI: Model sınıfı yüklenemedi!")
+         logger.warning("Model sınıfı yüklenemedi!")
 
 # --- Film Verisini Yükleme ---
 MOVIES_FILENAME = "movies.csv"
@@ -114,30 +166,146 @@ MOVIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", M
 LINKS_FILENAME = "links.csv" # links.csv eklendi
 LINKS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", LINKS_FILENAME) # links.csv yolu
 
-movies_df = None
-links_df = None
-movie_id_to_tmdb_id = None # Eşleşme sözlüğü
+# Film kataloğu: movieId, başlık, türler, tmdbId ve model index'i hizalı dizilerde (O(1)/O(log n) arama)
+movie_catalog = None
+title_search_index = None # /api/movies araması için başlık trigram indeksi
 
 try:
-    print(f"Film verisi yükleniyor: {MOVIES_PATH}")
-    movies_df = pd.read_csv(MOVIES_PATH)
-    print(f"Film verisi başarıyla yüklendi. Toplam {len(movies_df)} film.")
-
-    print(f"Link verisi yükleniyor: {LINKS_PATH}")
-    links_df = pd.read_csv(LINKS_PATH)
-    links_df = links_df.dropna(subset=['tmdbId'])
-    links_df['tmdbId'] = links_df['tmdbId'].astype(int)
-    movie_id_to_tmdb_id = links_df.set_index('movieId')['tmdbId'].to_dict()
-    print("Link verisi başarıyla yüklendi ve movieId->tmdbId haritası oluşturuldu.")
+    logger.info("Film ve link verisi yükleniyor: %s, %s", MOVIES_PATH, LINKS_PATH)
+    movie_catalog = MovieCatalog.from_csv(MOVIES_PATH, LINKS_PATH)
+    logger.info("Film kataloğu başarıyla yüklendi. Toplam %d film (link verisi: %s).",
+                len(movie_catalog), 'var' if movie_catalog.has_links else 'yok')
+    title_search_index = TitleSearchIndex(movie_catalog.titles.tolist())
+    logger.info("Başlık arama indeksi oluşturuldu (%.1f MB).", title_search_index.nbytes / 1024**2)
 
 except FileNotFoundError as e:
-    print(f"UYARI: Veri dosyası bulunamadı: {e}. İlgili endpoint'ler çalışmayacak.")
-    if 'movies.csv' in str(e): movies_df = None
-    if 'links.csv' in str(e): movie_id_to_tmdb_id = None
+    logger.warning("Veri dosyası bulunamadı: %s. İlgili endpoint'ler çalışmayacak.", e)
+    movie_catalog = None
 except Exception as e:
-    print(f"UYARI: Veri yüklenirken hata oluştu: {e}. İlgili endpoint'ler çalışmayacak.")
-    movies_df = None
-    movie_id_to_tmdb_id = None
+    logger.exception("Veri yüklenirken hata oluştu: %s. İlgili endpoint'ler çalışmayacak.", e)
+    movie_catalog = None
+# --------------------------
+
+# --- Metrikler (/metrics) ---
+# Her worker kendi sayaç/histogramlarını tutar ve METRICS_DIR'e en fazla METRICS_FLUSH_INTERVAL saniyede bir
+# yazar; /metrics hangi worker'a düşerse düşsün dizindeki tüm worker dosyalarını toplar (gunicorn.conf.py
+# dizini master başına ayarlar). METRICS_DIR boşsa sadece isteği karşılayan worker raporlanır.
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+metrics = MetricsRegistry(directory=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL)
+metrics.histogram('http_request_duration_seconds', "İsteğin toplam işlenme süresi (endpoint, method, status).")
+metrics.histogram('recommendation_stage_seconds', "Öneri aşamalarının süresi (ID çevirisi, komşu araması, toplama, "
+                                                  "başlık/katalog birleştirme, TMDB zenginleştirme).")
+metrics.counter('cache_hits_total', "Cache isabetleri (recommendation, tmdb, user_vector).")
+metrics.counter('cache_misses_total', "Cache kaçırmaları (recommendation, tmdb, user_vector).")
+metrics.counter('tmdb_requests_total', "TMDB API'ye gönderilen istekler.")
+metrics.counter('tmdb_failures_total', "Başarısız veya süre sınırına yetişmeyen TMDB istekleri (reason).")
+atexit.register(metrics.flush)
+
+def observe_stage(stage, seconds):
+    metrics.observe('recommendation_stage_seconds', seconds, stage=stage)
+
+@contextmanager
+def stage_timer(stage):
+    """with stage_timer('aşama'): ... bloğunun süresini recommendation_stage_seconds'a ekler."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+# --------------------------
+
+# --- Fold-in Günlüğü ---
+fold_in_journal = None
+if FOLD_IN_JOURNAL_PATH:
+    try:
+        fold_in_journal = FoldInJournal(FOLD_IN_JOURNAL_PATH)
+    except Exception as e:
+        logger.warning("Fold-in günlüğü açılamadı (%s): %s", FOLD_IN_JOURNAL_PATH, e)
+# --------------------------
+
+# --- Model Hazırlama ve Yeniden Yükleme ---
+def prepare_model(model):
+    """
+    Yüklenen modeli servis için hazırlar: fold-in eşiği, günlükte artifact'ten sonra eklenmiş fold-in'ler, katalogdan
+    başlıklar ve tür maskeleri. Sadece verilen modeli değiştirir (katalog gibi paylaşılan durum değişmez); yeniden
+    yüklemede doğrulamadan önce aday modele uygulanır.
+    """
+    model.fold_ins.compact_threshold = FOLD_IN_COMPACT_THRESHOLD
+    if fold_in_journal is not None:
+        apply_journal(model, fold_in_journal)
+    if movie_catalog is not None:
+        # Model başlıkları ve tür maskeleri katalogdan gelir (movieId -> item index: model.movie_map)
+        model.set_item_titles(movie_catalog.titles_for(model.movie_ids))
+        model.set_item_genres(movie_catalog.genre_masks_for(model.movie_ids), movie_catalog.genre_vocabulary)
+    return model
+
+def current_model_path():
+    """Yeniden yüklemede kullanılacak artifact: mmap model klasörü varsa o, yoksa joblib dosyası."""
+    return MODEL_DIR_PATH if os.path.isdir(MODEL_DIR_PATH) else MODEL_PATH
+
+def load_model_for_reload(path):
+    if CollaborativeFilteringModel is None:
+        raise RuntimeError("Model sınıfı yüklenemedi.")
+    return CollaborativeFilteringModel.load_model(path, neighbor_index_kind=NEIGHBOR_INDEX_KIND)
+
+def smoke_test_model(model):
+    """Yeni modeli trafiğe almadan önce doğrular: vektörler sonlu, predict ve predict_for_new_user sonuç üretiyor."""
+    if model.user_vectors.shape[1] != model.item_vectors.shape[1]:
+        raise ValueError("Kullanıcı ve film vektörlerinin boyutları farklı.")
+    if not (np.isfinite(model.user_vectors[:1000]).all() and np.isfinite(model.item_vectors[:1000]).all()):
+        raise ValueError("Model vektörlerinde sonlu olmayan değerler var.")
+    prepare_model(model)
+    if not model.predict(int(model.user_ids[0]), n_recommendations=5):
+        raise ValueError("Smoke sorgusu (predict) boş sonuç döndürdü.")
+    counts = np.bincount(model.rating_store.movie_idx, minlength=len(model.movie_ids))
+    popular = model.movie_ids[np.argsort(counts)[-5:]] # En çok puanlanan 5 film
+    if not model.predict_for_new_user({int(movie_id): 5.0 for movie_id in popular}, n_recommendations=5):
+        raise ValueError("Smoke sorgusu (predict_for_new_user) boş sonuç döndürdü.")
+
+def swap_model(model):
+    """
+    Doğrulanmış modeli devreye alır: aşama metriklerini bağlar (smoke sorguları metriklere yazılmaz) ve global
+    referansı tek atamayla değiştirir; devam eden istekler g.model üzerinden eski modeli kullanır.
+    """
+    global recommendation_model
+    model.stage_observer = observe_stage
+    recommendation_model = model
+
+if recommendation_model is not None:
+    swap_model(prepare_model(recommendation_model))
+model_reloader = ModelReloader(load_model_for_reload, smoke_test_model, swap_model, current_model_path,
+                               poll_interval=MODEL_WATCH_INTERVAL)
+fold_in_compactor = None
+if fold_in_journal is not None:
+    fold_in_compactor = FoldInCompactor(fold_in_journal, load_model_for_reload,
+                                        lambda path: model_reloader.reload(path, wait=True, reason='fold-in'),
+                                        current_model_path)
+
+last_fold_in_sync = 0.0 # Süreç başına son günlük kontrolü (time.monotonic)
+
+def sync_fold_ins(model, force=False):
+    """
+    Diğer worker'ların günlüğe yazdığı fold-in'leri modele uygular; bekleyen kayıtlar eşiğe ulaştıysa arka planda
+    compaction başlatır (istek beklemez). Sadece modelle skorlama yapan endpoint'lerden çağrılır ve
+    FOLD_IN_SYNC_INTERVAL'dan sık çalışmaz (force=True hariç); önce ucuz MAX(seq) sorgusuyla yeni kayıt olup
+    olmadığına bakılır. Günlük okunamazsa model mevcut haliyle kullanılmaya devam eder.
+    """
+    global last_fold_in_sync
+    if fold_in_journal is None or model is None:
+        return
+    now = time.monotonic()
+    if not force and now - last_fold_in_sync < FOLD_IN_SYNC_INTERVAL:
+        return
+    last_fold_in_sync = now
+    try:
+        if fold_in_journal.last_seq() > model.fold_ins.applied_seq:
+            apply_journal(model, fold_in_journal)
+    except Exception as e:
+        logger.warning("Fold-in günlüğü okunamadı: %s", e)
+        return
+    if model.fold_ins.needs_compaction():
+        fold_in_compactor.start(model.model_version, threshold=FOLD_IN_COMPACT_THRESHOLD, reason='threshold')
 # --------------------------
 
 # --- TMDB API Ayarları ---
@@ -146,12 +314,98 @@ TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 
 # API anahtarı yoksa uyarı ver (veya programı durdur)
 if not TMDB_API_KEY:
-    print("UYARI: TMDB_API_KEY ortam değişkeni bulunamadı! .env dosyasını kontrol edin.")
+    logger.warning("TMDB_API_KEY ortam değişkeni bulunamadı! .env dosyasını kontrol edin.")
     # İsteğe bağlı: Anahtar olmadan devam etmek istemiyorsanız burada çıkabilirsiniz
     # sys.exit("TMDB API Anahtarı gerekli.") 
 
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+# Yerel stub sunucu ile test için değiştirilebilir (bkz. utils/tmdb_stub_server.py)
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
 TMDB_POSTER_BASE_URL = "https://image.tmdb.org/t/p/w500" # Afişler için temel URL (w500 boyutu)
+# Poster zenginleştirme: aynı anda en fazla kaç TMDB isteği ve istek başına toplam süre sınırı (sn)
+TMDB_MAX_CONCURRENCY = int(os.getenv("TMDB_MAX_CONCURRENCY", "16"))
+TMDB_ENRICH_DEADLINE = float(os.getenv("TMDB_ENRICH_DEADLINE", "1.5"))
+
+# TMDB metadata cache'i (poster, özet, puan, çıkış tarihi). Kalıcı SQLite dosyası worker'lar
+# arasında paylaşılır ve yeniden başlatmada korunur; devre dışı bırakmak için TMDB_CACHE_PATH="".
+TMDB_CACHE_PATH = os.getenv("TMDB_CACHE_PATH", os.path.join(BACKEND_DIR, "data", "tmdb_cache.sqlite3")) or None
+TMDB_CACHE_MAX_ENTRIES = int(os.getenv("TMDB_CACHE_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES)))
+TMDB_CACHE_TTL = float(os.getenv("TMDB_CACHE_TTL", str(DEFAULT_TTL)))
+TMDB_CACHE_NEGATIVE_TTL = float(os.getenv("TMDB_CACHE_NEGATIVE_TTL", str(DEFAULT_NEGATIVE_TTL))) # Sadece TMDB 404
+# Geçici TMDB hataları (zaman aşımı, 429, 5xx) sadece worker belleğinde bu kadar saniye tutulur; 0 = hiç tutulmaz
+TMDB_CACHE_ERROR_TTL = float(os.getenv("TMDB_CACHE_ERROR_TTL", str(DEFAULT_ERROR_TTL)))
+
+# Önceden çekilmiş metadata deposu (python utils/prefetch_tmdb.py ile oluşturulur). Depodaki
+# filmler için istek sırasında TMDB'ye gidilmez.
+TMDB_METADATA_STORE = os.getenv("TMDB_METADATA_STORE") or os.path.join(BACKEND_DIR, "data", "tmdb_metadata.sqlite3")
+tmdb_metadata_store = None
+if os.path.exists(TMDB_METADATA_STORE):
+    try:
+        tmdb_metadata_store = MetadataStore(TMDB_METADATA_STORE)
+        logger.info("TMDB metadata deposu yüklendi: %s (%d film)", TMDB_METADATA_STORE, len(tmdb_metadata_store))
+    except Exception as e:
+        logger.warning("TMDB metadata deposu açılamadı (%s): %s", TMDB_METADATA_STORE, e)
+else:
+    logger.info("TMDB metadata deposu bulunamadı (%s); posterler istek sırasında çekilecek.", TMDB_METADATA_STORE)
+
+tmdb_metadata_cache = MetadataCache(max_entries=TMDB_CACHE_MAX_ENTRIES, ttl=TMDB_CACHE_TTL,
+                                    negative_ttl=TMDB_CACHE_NEGATIVE_TTL, db_path=TMDB_CACHE_PATH,
+                                    store=tmdb_metadata_store, error_ttl=TMDB_CACHE_ERROR_TTL)
+tmdb_client = TMDBClient(TMDB_API_KEY, base_url=TMDB_BASE_URL, poster_base_url=TMDB_POSTER_BASE_URL,
+                         max_workers=TMDB_MAX_CONCURRENCY, cache=tmdb_metadata_cache)
+# -----------------------
+
+# --- Öneri Sonuç Cache'i ---
+# predict_for_new_user sonuçları (worker başına LRU). Anahtar: doğrulanmış {movieId: puan} profili, k_neighbors,
+# rating_threshold, n_recommendations ve model sürümü. 0 = devre dışı.
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000"))
+recommendation_cache = ResultCache(max_entries=RECOMMENDATION_CACHE_SIZE)
+# -----------------------
+
+# --- Kullanıcı Profil Deposu ---
+# Puanlar, favoriler ve önbelleğe alınmış kullanıcı vektörleri (SQLite, WAL; worker'lar paylaşır).
+# data/user_data altındaki JSON dosyaları ilk açılışta bir kez aktarılır. Devre dışı bırakmak için USER_STORE_PATH="".
+USER_STORE_PATH = os.getenv("USER_STORE_PATH", os.path.join(BACKEND_DIR, "data", "user_profiles.sqlite3")) or None
+USER_DATA_DIR = os.path.join(BACKEND_DIR, "data", "user_data")
+user_store = None
+if USER_STORE_PATH:
+    try:
+        user_store = UserProfileStore(USER_STORE_PATH)
+        imported = user_store.import_user_data_dir(USER_DATA_DIR, once=True)
+        if imported:
+            logger.info("%d kullanıcı dosyası profil deposuna aktarıldı: %s", imported, USER_STORE_PATH)
+    except Exception as e:
+        logger.warning("Kullanıcı profil deposu açılamadı (%s): %s", USER_STORE_PATH, e)
+        user_store = None
+# -----------------------
+
+# Bileşenlerin kendi tuttuğu sayaçlar snapshot sırasında metrik kaydına aktarılır
+def component_counters():
+    tmdb_cache = tmdb_metadata_cache.stats
+    counters = [
+        ('cache_hits_total', {'cache': 'recommendation'}, recommendation_cache.stats['hits']),
+        ('cache_misses_total', {'cache': 'recommendation'}, recommendation_cache.stats['misses']),
+        ('cache_hits_total', {'cache': 'tmdb'}, tmdb_cache['hits'] + tmdb_cache['negative_hits']
+                                                + tmdb_cache['store_hits'] + tmdb_cache['disk_hits']),
+        ('cache_misses_total', {'cache': 'tmdb'}, tmdb_cache['misses']),
+        ('tmdb_requests_total', {}, tmdb_client.stats['requests']),
+        ('tmdb_failures_total', {'reason': 'request_error'}, tmdb_client.stats['request_errors']),
+        ('tmdb_failures_total', {'reason': 'invalid_response'}, tmdb_client.stats['invalid_responses']),
+        ('tmdb_failures_total', {'reason': 'deadline'}, tmdb_client.stats['deadline_misses']),
+    ]
+    if user_store is not None:
+        counters += [('cache_hits_total', {'cache': 'user_vector'}, user_store.stats['vector_hits']),
+                     ('cache_misses_total', {'cache': 'user_vector'},
+                      user_store.stats['vector_incremental'] + user_store.stats['vector_recomputed'])]
+    return counters
+
+metrics.add_collector(component_counters)
+
+# --- Yönetim Erişimi ---
+# /api/admin/* endpoint'leri (model yeniden yükleme, compaction, istatistikler) sadece
+# "Authorization: Bearer <ADMIN_TOKEN>" başlığıyla çağrılabilir. ADMIN_TOKEN ayarlanmamışsa bu endpoint'ler kapalıdır.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+if not ADMIN_TOKEN:
+    logger.info("ADMIN_TOKEN ayarlanmamış; /api/admin/* endpoint'leri kapalı.")
 # -----------------------
 
 # Flask uygulamasını başlat
@@ -160,92 +414,322 @@ app = Flask(__name__)
 # Frontend'den gelen isteklere izin vermek için CORS'u yapılandır
 # origins="*" tüm kaynaklardan gelen isteklere izin verir,
 # geliştirme aşamasında kullanışlıdır ancak production'da kısıtlanmalıdır.
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+CORS(app, resources={r"/api/*": {"origins": "*"}}, expose_headers=["X-Model-Version"])
+
+@app.before_request
+def bind_model():
+    """
+    İsteği işleyecek modeli bir kez alır (g.model). Model yeniden yüklenirken devam eden istekler
+    eski modelle tamamlanır; bir istek içinde iki farklı model sürümü karışmaz.
+    """
+    g.request_started = time.perf_counter()
+    model_reloader.ensure_watcher()
+    g.model = recommendation_model
+
+def has_admin_token():
+    """İstek geçerli yönetim anahtarını (Authorization: Bearer <ADMIN_TOKEN>) taşıyor mu?"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return bool(ADMIN_TOKEN) and scheme.lower() == 'bearer' and hmac.compare_digest(token.strip(), ADMIN_TOKEN)
+
+def require_admin():
+    """Yönetim anahtarı yoksa veya yanlışsa isteği sonlandırır (ADMIN_TOKEN ayarlanmamışsa 403, aksi halde 401)."""
+    if not ADMIN_TOKEN:
+        abort(403, description="Yönetim endpoint'leri kapalı (ADMIN_TOKEN ayarlanmamış).")
+    if not has_admin_token():
+        abort(401, description="Geçerli bir yönetim anahtarı gerekli (Authorization: Bearer <ADMIN_TOKEN>).")
+
+@app.before_request
+def check_admin_access():
+    """/api/admin/* istekleri yönetim anahtarı ister (CORS ön kontrol istekleri hariç)."""
+    if request.path.startswith('/api/admin/') and request.method != 'OPTIONS':
+        require_admin()
+
+@app.after_request
+def add_model_version_header(response):
+    """Yanıtı üreten model sürümü X-Model-Version başlığında döner."""
+    model = g.get('model')
+    if model is not None and model.model_version:
+        response.headers['X-Model-Version'] = model.model_version
+    return response
+
+@app.after_request
+def record_request_metrics(response):
+    """İsteğin toplam süresini kaydeder; worker'ın metrik dosyası en fazla METRICS_FLUSH_INTERVAL'de bir yazılır."""
+    started = g.get('request_started')
+    if started is not None:
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started,
+                        endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+                        method=request.method, status=str(response.status_code))
+    metrics.maybe_flush()
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Tüm worker'ların sayaç ve histogramları (Prometheus metin formatı)."""
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 # Ana route (Test amaçlı güncellendi)
 @app.route('/')
 def index():
     return jsonify({"message": "Backend sunucusu çalışıyor! Model yüklendi mi: "
-                   + ("Evet" if recommendation_model else "Hayır")
-                   + ", Film verisi yüklendi mi: " + ("Evet" if movies_df is not None else "Hayır")
-                   + ", Link verisi yüklendi mi: " + ("Evet" if movie_id_to_tmdb_id is not None else "Hayır")
+                   + ("Evet" if g.model else "Hayır")
+                   + ", Film verisi yüklendi mi: " + ("Evet" if movie_catalog is not None else "Hayır")
+                   + ", Link verisi yüklendi mi: " + ("Evet" if movie_catalog is not None and movie_catalog.has_links else "Hayır")
                    })
 
+# --- Bellek Kullanımı Endpoint'i (preload paylaşımını doğrulamak için) ---
+@app.route('/api/admin/memory', methods=['GET'])
+def get_memory_usage():
+    """
+    İsteği karşılayan worker sürecinin RSS/PSS bellek kullanımını döndürür.
+    Tüm worker'ları birlikte görmek için: python utils/memstat.py <gunicorn_master_pid>
+    """
+    stats = process_memory()
+    if stats is None:
+        abort(501, description="Bellek istatistikleri bu platformda desteklenmiyor (/proc yok).")
+    stats['parent_pid'] = os.getppid()
+    return jsonify(stats)
+
+@app.route('/api/admin/tmdb-cache', methods=['GET'])
+def get_tmdb_cache_stats():
+    """İsteği karşılayan worker'ın TMDB metadata cache'i için hit/miss istatistikleri."""
+    stats = tmdb_metadata_cache.get_stats()
+    stats['pid'] = os.getpid()
+    return jsonify(stats)
+
+@app.route('/api/admin/user-store', methods=['GET'])
+def get_user_store_stats():
+    """Kullanıcı profil deposundaki kayıt sayıları ve (bu worker için) vektör önbelleği sayaçları."""
+    if user_store is None:
+        abort(503, description="Kullanıcı profil deposu şu anda kullanılamıyor.")
+    stats = user_store.get_stats()
+    stats['pid'] = os.getpid()
+    return jsonify(stats)
+
+@app.route('/api/admin/recommendation-cache', methods=['GET'])
+def get_recommendation_cache_stats():
+    """İsteği karşılayan worker'ın öneri sonuç cache'i için hit/miss istatistikleri."""
+    stats = recommendation_cache.get_stats()
+    stats['model_version'] = g.model.model_version if g.model is not None else None
+    stats['pid'] = os.getpid()
+    return jsonify(stats)
+
+@app.route('/api/admin/fold-in', methods=['GET'])
+def get_fold_in_stats():
+    """İsteği karşılayan worker'daki bekleyen fold-in kayıtları, paylaşılan günlük ve compaction durumu."""
+    if g.model is None:
+        abort(503, description="Öneri modeli şu anda kullanılamıyor.")
+    sync_fold_ins(g.model, force=True)
+    stats = g.model.fold_ins.get_stats()
+    stats['model_fold_in_seq'] = g.model.fold_in_seq
+    stats['journal'] = fold_in_journal.get_stats() if fold_in_journal is not None else None
+    stats['compaction'] = fold_in_compactor.get_status() if fold_in_compactor is not None else None
+    stats['pid'] = os.getpid()
+    return jsonify(stats)
+
+@app.route('/api/admin/fold-in/compact', methods=['POST'])
+def compact_fold_ins():
+    """
+    Bekleyen fold-in kayıtlarını arka planda artifact'e yazar: artifact ayrı bir model olarak yüklenir, günlük
+    uygulanır, dizilere yazılıp kaydedilir ve bu worker yeni artifact'i yükler (diğerleri dosya izleme veya kendi
+    eşikleriyle). Servis edilen model compaction süresince değişmez.
+    ?wait=1 verilirse bitene kadar beklenir ve özet döner (aksi halde 202).
+    """
+    if g.model is None or fold_in_compactor is None:
+        abort(503, description="Öneri modeli veya fold-in günlüğü şu anda kullanılamıyor.")
+    wait = request.args.get('wait', '0') not in ('0', 'false', '')
+    if not fold_in_compactor.start(g.model.model_version, force=True, wait=wait, reason='admin'):
+        abort(409, description="Bir compaction zaten sürüyor.")
+    if not wait:
+        return jsonify({"status": "compacting", "pid": os.getpid()}), 202
+    last = dict(fold_in_compactor.last)
+    status_code = {'compacted': 200, 'up_to_date': 200, 'busy': 409}.get(last.get('status'), 500)
+    return jsonify(last), status_code
+
+@app.route('/api/admin/model', methods=['GET'])
+def get_model_info():
+    """İsteği karşılayan worker'daki modelin sürümü, artifact yolu, boyutları ve son yeniden yükleme durumu."""
+    model = g.model
+    info = {"model_version": None, "artifact_path": None}
+    if model is not None:
+        info.update(model_version=model.model_version, artifact_path=model.artifact_path,
+                    n_users=int(model.user_vectors.shape[0]), n_items=int(model.item_vectors.shape[0]),
+                    n_components=int(model.n_components), solver=model.svd_solver,
+                    item_similarity=model.item_similarity is not None,
+                    quantization=model.quantization, rerank_factor=model.rerank_factor if model.quantization else None)
+    info['reload'] = model_reloader.get_status()
+    info['pid'] = os.getpid()
+    return jsonify(info)
+
+@app.route('/api/admin/model/reload', methods=['POST'])
+def reload_model():
+    """
+    Modeli kesintisiz yeniden yükler (bu worker'da): yeni artifact arka planda yüklenir, smoke sorgusuyla
+    doğrulanır ve global referans değiştirilir; devam eden istekler eski modelle tamamlanır.
+    İstek gövdesi (opsiyonel): {"path": "<models/ altındaki model klasörü veya .joblib>"}.
+    ?wait=1 verilirse yükleme bitene kadar beklenir ve sonuç döner (aksi halde 202).
+    Tüm worker'ların güncellenmesi için MODEL_WATCH_INTERVAL ile dosya izleme kullanılabilir.
+    Eski modeldeki bekleyen fold-in kayıtları yeni modele taşınmaz.
+    """
+    payload = request.get_json(silent=True) or {}
+    path = payload.get('path') if isinstance(payload, dict) else None
+    if path is not None:
+        path = os.path.realpath(os.path.join(MODELS_DIR, path))
+        if os.path.commonpath([path, os.path.realpath(MODELS_DIR)]) != os.path.realpath(MODELS_DIR):
+            abort(400, description="Model yolu models/ klasörü içinde olmalıdır.")
+        if not os.path.exists(path):
+            abort(404, description=f"Model bulunamadı: {payload.get('path')}")
+    wait = request.args.get('wait', '0') not in ('0', 'false', '')
+    if not model_reloader.reload(path, wait=wait):
+        abort(409, description="Bir model yüklemesi zaten sürüyor.")
+    if not wait:
+        return jsonify({"status": "loading", "pid": os.getpid()}), 202
+    last = dict(model_reloader.last)
+    return jsonify(last), (200 if last.get('status') == 'ok' else 500)
+# -------------------------
+
+# --- Tür Filtresi ---
+def genre_filter_from_request():
+    """
+    ?genres=Comedy,Animation (bu türlerden en az biri) ve ?exclude_genres=Horror (hiçbiri) parametrelerinden
+    GenreFilter; parametre yoksa None. Bilinmeyen türde 400, tür verisi yoksa 503.
+    """
+    include = [name for name in request.args.get('genres', '', type=str).split(',') if name.strip()]
+    exclude = [name for name in request.args.get('exclude_genres', '', type=str).split(',') if name.strip()]
+    if not include and not exclude:
+        return None
+    if g.model is None or g.model.genre_vocabulary is None:
+        abort(503, description="Tür filtresi için film türleri şu anda kullanılamıyor.")
+    try:
+        return g.model.genre_vocabulary.filter(include, exclude)
+    except ValueError as e:
+        abort(400, description=f"{e}. Geçerli türler: {', '.join(g.model.genre_vocabulary.names)}")
+
+@app.route('/api/genres', methods=['GET'])
+def get_genres():
+    """Tür filtresinde kullanılabilecek türler."""
+    if movie_catalog is None:
+        abort(503, description="Film verisi şu anda kullanılamıyor.")
+    return jsonify(movie_catalog.genre_vocabulary.names)
+# -------------------------
+
 # --- Öneri Endpoint'i ---
 @app.route('/api/recommendations/<int:user_id>', methods=['GET'])
 def get_recommendations(user_id):
     """
     Belirli bir kullanıcı için film önerileri döndürür.
+    Query Parametreleri:
+        genres (str): Virgülle ayrılmış türler; sadece bu türlerden en az birine ait filmler önerilir.
+        exclude_genres (str): Virgülle ayrılmış türler; bu türlerden herhangi birine ait filmler önerilmez.
     """
-    if recommendation_model is None:
+    if g.model is None:
         abort(503, description="Öneri modeli şu anda kullanılamıyor.")
+    sync_fold_ins(g.model) # Diğer worker'ların fold-in kayıtları
 
-    print(f"Kullanıcı ID {user_id} için öneri isteği alındı.")
+    logger.debug("Kullanıcı ID %s için öneri isteği alındı.", user_id)
+    genre_filter = genre_filter_from_request()
     
     try:
-        recommendations = recommendation_model.predict(user_id=user_id, n_recommendations=10)
+        recommendations = g.model.predict(user_id=user_id, n_recommendations=10, genre_filter=genre_filter)
         
         if not recommendations:
-             if user_id not in recommendation_model.user_map:
+             if not g.model.has_user(user_id):
                  abort(404, description=f"Kullanıcı ID {user_id} bulunamadı.")
              else:
                  return jsonify([])
 
-        # Önerilere posterUrl ekleyelim
-        result_with_posters = []
-        for r in recommendations:
-            movie_id = r[0]
-            title = r[1]
-            score = r[2]
-            tmdb_id = movie_id_to_tmdb_id.get(movie_id)
-            poster_url = None
-            if tmdb_id:
-                poster_path = get_tmdb_poster_path(tmdb_id) # Yardımcı fonksiyonu kullanalım
-                if poster_path:
-                    poster_url = f"{TMDB_POSTER_BASE_URL}{poster_path}"
-            result_with_posters.append({"movieId": movie_id, "title": title, "score": score, "posterUrl": poster_url})
-            
+        # Önerilere posterUrl ekleyelim (TMDB istekleri paralel, süre sınırlı)
+        result_with_posters = [{"movieId": movie_id, "title": title, "score": score}
+                               for movie_id, title, score in recommendations]
+        attach_poster_urls(result_with_posters, tmdb_ids_for([r["movieId"] for r in result_with_posters]))
+
         return jsonify(result_with_posters)
 
+    except HTTPException:
+        raise # abort(404) 500'e çevrilmesin
     except Exception as e:
-        print(f"Öneri alınırken hata oluştu: {e}")
+        logger.exception("Öneri alınırken hata oluştu: %s", e)
         abort(500, description="Öneriler alınırken bir sunucu hatası oluştu.")
 # -------------------------
 
-# --- TMDB Poster Path Getirme Yardımcı Fonksiyonu (Cache ile) ---
-tmdb_poster_cache = {}
+# --- Toplu Öneri Endpoint'i ---
+MAX_BATCH_USERS = 1000 # Tek istekte kabul edilecek maksimum kullanıcı sayısı
+MAX_BATCH_RECOMMENDATIONS = 100 # Kullanıcı başına maksimum öneri sayısı
 
-def get_tmdb_poster_path(tmdb_id):
-    if tmdb_id in tmdb_poster_cache:
-        return tmdb_poster_cache[tmdb_id]
-    
-    # API Anahtarı kontrolü fonksiyon içinde de yapılmalı
-    if not TMDB_API_KEY:
-        print("UYARI: TMDB API Anahtarı ayarlanmamış. Poster yolu alınamıyor.")
-        tmdb_poster_cache[tmdb_id] = None # Tekrar denememek için cache'e None ekle
-        return None
+@app.route('/api/recommendations/batch', methods=['POST'])
+def get_recommendations_batch():
+    """
+    Birden fazla kullanıcı için önerileri tek istekte döndürür (ör. toplu e-posta işleri).
+    İstek gövdesinde {'user_ids': [1, 2, ...], 'n_recommendations': 10} beklenir.
+    Skorlama modelin predict_batch metodu ile parça parça matris çarpımıyla yapılır.
+    TMDB poster zenginleştirmesi yapılmaz; çağıran taraf gerekirse /api/movies/<id> kullanabilir.
+    ?genres= / ?exclude_genres= tür filtresi tüm kullanıcılara uygulanır.
+    """
+    if g.model is None:
+        abort(503, description="Öneri modeli şu anda kullanılamıyor.")
+    sync_fold_ins(g.model) # Diğer worker'ların fold-in kayıtları
+
+    payload = request.get_json(silent=True)
+    if not payload or not isinstance(payload, dict) or not isinstance(payload.get('user_ids'), list):
+        abort(400, description="Geçersiz istek formatı. {'user_ids': [...], 'n_recommendations': 10} bekleniyor.")
 
-    tmdb_url = f"{TMDB_BASE_URL}/movie/{tmdb_id}?api_key={TMDB_API_KEY}&language=en-US"
-    poster_path = None
     try:
-        tmdb_response = requests.get(tmdb_url, timeout=2)
-        tmdb_response.raise_for_status()
-        tmdb_data = tmdb_response.json()
-        poster_path = tmdb_data.get('poster_path')
-        tmdb_poster_cache[tmdb_id] = poster_path # Cache'e ekle
-        # time.sleep(0.05) # Gerekirse rate limit için bekleme
-    except requests.exceptions.RequestException as tmdb_err:
-        print(f"WARNING: TMDB API request failed (get_tmdb_poster_path, tmdbId: {tmdb_id}): {tmdb_err}")
-        tmdb_poster_cache[tmdb_id] = None # Başarısız olsa da cache'e ekle (tekrar denememek için)
+        user_ids = [int(u) for u in payload['user_ids']]
+        n_recommendations = int(payload.get('n_recommendations', 10))
+    except (TypeError, ValueError):
+        abort(400, description="user_ids tamsayı listesi, n_recommendations tamsayı olmalıdır.")
+
+    if len(user_ids) > MAX_BATCH_USERS:
+        abort(400, description=f"Tek istekte en fazla {MAX_BATCH_USERS} kullanıcı gönderilebilir.")
+    n_recommendations = max(1, min(n_recommendations, MAX_BATCH_RECOMMENDATIONS))
+    genre_filter = genre_filter_from_request()
+
+    logger.debug("%d kullanıcı için toplu öneri isteği alındı.", len(user_ids))
+
+    try:
+        batch = g.model.predict_batch(user_ids, n_recommendations=n_recommendations, genre_filter=genre_filter)
+        results = {}
+        missing_user_ids = []
+        for user_id in user_ids:
+            if not g.model.has_user(user_id):
+                missing_user_ids.append(user_id)
+                continue
+            results[str(user_id)] = [
+                {"movieId": movie_id, "title": title, "score": score}
+                for movie_id, title, score in batch.get(user_id, [])
+            ]
+        return jsonify({"results": results, "missing_user_ids": missing_user_ids})
+
     except Exception as e:
-        print(f"WARNING: Error processing TMDB data (get_tmdb_poster_path, tmdbId: {tmdb_id}): {e}")
-        tmdb_poster_cache[tmdb_id] = None
-    return poster_path
-# ----------------------------------------------------------------
+        logger.exception("Toplu öneri alınırken hata oluştu: %s", e)
+        abort(500, description="Toplu öneriler alınırken bir sunucu hatası oluştu.")
+# -------------------------
 
-# --- TMDB ID to MovieID Mapping --- 
-# Create the reverse mapping for easier lookup
-tmdb_id_to_movie_id = {v: k for k, v in movie_id_to_tmdb_id.items()} if movie_id_to_tmdb_id else {}
+# --- TMDB Poster Zenginleştirme Yardımcı Fonksiyonları ---
+def get_tmdb_poster_path(tmdb_id):
+    """Tek bir film için poster_path (cache'li, bloklayan)."""
+    return tmdb_client.get_poster_path(tmdb_id)
+
+def tmdb_ids_for(movie_ids):
+    """movieId listesi için tmdbId listesi (katalog veya bağlantı yoksa None)."""
+    if movie_catalog is None or not movie_ids:
+        return [None] * len(movie_ids)
+    positions = movie_catalog.positions(movie_ids)
+    tmdb_ids = movie_catalog.tmdb_ids[positions].tolist()
+    return [tmdb_id if position >= 0 and tmdb_id >= 0 else None
+            for position, tmdb_id in zip(positions.tolist(), tmdb_ids)]
+
+def attach_poster_urls(items, tmdb_ids):
+    """
+    items listesindeki her sözlüğe 'posterUrl' ekler. Tüm posterler pooled oturum üzerinden
+    paralel çekilir; TMDB_ENRICH_DEADLINE içinde gelmeyenler posterUrl: null olarak döner.
+    """
+    with stage_timer('tmdb_enrichment'):
+        poster_paths = tmdb_client.get_poster_paths([t for t in tmdb_ids if t], deadline=TMDB_ENRICH_DEADLINE)
+    for item, tmdb_id in zip(items, tmdb_ids):
+        item['posterUrl'] = tmdb_client.poster_url(poster_paths.get(tmdb_id)) if tmdb_id else None
+    return items
+# ----------------------------------------------------------------
 
 # --- Film Listesi Endpoint'i (TMDB ve Arama Entegrasyonu ile) ---
 @app.route('/api/movies', methods=['GET'])
@@ -255,11 +739,16 @@ def get_movies():
     Query Parametreleri:
         page (int): İstenen sayfa numarası (varsayılan: 1).
         limit (int): Sayfa başına film sayısı (varsayılan: 20, max: 50).
-        search (str): Film başlıklarında aranacak terim (opsiyonel).
+        search (str): Film başlıklarında aranacak terim (opsiyonel, büyük/küçük harf duyarsız düz metin).
+        match (str): 'substring' (varsayılan, başlığın herhangi bir yerinde) veya 'prefix' (başlık terimle başlar).
     """
-    if movies_df is None or movie_id_to_tmdb_id is None:
+    if movie_catalog is None or not movie_catalog.has_links:
         abort(503, description="Film veya link verisi şu anda kullanılamıyor.")
 
+    match_mode = request.args.get('match', 'substring', type=str)
+    if match_mode not in ('substring', 'prefix'):
+        abort(400, description="Geçersiz 'match' değeri. 'substring' veya 'prefix' bekleniyor.")
+
     try:
         # Query parametrelerini al
         page = request.args.get('page', 1, type=int)
@@ -271,38 +760,24 @@ def get_movies():
         if limit < 1: limit = 1
         if limit > 50: limit = 50
 
-        # Filtreleme için DataFrame'i kopyala (orijinali değiştirmeyelim)
-        filtered_movies_df = movies_df.copy()
-
-        # Arama terimi varsa filtrele
-        if search_term:
-            print(f"Arama yapılıyor: '{search_term}'")
-            filtered_movies_df = filtered_movies_df[
-                filtered_movies_df['title'].str.contains(search_term, case=False, na=False)
-            ]
-            print(f"Arama sonucu {len(filtered_movies_df)} film bulundu.")
-            
-        # Sayfalama için başlangıç/bitiş indexleri ve toplam sayıyı hesapla
-        total_movies = len(filtered_movies_df) # Toplamı filtrelenmiş DataFrame üzerinden al
         start_index = (page - 1) * limit
         end_index = start_index + limit
 
-        # Sayfalanmış veriyi al
-        paginated_movies_df = filtered_movies_df.iloc[start_index:end_index]
-
-        # TMDB verilerini ekle
-        movies_list = []
-        for index, row in paginated_movies_df.iterrows():
-            movie_data = row.to_dict()
-            tmdb_id = movie_id_to_tmdb_id.get(movie_data['movieId'])
-            movie_data['tmdbId'] = tmdb_id
-            poster_url = None
-            if tmdb_id:
-                poster_path = get_tmdb_poster_path(tmdb_id) # Yardımcı fonksiyonu kullan
-                if poster_path:
-                    poster_url = f"{TMDB_POSTER_BASE_URL}{poster_path}"
-            movie_data['posterUrl'] = poster_url
-            movies_list.append(movie_data)
+        # Arama terimi varsa indeksten eşleşen satır konumlarını al; DataFrame kopyalanmaz,
+        # sadece istenen sayfanın satırları okunur
+        if search_term:
+            logger.debug("Arama yapılıyor: '%s' (%s)", search_term, match_mode)
+            matched_positions = title_search_index.search(search_term, mode=match_mode)
+            logger.debug("Arama sonucu %d film bulundu.", len(matched_positions))
+            total_movies = len(matched_positions)
+            page_positions = matched_positions[start_index:end_index]
+        else:
+            total_movies = len(movie_catalog)
+            page_positions = np.arange(start_index, min(end_index, total_movies))
+
+        # TMDB verilerini ekle (posterler paralel çekilir)
+        movies_list = movie_catalog.records(page_positions)
+        attach_poster_urls(movies_list, [m['tmdbId'] for m in movies_list])
 
         # Yanıtı oluştur
         response = {
@@ -313,7 +788,7 @@ def get_movies():
         return jsonify(response)
 
     except Exception as e:
-        print(f"Film listesi alınırken hata oluştu: {e}")
+        logger.exception("Film listesi alınırken hata oluştu: %s", e)
         abort(500, description="Film listesi alınırken bir sunucu hatası oluştu.")
 # -----------------------------
 
@@ -323,42 +798,28 @@ def get_movie_details(movie_id):
     """
     Belirli bir movie_id için film detaylarını (TMDB poster path'i ile) döndürür.
     """
-    if movies_df is None or movie_id_to_tmdb_id is None:
+    if movie_catalog is None or not movie_catalog.has_links:
         abort(503, description="Film veya link verisi şu anda kullanılamıyor.")
 
-    try:
-        movie = movies_df[movies_df['movieId'] == movie_id]
-        if movie.empty:
-            abort(404, description=f"Film ID {movie_id} bulunamadı.")
+    movie_details = movie_catalog.record(movie_id)
+    if movie_details is None:
+        abort(404, description=f"Film ID {movie_id} bulunamadı.")
 
-        movie_details = movie.iloc[0].to_dict()
-        tmdb_id = movie_id_to_tmdb_id.get(movie_details['movieId'])
+    try:
+        tmdb_id = movie_details.pop('tmdbId')
         poster_url = None
         overview = None
         vote_average = None
         release_date = None
 
         if tmdb_id:
-            # API Anahtarı kontrolü
-            if not TMDB_API_KEY:
-                print("UYARI: TMDB API Anahtarı ayarlanmamış. Detaylar alınamıyor.")
-            else:
-                # TMDB'den detayları ve poster path'i alalım
-                tmdb_url = f"{TMDB_BASE_URL}/movie/{tmdb_id}?api_key={TMDB_API_KEY}&language=en"
-                try:
-                    tmdb_response = requests.get(tmdb_url, timeout=2)
-                    tmdb_response.raise_for_status()
-                    tmdb_data = tmdb_response.json()
-                    poster_path = tmdb_data.get('poster_path')
-                    if poster_path:
-                         poster_url = f"{TMDB_POSTER_BASE_URL}{poster_path}"
-                    overview = tmdb_data.get('overview')
-                    vote_average = tmdb_data.get('vote_average')
-                    release_date = tmdb_data.get('release_date')
-                except requests.exceptions.RequestException as tmdb_err:
-                    print(f"WARNING: TMDB API request failed (details, tmdbId: {tmdb_id}): {tmdb_err}")
-                except Exception as e:
-                    print(f"WARNING: Error processing TMDB data (details, tmdbId: {tmdb_id}): {e}")
+            # Detaylar ve poster path'i metadata cache'inden (yoksa TMDB'den) alalım
+            tmdb_data = tmdb_client.get_metadata(tmdb_id)
+            if tmdb_data:
+                poster_url = tmdb_client.poster_url(tmdb_data.get('poster_path'))
+                overview = tmdb_data.get('overview')
+                vote_average = tmdb_data.get('vote_average')
+                release_date = tmdb_data.get('release_date')
 
         # Yanıta ek bilgileri ekle
         movie_details['posterUrl'] = poster_url
@@ -369,96 +830,331 @@ def get_movie_details(movie_id):
         return jsonify(movie_details)
 
     except Exception as e:
-        print(f"Film detayı alınırken hata oluştu (ID: {movie_id}): {e}")
+        logger.exception("Film detayı alınırken hata oluştu (ID: %s): %s", movie_id, e)
         abort(500, description="Film detayı alınırken bir sunucu hatası oluştu.")
 # ---------------------------
 
+# --- Puan Dönüştürme ve Yanıt Biçimlendirme Yardımcıları ---
+def tmdb_ratings_to_movie_ids(user_ratings_tmdb):
+    """
+    {'tmdbId': rating} sözlüğünü movieId'lere çevirir; 0.5 - 5.0 dışındaki puanlar ve tanınmayan tmdbId'ler atlanır.
+
+    Returns:
+        tuple: ({movieId: puan} modeldeki filmler, {movieId: puan} katalogda olup modelde olmayan filmler)
+    """
+    started = time.perf_counter()
+    user_ratings_internal = {}
+    new_movie_ratings = {} # Katalogda olup modelde olmayan filmler (fold-in ve profil deposu için)
+    # user_ratings_tmdb = {"tmdbId1": rating1, "tmdbId2": rating2, ...}
+    for tmdb_id_str, rating in user_ratings_tmdb.items(): # Doğru değişkenleri kullan
+        try:
+            tmdb_id = int(tmdb_id_str)
+            # Doğru rating değerini al
+            current_rating = float(rating) 
+            # Rating değerinin mantıklı bir aralıkta olduğunu kontrol edelim (örn: 0.5 - 5.0)
+            if not (0.5 <= current_rating <= 5.0):
+                logger.debug("Geçersiz rating değeri (%s) tmdbId %s için atlanıyor.", current_rating, tmdb_id)
+                continue # Geçersiz puanı atla
+                
+            movie_id = movie_catalog.movie_id_for_tmdb(tmdb_id)
+            # Modelin bu movieId'yi bilip bilmediğini movie_map ile kontrol et
+            if movie_id and movie_id in g.model.movie_map: 
+                # movie_id'ye karşılık doğru rating'i ata
+                user_ratings_internal[movie_id] = current_rating 
+            elif movie_id:
+                new_movie_ratings[movie_id] = current_rating
+            else:
+                # Bu uyarıları loglamak isteyebiliriz ama cliente göndermeye gerek yok
+                # print(f"Uyarı: tmdbId {tmdb_id} için geçerli movieId bulunamadı veya modelde yok.")
+                pass 
+        except (TypeError, ValueError):
+             # print(f"Uyarı: Geçersiz tmdbId ({tmdb_id_str}) veya rating ({rating}) formatı.")
+             pass
+    observe_stage('tmdb_id_translation', time.perf_counter() - started)
+    return user_ratings_internal, new_movie_ratings
+
+def format_recommendations(recommendations):
+    """(movieId, title, score) listesini katalog bilgileri (tmdbId, genres) ve posterUrl ile yanıt listesine çevirir."""
+    result_with_posters = []
+    with stage_timer('catalog_join'):
+        # Film bilgilerini katalogdan tek vektörel aramayla al
+        positions = movie_catalog.positions([movie_id for movie_id, _, _ in recommendations]).tolist()
+        for (movie_id, title, score), position in zip(recommendations, positions):
+            tmdb_id = int(movie_catalog.tmdb_ids[position]) if position >= 0 else -1
+
+            result_with_posters.append({
+                "movieId": int(movie_id), 
+                "tmdbId": tmdb_id if tmdb_id >= 0 else None,
+                "title": title, 
+                "genres": movie_catalog.genres[position] if position >= 0 else None,
+                "score": score, # Tahmini puan
+            })
+    # Posterleri paralel çek (süre sınırına yetişmeyenler posterUrl: null)
+    attach_poster_urls(result_with_posters, [r["tmdbId"] for r in result_with_posters])
+    return result_with_posters
+
+def cached_recommendations_for_ratings(ratings, n_recommendations, k_neighbors=50, rating_threshold=3.5,
+                                      user_vector_fn=None, genre_filter=None):
+    """
+    predict_for_new_user'ı sonuç cache'i üzerinden çağırır. user_vector_fn verilirse (profil deposu) vektör sadece
+    cache'te kayıt yoksa hesaplanır; bu durumda vektör puanlardan türetildiği için anahtara 'projected' modu eklenir.
+    Fold-in compaction yeni bir artifact (yeni model sürümü) ürettiği için model sürümü anahtar için yeterlidir.
+    """
+    key = profile_key(ratings, g.model.model_version, n_recommendations=n_recommendations, k_neighbors=k_neighbors,
+                      rating_threshold=rating_threshold, vector='projected' if user_vector_fn else 'temporary',
+                      genres=genre_filter.key() if genre_filter else None)
+    return recommendation_cache.get_or_compute(key, lambda: tuple(g.model.predict_for_new_user(
+        ratings_dict=ratings, n_recommendations=n_recommendations, k_neighbors=k_neighbors,
+        rating_threshold=rating_threshold, user_vector=user_vector_fn() if user_vector_fn else None,
+        genre_filter=genre_filter)))
+
+def profile_model_ratings(handle):
+    """Profildeki puanlardan modelde bulunan filmlere ait olanlar ({movieId: puan})."""
+    return {movie_id: rating for movie_id, rating in user_store.get_ratings(handle).items()
+            if movie_id in g.model.movie_map}
+# ----------------------------------------------------------------
+
+# --- Benzer Filmler Endpoint'i ("Buna benzer filmler") ---
+MAX_SIMILAR_MOVIES = 50
+
+@app.route('/api/movies/<int:movie_id>/similar', methods=['GET'])
+def get_similar_movies(movie_id):
+    """
+    Bir filme en benzer filmleri (item_vectors üzerinde kosinüs) döndürür. Benzerlikler çevrimdışı
+    hesaplanıp modelde saklandığı için istek başına sadece K satırlık bir okuma yapılır.
+    Query Parametreleri:
+        limit (int): Döndürülecek film sayısı (varsayılan: 10, max: 50 veya indeksteki K).
+        genres / exclude_genres (str): Tür filtresi (indeksteki K komşu içinden; daha az film dönebilir).
+    """
+    if g.model is None or movie_catalog is None or not movie_catalog.has_links:
+        abort(503, description="Öneri sistemi veya veriler şu anda kullanılamıyor.")
+    if g.model.item_similarity is None:
+        abort(503, description="Film benzerlik indeksi yok (python models/item_similarity.py <model> ile oluşturulur).")
+    if movie_id not in movie_catalog:
+        abort(404, description=f"Film ID {movie_id} bulunamadı.")
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_SIMILAR_MOVIES))
+
+    similar = g.model.similar_items(movie_id, n=limit, genre_filter=genre_filter_from_request())
+    if similar is None:
+        abort(404, description=f"Film ID {movie_id} için benzerlik verisi yok (film modelde değil).")
+    return jsonify(format_recommendations(similar))
+# --------------------------
+
 # --- Yeni Öneri Endpoint'i (Puanlara Göre) ---
 @app.route('/api/recommendations', methods=['POST'])
 def get_recommendations_from_ratings():
     """
     Kullanıcının sağladığı puanlara göre film önerileri döndürür.
     İstek gövdesinde {'tmdbId1': rating1, 'tmdbId2': rating2, ...} beklenir.
+    ?user_id=<id> verilirse puanlar o kullanıcı için modele fold-in edilir: vektör saklanır (sonraki
+    isteklerde ve GET /api/recommendations/<id>'de kullanılır), modelde olmayan katalog filmleri de
+    bu puanlardan modele eklenir. Başka bir kullanıcının vektörünü değiştirmek mümkün olduğundan
+    yönetim anahtarı (Authorization: Bearer <ADMIN_TOKEN>) gerekir; son kullanıcılar ?handle= kullanır.
+    ?handle=<tanıtıcı> verilirse puanlar kullanıcı profil deposuna eklenir (profil anahtarı gerekir) ve
+    öneriler profildeki tüm puanlardan (önbellekteki kullanıcı vektörüyle) üretilir; gövde boş ({}) olabilir.
+    ?genres= / ?exclude_genres= ile öneriler türe göre filtrelenir.
     """
-    if recommendation_model is None or movies_df is None or not tmdb_id_to_movie_id:
+    if g.model is None or movie_catalog is None or not movie_catalog.has_links:
         abort(503, description="Öneri sistemi veya veriler şu anda kullanılamıyor.")
 
-    user_ratings_tmdb = request.get_json()
+    handle = request.args.get('handle', type=str)
+    if handle is not None:
+        if user_store is None:
+            abort(503, description="Kullanıcı profil deposu şu anda kullanılamıyor.")
+        if not valid_handle(handle):
+            abort(400, description="Geçersiz kullanıcı tanıtıcısı.")
+        user_ratings_tmdb = request.get_json(silent=True)
+        if user_ratings_tmdb is None:
+            user_ratings_tmdb = {}
+    else:
+        user_ratings_tmdb = request.get_json()
 
-    if not user_ratings_tmdb or not isinstance(user_ratings_tmdb, dict):
+    if not isinstance(user_ratings_tmdb, dict) or (not user_ratings_tmdb and handle is None):
         abort(400, description="Geçersiz istek formatı. {'tmdbId': rating} formatında JSON bekleniyor.")
 
-    print(f"Yeni puanlara göre öneri isteği alındı (TMDB IDs): {user_ratings_tmdb}") # Logu güncelleyelim
+    fold_in_user_id = request.args.get('user_id', type=int)
+    if fold_in_user_id is not None:
+        require_admin()
+    genre_filter = genre_filter_from_request()
+    logger.debug("Yeni puanlara göre öneri isteği alındı (TMDB IDs): %s", user_ratings_tmdb)
 
     try:
         # 1. tmdbId'leri movieId'lere çevir ve geçerliliğini kontrol et
-        user_ratings_internal = {}
-        valid_ratings_count = 0
-        # user_ratings_tmdb = {"tmdbId1": rating1, "tmdbId2": rating2, ...}
-        for tmdb_id_str, rating in user_ratings_tmdb.items(): # Doğru değişkenleri kullan
-            try:
-                tmdb_id = int(tmdb_id_str)
-                # Doğru rating değerini al
-                current_rating = float(rating) 
-                # Rating değerinin mantıklı bir aralıkta olduğunu kontrol edelim (örn: 0.5 - 5.0)
-                if not (0.5 <= current_rating <= 5.0):
-                    print(f"Uyarı: Geçersiz rating değeri ({current_rating}) tmdbId {tmdb_id} için atlanıyor.")
-                    continue # Geçersiz puanı atla
-                    
-                movie_id = tmdb_id_to_movie_id.get(tmdb_id)
-                # Modelin bu movieId'yi bilip bilmediğini movie_map ile kontrol et
-                if movie_id and movie_id in recommendation_model.movie_map: 
-                    # movie_id'ye karşılık doğru rating'i ata
-                    user_ratings_internal[movie_id] = current_rating 
-                    valid_ratings_count += 1
-                else:
-                    # Bu uyarıları loglamak isteyebiliriz ama cliente göndermeye gerek yok
-                    # print(f"Uyarı: tmdbId {tmdb_id} için geçerli movieId bulunamadı veya modelde yok.")
-                    pass 
-            except ValueError:
-                 # print(f"Uyarı: Geçersiz tmdbId ({tmdb_id_str}) veya rating ({rating}) formatı.")
-                 pass
+        user_ratings_internal, new_movie_ratings = tmdb_ratings_to_movie_ids(user_ratings_tmdb)
+
+        # Profil verildiyse yeni puanlar depoya eklenir, öneri profildeki tüm puanlardan yapılır
+        user_vector_fn = None
+        if handle is not None:
+            if user_ratings_internal or new_movie_ratings:
+                require_profile_writer(handle)
+                user_store.add_ratings(handle, {**user_ratings_internal, **new_movie_ratings})
+            user_ratings_internal = profile_model_ratings(handle)
+            user_vector_fn = lambda: user_store.user_vector(handle, g.model)
                  
-        print(f"Modele gönderilecek dahili puanlar (Movie IDs): {user_ratings_internal}") # Kontrol için log ekleyelim
+        logger.debug("Modele gönderilecek dahili puanlar (Movie IDs): %s", user_ratings_internal)
 
-        if valid_ratings_count < 1: 
+        if len(user_ratings_internal) < 1: 
              abort(400, description="Öneri yapmak için yeterli sayıda geçerli film puanı sağlanmadı.")
              
-        # --- Model Kullanımı (Yeni Metod ile) --- 
-        # Yeni eklenen metodu kullanarak önerileri al
-        recommendations = recommendation_model.predict_for_new_user(
-            ratings_dict=user_ratings_internal, 
-            n_recommendations=20 # İlk 20 öneriyi alalım
-        )
+        # Kullanıcı kimliği verildiyse puanları modele fold-in et ve öneriyi saklanan vektörle predict üretsin:
+        # kullanıcının tüm oy geçmişi maskelenir ve kullanıcı kendi komşusu olmaz. Sonuç cache'i kullanılmaz.
+        # Kayıtlar önce paylaşılan günlüğe yazılır, sonra bu worker'ın modeline uygulanır; diğer worker'lar
+        # sonraki isteklerinde aynı kayıtları günlükten okur.
+        if fold_in_user_id is not None:
+            if fold_in_journal is None:
+                abort(503, description="Fold-in günlüğü şu anda kullanılamıyor.")
+            events = [user_event(fold_in_user_id, {**user_ratings_internal, **new_movie_ratings})]
+            for movie_id in new_movie_ratings:
+                position = movie_catalog.position(movie_id)
+                events.append(item_event(movie_id, title=movie_catalog.titles[position],
+                                         genre_mask=movie_catalog.genre_masks[position]))
+            fold_in_journal.append(events)
+            apply_journal(g.model, fold_in_journal)
+            recommendations = g.model.predict(fold_in_user_id, n_recommendations=20, genre_filter=genre_filter)
+        else:
+            # --- Model Kullanımı (sonuç cache'i üzerinden) ---
+            recommendations = cached_recommendations_for_ratings(
+                user_ratings_internal, 
+                n_recommendations=20, # İlk 20 öneriyi alalım
+                user_vector_fn=user_vector_fn,
+                genre_filter=genre_filter
+            )
 
         # Sonuçları formatla (movieId, title, score, posterUrl, tmdbId, genres)
-        result_with_posters = []
-        # recommendations artık (movieId, title, score) tuple listesi döndürüyor olmalı
-        for movie_id, title, score in recommendations:
-            # Film bilgilerini movies_df'ten al
-            movie_info = movies_df[movies_df['movieId'] == movie_id].iloc[0] 
-            tmdb_id = movie_id_to_tmdb_id.get(movie_id)
-            poster_url = None
-            if tmdb_id:
-                poster_path = get_tmdb_poster_path(tmdb_id)
-                if poster_path:
-                    poster_url = f"{TMDB_POSTER_BASE_URL}{poster_path}"
-            
-            result_with_posters.append({
-                "movieId": int(movie_id), 
-                "tmdbId": int(tmdb_id) if tmdb_id else None,
-                "title": title, 
-                "genres": movie_info['genres'],
-                "score": score, # Tahmini puan
-                "posterUrl": poster_url
-            })
+        return jsonify(format_recommendations(recommendations))
 
-        return jsonify(result_with_posters)
+    except HTTPException:
+        raise # abort() ile verilen 4xx yanıtları 500'e çevrilmesin
+    except Exception as e:
+        logger.exception("Puanlara göre öneri alınırken hata oluştu: %s", e)
+        abort(500, description="Öneriler alınırken bir sunucu hatası oluştu.")
+# --------------------------
+
+# --- Kullanıcı Profili Endpoint'leri ---
+def require_user_store(handle):
+    """Profil deposu yoksa 503, tanıtıcı geçersizse 400 ile isteği sonlandırır."""
+    if user_store is None:
+        abort(503, description="Kullanıcı profil deposu şu anda kullanılamıyor.")
+    if not valid_handle(handle):
+        abort(400, description="Geçersiz kullanıcı tanıtıcısı (harf, rakam, '.', '_', '-'; en fazla 64 karakter).")
 
+def require_profile_writer(handle):
+    """
+    Profile yazma profilin anahtarını (Authorization: Bearer <anahtar>, POST /api/users/<handle> ile verilir)
+    veya yönetim anahtarını ister; aksi halde 401. ?user_id= fold-in'i gibi, başkasının kalıcı verisi
+    kimlik doğrulamadan değiştirilemez.
+    """
+    if has_admin_token():
+        return
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not user_store.check_token(handle, token.strip()):
+        abort(401, description=f"Kullanıcı '{handle}' profiline yazmak için profil anahtarı gerekli "
+                               "(Authorization: Bearer <anahtar>).")
+
+@app.route('/api/users/<handle>', methods=['GET'])
+def get_user_profile(handle):
+    """Profildeki puanlar (zaman damgalarıyla), favoriler ve revizyon."""
+    require_user_store(handle)
+    profile = user_store.get_profile(handle)
+    if profile is None:
+        abort(404, description=f"Kullanıcı '{handle}' bulunamadı.")
+    return jsonify(profile)
+
+@app.route('/api/users/<handle>', methods=['POST'])
+def create_user_profile(handle):
+    """
+    Yeni profil oluşturur ve yazma anahtarını döndürür (anahtar sadece bu yanıtta görülür, depoda hash'i
+    tutulur). Profil zaten varsa 409; yönetim anahtarıyla çağrılırsa anahtar yenilenir (aktarılan veya
+    anahtarı kaybolan profiller için) ve eski anahtar geçersiz olur.
+    """
+    require_user_store(handle)
+    token = user_store.create_profile(handle, rotate=has_admin_token())
+    if token is None:
+        abort(409, description=f"Kullanıcı '{handle}' zaten var.")
+    return jsonify({"handle": handle, "token": token}), 201
+
+@app.route('/api/users/<handle>/ratings', methods=['POST'])
+def add_user_ratings(handle):
+    """
+    Profile puan ekler (aynı filme verilmiş önceki puanın yerine geçer). İstek gövdesi:
+    {'tmdbId': rating, ...} (POST /api/recommendations ile aynı) veya data/user_data dosya formatında
+    [{'movie_id': id, 'rating': r, 'timestamp': t}, ...]. Profil anahtarı gerekir.
+    """
+    require_user_store(handle)
+    require_profile_writer(handle)
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        if g.model is None or movie_catalog is None or not movie_catalog.has_links:
+            abort(503, description="tmdbId dönüşümü için film verisi şu anda kullanılamıyor.")
+        user_ratings_internal, new_movie_ratings = tmdb_ratings_to_movie_ids(payload)
+        ratings = list({**user_ratings_internal, **new_movie_ratings}.items())
+    elif isinstance(payload, list):
+        try:
+            ratings = [(int(r['movie_id']), float(r['rating']), r.get('timestamp')) for r in payload]
+        except (TypeError, ValueError, KeyError):
+            abort(400, description="Geçersiz puan kaydı. [{'movie_id': id, 'rating': puan, 'timestamp': t}] bekleniyor.")
+        ratings = [r for r in ratings if 0.5 <= r[1] <= 5.0 and (movie_catalog is None or r[0] in movie_catalog)]
+    else:
+        abort(400, description="Geçersiz istek formatı. {'tmdbId': rating} veya puan kaydı listesi bekleniyor.")
+    if not ratings:
+        abort(400, description="Geçerli film puanı bulunamadı.")
+
+    result = user_store.add_ratings(handle, ratings)
+    result['handle'] = handle
+    return jsonify(result)
+
+@app.route('/api/users/<handle>/favorites', methods=['POST'])
+def add_user_favorites(handle):
+    """Favorilere film ekler. İstek gövdesi movieId listesidir: [1, 10, ...]. Profil anahtarı gerekir."""
+    require_user_store(handle)
+    require_profile_writer(handle)
+    payload = request.get_json(silent=True)
+    try:
+        movie_ids = [int(movie_id) for movie_id in payload]
+    except (TypeError, ValueError):
+        abort(400, description="Geçersiz istek formatı. movieId listesi bekleniyor.")
+    if movie_catalog is not None:
+        movie_ids = [movie_id for movie_id in movie_ids if movie_id in movie_catalog]
+    added = user_store.add_favorites(handle, movie_ids)
+    return jsonify({"handle": handle, "added": added, "favorites": user_store.get_favorites(handle)})
+
+@app.route('/api/users/<handle>/favorites/<int:movie_id>', methods=['DELETE'])
+def remove_user_favorite(handle, movie_id):
+    """Filmi favorilerden çıkarır. Profil anahtarı gerekir."""
+    require_user_store(handle)
+    require_profile_writer(handle)
+    if not user_store.remove_favorite(handle, movie_id):
+        abort(404, description=f"Film ID {movie_id} kullanıcının favorilerinde yok.")
+    return jsonify({"handle": handle, "favorites": user_store.get_favorites(handle)})
+
+@app.route('/api/users/<handle>/recommendations', methods=['GET'])
+def get_user_profile_recommendations(handle):
+    """
+    Profildeki puanlardan öneriler (puanlar yeniden gönderilmez). Kullanıcı vektörü depoda model
+    sürümüyle önbelleğe alınır ve yeni puanlarla artımlı güncellenir.
+    Query Parametreleri:
+        n (int): Öneri sayısı (varsayılan: 20, max: 100).
+        genres / exclude_genres (str): Tür filtresi (virgülle ayrılmış türler).
+    """
+    require_user_store(handle)
+    if g.model is None or movie_catalog is None or not movie_catalog.has_links:
+        abort(503, description="Öneri sistemi veya veriler şu anda kullanılamıyor.")
+    n_recommendations = max(1, min(request.args.get('n', 20, type=int), MAX_BATCH_RECOMMENDATIONS))
+    genre_filter = genre_filter_from_request()
+
+    ratings = profile_model_ratings(handle)
+    if not ratings:
+        if not user_store.exists(handle):
+            abort(404, description=f"Kullanıcı '{handle}' bulunamadı.")
+        abort(400, description="Profilde modelde bulunan bir filme ait puan yok.")
+
+    try:
+        recommendations = cached_recommendations_for_ratings(
+            ratings, n_recommendations, user_vector_fn=lambda: user_store.user_vector(handle, g.model),
+            genre_filter=genre_filter)
+        return jsonify(format_recommendations(recommendations))
     except Exception as e:
-        print(f"Puanlara göre öneri alınırken hata oluştu: {e}")
-        import traceback
-        traceback.print_exc() 
+        logger.exception("Profil önerileri alınırken hata oluştu (%s): %s", handle, e)
         abort(500, description="Öneriler alınırken bir sunucu hatası oluştu.")
 # --------------------------
 
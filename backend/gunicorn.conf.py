@@ -0,0 +1,35 @@
+# Gunicorn yapılandırması (Procfile: gunicorn -c gunicorn.conf.py app:app)
+import gc
+import os
+import tempfile
+
+# Worker sayısı (Render/Heroku WEB_CONCURRENCY değişkenini kullanır)
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Preload modu: app.py (model, movies.csv, links.csv) worker'lar fork edilmeden önce master'da
+# bir kez yüklenir. NumPy dizileri worker'lar tarafından sadece okunduğu için sayfalar
+# copy-on-write ile paylaşılır; bellek kullanımı worker sayısıyla doğrusal artmaz.
+# Devre dışı bırakmak için: GUNICORN_PRELOAD=0
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+
+# /metrics için worker metrik dosyalarının ortak dizini (app.py). Yapılandırma master'da app'ten önce
+# yüklendiği için dizin master başına ayrılır; önceki çalıştırmaların sayaçları karışmaz.
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"movie-rec-metrics-{os.getpid()}"))
+
+
+def when_ready(server):
+    """
+    Master hazır olduğunda (preload modunda app yüklendikten sonra) çalışır.
+    gc.freeze() yüklenen tüm nesneleri kalıcı nesil'e taşır; böylece worker'lardaki çöp
+    toplayıcı bu nesnelerin başlıklarına yazmaz ve paylaşılan sayfalar kirlenmez.
+    """
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+        server.log.info("Preload: model master'da yüklendi, %d nesne gc.freeze ile donduruldu.",
+                        gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    server.log.info("Worker başlatıldı (pid: %s, preload: %s)", worker.pid, preload_app)
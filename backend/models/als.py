@@ -0,0 +1,225 @@
+# Alternating Least Squares (ALS) eğiticisi: açık (explicit) puanlar ve örtük (implicit) geri bildirim
+#
+# SVD çözücüleriyle (models/solvers.py) aynı sözleşme:
+#   user_vectors (n_users x k), item_vectors (n_items x k); skor = item_vectors @ user_vector
+# Böylece predict, predict_batch ve save_model değişmeden çalışır.
+#
+# - 'als': Sadece gözlenen puanlar üzerinde en küçük kareler (boş hücreler 0 sayılmaz), ALS-WR
+#   düzenlileştirmesi (lambda * satırdaki puan sayısı; Zhou vd., 2008).
+# - 'implicit_als': Hu, Koren & Volinsky (2008). Tüm hücreler tercih 0/1 ile modele girer, gözlenen
+#   hücrelerin güveni c = 1 + alpha * puan. Y^T Y ortak terimi her adımda bir kez hesaplanır.
+import logging
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.utils import check_random_state
+
+logger = logging.getLogger(__name__)
+
+ALS_SOLVERS = ('als', 'implicit_als')
+ALS_METHODS = ('cg', 'exact')
+DEFAULT_CHUNK_ROWS = 4096 # Bir parçadaki (thread görevi) en fazla satır sayısı
+
+ALSResult = namedtuple('ALSResult', ['user_vectors', 'item_vectors', 'solver', 'params', 'history'])
+
+
+def _solve_rows_exact(block, fixed, initial, regularization, implicit, alpha, base_gram):
+    """
+    Bir satır bloğu için kesin çözüm: satır başına normal denklem matrisleri (k x k) toplanır ve
+    hepsi tek bir toplu np.linalg.solve ile çözülür. Maliyet puan başına O(k^2) + satır başına O(k^3).
+    """
+    k = fixed.shape[1]
+    identity = np.eye(k)
+    lhs = np.empty((block.shape[0], k, k))
+    rhs = np.empty((block.shape[0], k))
+    indptr, indices, data = block.indptr, block.indices, block.data
+    for i in range(block.shape[0]):
+        lo, hi = indptr[i], indptr[i + 1]
+        factors = fixed[indices[lo:hi]]
+        values = data[lo:hi].astype(np.float64)
+        if implicit:
+            confidence = alpha * values # c - 1
+            lhs[i] = base_gram + (factors.T * confidence) @ factors + regularization * identity
+            rhs[i] = factors.T @ (1.0 + confidence)
+        else:
+            lhs[i] = factors.T @ factors + regularization * max(hi - lo, 1) * identity
+            rhs[i] = factors.T @ values
+    return np.linalg.solve(lhs, rhs[:, :, None])[:, :, 0]
+
+
+def _solve_rows_cg(block, fixed, initial, regularization, implicit, alpha, base_gram, cg_steps=3):
+    """
+    Bir satır bloğu için eşlenik gradyan (CG; Takács vd., 2011) ile yaklaşık çözüm. Bloktaki tüm
+    satırların CG adımları vektörel yürütülür: A p çarpımı, puanların gözlendiği hücrelerde
+    (Y_u p_u) ve seyrek blok @ Y çarpımı olarak hesaplanır; satır başına k x k matris kurulmaz.
+    Önceki çözümden başlandığı için birkaç adım yeterlidir. Maliyet puan başına O(k).
+    """
+    n_rows = block.shape[0]
+    counts = np.diff(block.indptr)
+    # Puan başına karşı taraf vektörü (M x k). Sadece A p'nin gözlenen hücre terimi için kullanılır;
+    # float32 tutulması bellek trafiğini yarıya indirir (CG adımları yaklaşık zaten).
+    gathered = fixed[block.indices].astype(np.float32)
+    fixed32 = fixed.astype(np.float32)
+    values = block.data.astype(np.float64)
+    if implicit:
+        weights = alpha * values # c - 1
+        rhs = csr_matrix((1.0 + weights, block.indices, block.indptr), shape=block.shape) @ fixed
+        diagonal = np.full(n_rows, regularization)
+    else:
+        weights = np.ones_like(values)
+        rhs = csr_matrix((values, block.indices, block.indptr), shape=block.shape) @ fixed
+        diagonal = regularization * np.maximum(counts, 1)
+
+    def matvec(vectors):
+        repeated = np.repeat(vectors.astype(np.float32), counts, axis=0)
+        observed = np.einsum('ij,ij->i', gathered, repeated) * weights.astype(np.float32)
+        product = diagonal[:, None] * vectors
+        product += csr_matrix((observed, block.indices, block.indptr), shape=block.shape) @ fixed32
+        if implicit:
+            product += vectors @ base_gram
+        return product
+
+    solution = initial.copy()
+    residual = rhs - matvec(solution)
+    direction = residual.copy()
+    residual_sq = np.einsum('ij,ij->i', residual, residual)
+    for _ in range(cg_steps):
+        if residual_sq.max() < 1e-20:
+            break
+        product = matvec(direction)
+        curvature = np.einsum('ij,ij->i', direction, product)
+        step = np.divide(residual_sq, curvature, out=np.zeros_like(residual_sq), where=curvature > 0)
+        solution += step[:, None] * direction
+        residual -= step[:, None] * product
+        new_residual_sq = np.einsum('ij,ij->i', residual, residual)
+        beta = np.divide(new_residual_sq, residual_sq, out=np.zeros_like(residual_sq), where=residual_sq > 0)
+        direction = residual + beta[:, None] * direction
+        residual_sq = new_residual_sq
+    return solution
+
+
+def solve_rows(matrix, fixed, regularization, implicit=False, alpha=10.0, base_gram=None):
+    """
+    Verilen satırlar için karşı taraf (fixed) sabitken eğitimdeki en küçük kareler problemini kesin çözer
+    (models/fold_in.py'de yeni kullanıcı/film vektörleri için). implicit'te base_gram = fixed^T fixed.
+    """
+    fixed = np.asarray(fixed, dtype=np.float64)
+    if implicit and base_gram is None:
+        base_gram = fixed.T @ fixed
+    return _solve_rows_exact(csr_matrix(matrix), fixed, None, regularization, implicit, alpha, base_gram)
+
+
+def _row_chunks(matrix, chunk_rows, chunk_nnz):
+    """Satırları hem satır sayısı hem de puan sayısı (bellek) sınırını aşmayan parçalara böler."""
+    chunks = []
+    start = 0
+    indptr = matrix.indptr
+    while start < matrix.shape[0]:
+        limit = np.searchsorted(indptr, indptr[start] + chunk_nnz, side='right') - 1
+        end = min(max(limit, start + 1), start + chunk_rows, matrix.shape[0])
+        chunks.append((start, end))
+        start = end
+    return chunks
+
+
+def _half_step(matrix, fixed, out, executor, chunk_rows, regularization, implicit, alpha, method, cg_steps):
+    """Bir tarafın (kullanıcılar veya filmler) tüm satırlarını diğer taraf sabitken yeniden çözer."""
+    base_gram = fixed.T @ fixed if implicit else None
+    # CG, puan başına karşı taraf vektörlerini topladığı için parça puan sayısı k ile sınırlanır (~128 MB)
+    chunk_nnz = max(1, (128 * 1024 * 1024) // (8 * fixed.shape[1]))
+    chunks = _row_chunks(matrix, chunk_rows, chunk_nnz)
+
+    def solve(chunk):
+        start, end = chunk
+        lo, hi = matrix.indptr[start], matrix.indptr[end]
+        block = csr_matrix((matrix.data[lo:hi], matrix.indices[lo:hi], matrix.indptr[start:end + 1] - lo),
+                           shape=(end - start, matrix.shape[1]))
+        if method == 'cg':
+            out[start:end] = _solve_rows_cg(block, fixed, out[start:end], regularization, implicit, alpha,
+                                            base_gram, cg_steps)
+        else:
+            out[start:end] = _solve_rows_exact(block, fixed, out[start:end], regularization, implicit, alpha,
+                                               base_gram)
+
+    if executor is None:
+        for chunk in chunks:
+            solve(chunk)
+    else:
+        list(executor.map(solve, chunks))
+
+
+def fit_als(matrix, n_components, implicit=False, regularization=None, alpha=10.0, n_iter=15, tol=1e-4,
+            method='cg', cg_steps=3, n_jobs=None, chunk_rows=DEFAULT_CHUNK_ROWS, random_state=42,
+            user_init=None, item_init=None):
+    """
+    Kullanıcı-film matrisi üzerinde ALS ile latent vektörleri öğrenir.
+
+    Args:
+        matrix: Kullanıcı-film CSR matrisi (satır = kullanıcı).
+        n_components (int): Latent boyut.
+        implicit (bool): True ise örtük geri bildirim (güven ağırlıklı) ALS.
+        regularization (float): Düzenlileştirme katsayısı (varsayılan: explicit 0.05, implicit 0.1).
+        alpha (float): implicit için güven katsayısı (c = 1 + alpha * puan).
+        n_iter (int): En fazla iterasyon sayısı.
+        tol (float): Kullanıcı vektörlerindeki göreli değişim bunun altına inerse durulur.
+        method (str): 'cg' (toplu eşlenik gradyan, büyük veri için) veya 'exact' (toplu np.linalg.solve).
+        cg_steps (int): method='cg' için her yarım adımdaki CG adımı.
+        n_jobs (int): Thread sayısı (varsayılan: CPU sayısı).
+        user_init, item_init: Sıcak başlangıç (warm start) için başlangıç vektörleri.
+
+    Returns:
+        ALSResult: user_vectors, item_vectors (float32), solver adı, kullanılan parametreler ve
+        iterasyon geçmişi (göreli değişim, süre).
+    """
+    if method not in ALS_METHODS:
+        raise ValueError(f"Geçersiz ALS yöntemi: {method} (seçenekler: {ALS_METHODS})")
+    if regularization is None:
+        regularization = 0.1 if implicit else 0.05
+    n_jobs = n_jobs or os.cpu_count() or 1
+    user_items = csr_matrix(matrix)
+    item_users = user_items.T.tocsr()
+    n_users, n_items = user_items.shape
+
+    rng = check_random_state(random_state)
+    if item_init is not None:
+        item_vectors = np.array(item_init, dtype=np.float64)
+    else:
+        item_vectors = rng.normal(scale=0.01, size=(n_items, n_components))
+    if user_init is not None:
+        user_vectors = np.array(user_init, dtype=np.float64)
+    else:
+        user_vectors = rng.normal(scale=0.01, size=(n_users, n_components))
+
+    history = []
+    executor = ThreadPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+    try:
+        for iteration in range(n_iter):
+            start = time.perf_counter()
+            previous = user_vectors.copy()
+            _half_step(user_items, item_vectors, user_vectors, executor, chunk_rows, regularization, implicit, alpha,
+                       method, cg_steps)
+            _half_step(item_users, user_vectors, item_vectors, executor, chunk_rows, regularization, implicit, alpha,
+                       method, cg_steps)
+            change = float(np.linalg.norm(user_vectors - previous) / max(np.linalg.norm(previous), 1e-12))
+            history.append({'iteration': iteration + 1, 'relative_change': round(change, 8),
+                            'seconds': round(time.perf_counter() - start, 3)})
+            logger.info("  ALS iterasyon %d/%d: göreli değişim %.2e (%.2f sn)", iteration + 1, n_iter, change,
+                        history[-1]['seconds'])
+            if change < tol:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    params = {'regularization': regularization, 'n_iter': n_iter, 'tol': tol, 'method': method, 'n_jobs': n_jobs,
+              'chunk_rows': chunk_rows}
+    if method == 'cg':
+        params['cg_steps'] = cg_steps
+    if implicit:
+        params['alpha'] = alpha
+    return ALSResult(user_vectors.astype(np.float32), item_vectors.astype(np.float32),
+                     'implicit_als' if implicit else 'als', params, history)
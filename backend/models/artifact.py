@@ -0,0 +1,147 @@
+# Bellek eşlemeli (mmap), sıkıştırılmamış model dosya formatı
+#
+# Klasör düzeni:
+#   <model_klasörü>/
+#     manifest.json          # format sürümü, skaler alanlar ve dizi dosyalarının listesi
+#     user_vectors.npy       # ham NumPy dizileri (np.load(..., mmap_mode='r') ile açılır)
+#     rating_store.indptr.npy
+#     ...
+#     movie_titles.json      # dizi olmayan liste alanları
+#
+# Kullanım (eski joblib dosyasını dönüştürmek için, backend klasöründen):
+#   python models/artifact.py models/cf_svd_model_data_k20_v2.joblib models/cf_svd_model_data_k20_v2
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+import numpy as np
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def is_artifact_dir(path):
+    """Verilen yol bu formatta kaydedilmiş bir model klasörü mü?"""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILENAME))
+
+
+def _flatten(data, prefix, arrays, lists, scalars):
+    """İç içe sözlüğü noktalı anahtarlarla dizi/liste/skaler gruplarına ayırır."""
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+        elif isinstance(value, dict):
+            scalars[name] = {'__dict__': True}
+            _flatten(value, name + '.', arrays, lists, scalars)
+        elif isinstance(value, (list, tuple)):
+            lists[name] = list(value)
+        elif isinstance(value, np.generic):
+            scalars[name] = value.item()
+        else:
+            scalars[name] = value
+
+
+def _unflatten(flat):
+    """_flatten'in tersi: noktalı anahtarlardan iç içe sözlüğü yeniden kurar."""
+    result = {}
+    for name in sorted(flat, key=lambda n: n.count('.')):
+        value = flat[name]
+        parts = name.split('.')
+        target = result
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        if isinstance(value, dict) and value.get('__dict__'):
+            target.setdefault(parts[-1], {})
+        else:
+            target[parts[-1]] = value
+    return result
+
+
+def save_artifact_dir(model_data, path):
+    """
+    Model verisini (NumPy dizileri, listeler ve skalerler içeren iç içe sözlük) klasöre yazar.
+    Önce geçici bir klasöre yazılır, sonra yeniden adlandırılır; yarım kalmış bir klasör
+    çalışan bir worker tarafından okunmaz.
+    """
+    arrays, lists, scalars = {}, {}, {}
+    _flatten(model_data, '', arrays, lists, scalars)
+
+    path = os.path.abspath(path)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array, allow_pickle=False)
+    for name, values in lists.items():
+        with open(os.path.join(tmp_path, f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(values, f, ensure_ascii=False)
+
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'created_at': time.time(),
+        'scalars': scalars,
+        'arrays': {name: {'dtype': str(a.dtype), 'shape': list(a.shape)} for name, a in arrays.items()},
+        'lists': sorted(lists),
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Eski klasörü kenara al, yenisini yerine koy
+    old_path = None
+    if os.path.exists(path):
+        old_path = f"{path}.old-{os.getpid()}"
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    if old_path:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def load_artifact_dir(path, mmap_mode='r'):
+    """
+    save_artifact_dir ile yazılmış klasörü okur.
+
+    Args:
+        path (str): Model klasörü.
+        mmap_mode (str): np.load için mmap modu ('r' salt okunur paylaşımlı eşleme; None tamamen belleğe okur).
+
+    Returns:
+        tuple: (iç içe model verisi sözlüğü, manifest sözlüğü)
+    """
+    with open(os.path.join(path, MANIFEST_FILENAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Desteklenmeyen model klasörü format sürümü: {manifest.get('format_version')}")
+
+    flat = dict(manifest['scalars'])
+    for name in manifest['arrays']:
+        flat[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+    for name in manifest['lists']:
+        with open(os.path.join(path, f"{name}.json"), encoding='utf-8') as f:
+            flat[name] = json.load(f)
+    return _unflatten(flat), manifest
+
+
+def convert_joblib_artifact(joblib_path, output_dir):
+    """Eski joblib model dosyasını (örn. cf_svd_model_data_k20_v2.joblib) mmap klasör formatına çevirir."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_dir not in sys.path:
+        sys.path.append(backend_dir)
+    from models.collaborative_filter import CollaborativeFilteringModel
+
+    model = CollaborativeFilteringModel.load_model(joblib_path)
+    if model is None:
+        print(f"Hata: Dönüştürülecek model yüklenemedi: {joblib_path}")
+        return False
+    return model.save_model(output_dir)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit("Kullanım: python models/artifact.py <model.joblib> <çıktı_klasörü>")
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    sys.exit(0 if convert_joblib_artifact(sys.argv[1], sys.argv[2]) else 1)
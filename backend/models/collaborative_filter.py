@@ -2,17 +2,44 @@
 import pandas as pd
 import numpy as np
 from scipy.sparse import csr_matrix # Seyrek matrisler için
-from sklearn.decomposition import TruncatedSVD
-from sklearn.metrics.pairwise import cosine_similarity # Kosinüs benzerliği için import
 import joblib # Modeli kaydetmek/yüklemek için
 import os
 import sys # Test bloğunda path için
-from collections import defaultdict # Komşu filmlerini saymak için
+import time
+import hashlib
+import logging
+
+# models/ altındaki yardımcı modüller için path ayarlaması (app.py'den ve doğrudan çalıştırmada)
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND_DIR not in sys.path:
+    sys.path.append(_BACKEND_DIR)
+from models.neighbor_index import DEFAULT_INDEX_KIND, build_neighbor_index, neighbor_index_from_dict
+from models.rating_store import RatingStore
+from models.id_map import IdMap
+from models.artifact import is_artifact_dir, save_artifact_dir, load_artifact_dir
+from models.solvers import DEFAULT_SVD_SOLVER, fit_svd
+from models.als import ALS_SOLVERS, fit_als
+from models.fold_in import FoldInBuffer
+from models.item_similarity import DEFAULT_SIMILAR_K, ItemSimilarityIndex, build_item_similarity
+from models.quantization import DEFAULT_RERANK_FACTOR, QuantizedVectors
+
+logger = logging.getLogger(__name__)
 
 # Öneri modeli için bir sınıf oluşturmak daha düzenli olabilir
 N_COMPONENTS = 100
+# predict_batch'in tek seferde ayıracağı skor matrisi için bellek bütçesi (byte)
+BATCH_MEMORY_BUDGET = 256 * 1024 * 1024
+
+
+def _model_version(*parts):
+    """Eğitim/artifact kimliğinden kısa, worker'lar arasında aynı olan sürüm dizgisi."""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:12]
+
+
 class CollaborativeFilteringModel:
-    def __init__(self, n_components=N_COMPONENTS, random_state=42):
+    def __init__(self, n_components=N_COMPONENTS, random_state=42,
+                 neighbor_index_kind=DEFAULT_INDEX_KIND, neighbor_index_params=None,
+                 svd_solver=DEFAULT_SVD_SOLVER, solver_params=None):
         """
         Model yapılandırması.
 
@@ -20,138 +47,520 @@ class CollaborativeFilteringModel:
             n_components (int): SVD'de kullanılacak bileşen (gizli faktör) sayısı.
                                 Bu değer modelin karmaşıklığını ve performansını etkiler.
             random_state (int): Tekrarlanabilirlik için rastgelelik durumu.
+            neighbor_index_kind (str): Yeni kullanıcı komşu araması için indeks türü
+                                       ('exact' veya yaklaşık 'ivf').
+            neighbor_index_params (dict): İndeks parametreleri (ör. ivf için n_lists, n_probe).
+            svd_solver (str): Eğitimde kullanılacak çözücü: SVD için 'randomized', 'arpack' veya
+                              'block_krylov' (models/solvers.py); ALS için 'als' veya 'implicit_als'
+                              (models/als.py). fit'te ayrıca değiştirilebilir.
+            solver_params (dict): Çözücü parametreleri (ör. randomized için n_oversamples, n_iter).
         """
         self.n_components = n_components
         self.random_state = random_state
-        self.model = TruncatedSVD(n_components=self.n_components, random_state=self.random_state)
-        self.user_map = None # userId -> matris satır indexi
-        self.movie_map = None # movieId -> matris sütun indexi
-        self.movie_titles = None # movieId -> film başlığı eşleşmesi için
+        self.neighbor_index_kind = neighbor_index_kind
+        self.neighbor_index_params = neighbor_index_params or {}
+        self.neighbor_index = None # Kullanıcı vektörleri üzerinde komşu indeksi (fit/load_model'da kurulur)
+        self.item_similarity = None # Film-film en benzer K tablosu (çevrimdışı: models/item_similarity.py)
+        self.quantization = None # Skorlama için nicemlenmiş vektör türü: 'float16', 'int8' veya None (float64)
+        self.rerank_factor = DEFAULT_RERANK_FACTOR # Nicemlenmiş adayları tam hassasiyetle yeniden sıralama çarpanı
+        self.quantized_item_vectors = None # item_vectors'ın nicemlenmiş kopyası (models/quantization.py)
+        self.svd_solver = svd_solver
+        self.solver_params = solver_params or {}
+        self.singular_values = None # Son eğitimin tekil değerleri (büyükten küçüğe)
+        self.user_map = None # userId -> matris satır indexi (IdMap, sözlük gibi kullanılır)
+        self.movie_map = None # movieId -> matris sütun indexi (IdMap, sözlük gibi kullanılır)
+        self.item_titles = None # item index -> film başlığı (movie_ids ile hizalı object dizisi; yoksa None)
+        self.item_genre_masks = None # item index -> tür bit maskesi (uint32, movie_ids ile hizalı; set_item_genres)
+        self.genre_vocabulary = None # Tür adı -> bit (models/genres.py)
         self.user_vectors = None # Kullanıcı latent vektörleri
         self.item_vectors = None # Film latent vektörleri
-        self.user_rated_movies_with_ratings = None # Kullanıcıların oyladığı filmler ve verdikleri puanlar {user_id: {movie_id: rating}}
+        self.rating_store = None # Kullanıcıların oyladığı filmler ve puanlar (CSR, satır = user index)
         self.global_average_rating = None # Tüm veri setindeki ortalama puan
-        self.movie_map_inv = None # index -> movieId
-        self.user_map_inv = None # index -> userId
+        self.movie_ids = None # index -> movieId (NumPy dizisi, vektörel top-N için)
+        self.user_ids = None # index -> userId (NumPy dizisi)
+        self.artifact_manifest = None # Klasör formatından yüklendiyse manifest bilgisi
+        self.artifact_path = None # Yüklendiği model dosyası/klasörü
+        self.model_version = None # Eğitilen/yüklenen model sürümü (kullanıcı vektörü önbellekleri bununla geçersizleşir)
+        self.fold_in_seq = 0 # Dizilere yazılmış son fold-in günlüğü kaydı (utils/fold_in_journal.py; artifact'te saklanır)
+        self.fold_ins = FoldInBuffer(self) # Yeniden eğitim olmadan eklenen kullanıcı/filmler (compaction'a kadar)
+        self.stage_observer = None # (aşama, saniye) -> None; öneri aşamalarının süreleri (app.py metrik kaydına bağlar)
+
+    def _observe_stage(self, stage, started):
+        """started'dan (perf_counter) bu yana geçen süreyi stage_observer'a bildirir; yeni başlangıcı döndürür."""
+        now = time.perf_counter()
+        if self.stage_observer is not None:
+            self.stage_observer(stage, now - started)
+        return now
+
+    def _set_id_maps(self, user_ids, movie_ids):
+        """
+        index -> id dizilerinden user_map/movie_map (IdMap) ve movie_ids/user_ids dizilerini kurar.
+        predict her çağrıda sözlük/DataFrame kurmak yerine bu dizileri kullanır.
+        """
+        self.user_map = IdMap(user_ids)
+        self.movie_map = IdMap(movie_ids)
+        self.user_ids = self.user_map.ids
+        self.movie_ids = self.movie_map.ids
+
+    def build_neighbor_index(self, kind=None, **params):
+        """
+        user_vectors üzerinde komşu indeksini (yeniden) oluşturur.
+        kind/params verilmezse model yapılandırmasındaki değerler kullanılır.
+        """
+        if kind is not None:
+            self.neighbor_index_kind = kind
+            self.neighbor_index_params = params
+        logger.info("Komşu indeksi oluşturuluyor (tür: %s, parametreler: %s)...", self.neighbor_index_kind,
+                    self.neighbor_index_params)
+        self.neighbor_index = build_neighbor_index(self.user_vectors, self.neighbor_index_kind,
+                                                   **self.neighbor_index_params)
+        if self.quantization:
+            self._apply_quantization()
+
+    def quantize_vectors(self, kind, rerank_factor=DEFAULT_RERANK_FACTOR):
+        """
+        Skorlamayı nicemlenmiş vektörlere geçirir (isteğe bağlı, modelle birlikte kaydedilir):
+        predict/predict_batch film vektörlerini, komşu araması normalize kullanıcı vektörlerini
+        nicemlenmiş kopyadan tarar. rerank_factor > 0 ise en iyi n x rerank_factor aday float64
+        vektörlerle yeniden skorlanır. kind=None float64 skorlamaya döner.
+        Nicemlenmiş kopyalar float64 dizilere ek olarak tutulur: yerleşik bellek sadece mmap klasörlerinden
+        yüklenen modellerde düşer (bkz. models/quantization.py).
+        """
+        self.quantization = kind
+        self.rerank_factor = rerank_factor
+        if self.neighbor_index is None:
+            self.build_neighbor_index()
+        self._apply_quantization()
+
+    def _apply_quantization(self):
+        """Film vektörlerini ve komşu indeksinin taradığı vektörleri self.quantization türünde (yeniden) nicemler."""
+        kind = self.quantization
+        self.quantized_item_vectors = QuantizedVectors.quantize(self.item_vectors, kind) if kind else None
+        self.neighbor_index.quantize(kind, self.rerank_factor)
+        if kind:
+            logger.info("Vektörler nicemlendi (%s, re-rank x%d): film %.1f MB, komşu indeksi %.1f MB", kind,
+                        self.rerank_factor, self.quantized_item_vectors.nbytes / 1024**2,
+                        self.neighbor_index.quantized.nbytes / 1024**2)
+
+    def build_item_similarity(self, k=DEFAULT_SIMILAR_K, n_jobs=None, **params):
+        """item_vectors üzerinde film-film benzerlik indeksini (yeniden) hesaplar."""
+        self.item_similarity = build_item_similarity(self.item_vectors, k=k, n_jobs=n_jobs, **params)
+
+    def similar_items(self, movie_id, n=10, genre_filter=None):
+        """
+        Bir filme en benzer n film (önceden hesaplanmış indeksten, O(n)). genre_filter verilirse
+        indeksteki K komşudan filtreye uyanlar döner (n'den az olabilir).
+
+        Returns:
+            list: (movieId, title, kosinüs benzerliği) listesi; film modelde veya indekste yoksa None.
+        """
+        item_index = self.movie_map.get(movie_id) if self.movie_map is not None else None
+        if self.item_similarity is None or item_index is None or item_index >= self.item_similarity.n_items:
+            return None
+        if genre_filter:
+            indices, similarities = self.item_similarity.similar(item_index)
+            allowed = ~self._genre_blocked(genre_filter)[indices]
+            indices, similarities = indices[allowed][:n], similarities[allowed][:n]
+        else:
+            indices, similarities = self.item_similarity.similar(item_index, n)
+        titles = self.item_titles[indices].tolist() if self.item_titles is not None else [None] * len(indices)
+        return [(movie_id, title, float(similarity))
+                for movie_id, title, similarity in zip(self.movie_ids[indices].tolist(), titles, similarities.tolist())
+                if title is not None]
+
+    def _rated_item_indices(self, user_id):
+        """Kullanıcının oyladığı filmlerin matris sütun indexlerini döndürür (fold-in edilmiş kullanıcılar dahil)."""
+        pending = self.fold_ins.users.get(user_id)
+        if pending is not None:
+            return pending.item_indices
+        return self.rating_store.row_indices(self.user_map[user_id])
+
+    def _user_vector(self, user_id):
+        """Kullanıcının latent vektörü; bekleyen fold-in kaydı modeldeki satırdan önceliklidir."""
+        pending = self.fold_ins.users.get(user_id)
+        if pending is not None:
+            return pending.vector
+        return self.user_vectors[self.user_map[user_id], :]
+
+    def has_user(self, user_id):
+        """Kullanıcı modelde veya bekleyen fold-in kayıtlarında var mı?"""
+        return user_id in self.fold_ins.users or user_id in self.user_map
+
+    # --- Fold-in (yeniden eğitim olmadan güncelleme; bkz. models/fold_in.py) ---
+    def fold_in_user(self, user_id, ratings_dict, replace=False):
+        """
+        Kullanıcının {movieId: puan} puanlarını latent uzaya ekler (yeni kullanıcı veya mevcut kullanıcının
+        güncellenmesi). Sonuç predict ve predict_batch'te hemen kullanılır; compaction'da dizilere yazılır.
+        Sadece bu süreçteki tampona yazar; servis tarafında fold-in'ler günlük üzerinden uygulanır (app.py).
+
+        Returns:
+            np.ndarray: Kullanıcı vektörü; modeldeki filmlere geçerli puan yoksa None.
+        """
+        pending = self.fold_ins.fold_in_user(user_id, ratings_dict, replace=replace)
+        return None if pending is None else pending.vector
+
+    def fold_in_item(self, movie_id, title=None, ratings_by_user=None, genre_mask=0):
+        """
+        Modelde olmayan bir filmi, ona puan vermiş (bekleyen veya verilen) kullanıcılardan latent uzaya ekler.
+        Film, compaction'dan sonra önerilerde görünür.
+        """
+        return self.fold_ins.fold_in_item(movie_id, title=title, ratings_by_user=ratings_by_user,
+                                          genre_mask=genre_mask)
+
+    def compact_fold_ins(self):
+        """
+        Bekleyen fold-in kayıtlarının dizilere yazıldığı yeni model (bu model değişmez; bkz. FoldInBuffer.compacted_model).
+
+        Returns:
+            tuple: (yeni model veya bekleyen kayıt yoksa None, özet)
+        """
+        return self.fold_ins.compacted_model()
+
+    @staticmethod
+    def _top_n_indices(scores, n):
+        """
+        Skor dizisinden en yüksek n elemanın indexlerini büyükten küçüğe döndürür.
+        Tam sıralama yerine np.argpartition kullanılır (O(N) seçim + küçük bir sıralama).
+        Eşit skorlar deterministik olarak küçük index (küçük movieId) önce gelecek şekilde sıralanır.
+        -inf skorlu (maskelenmiş) elemanlar sonuçlara alınmaz.
+        """
+        n = min(n, len(scores))
+        if n <= 0:
+            return np.empty(0, dtype=np.int64)
+        if n < len(scores):
+            # n. en büyük skoru bul, sınırdaki eşitlikleri de kapsayacak şekilde adayları al
+            kth_score = -np.partition(-scores, n - 1)[n - 1]
+            candidates = np.flatnonzero(scores >= kth_score)
+        else:
+            candidates = np.arange(len(scores))
+        top = candidates[np.lexsort((candidates, -scores[candidates]))][:n]
+        return top[np.isfinite(scores[top])]
+
+    def set_item_titles(self, titles):
+        """
+        Film başlıklarını item index sırasında atar (movie_ids ile hizalı). Uygulama, film kataloğu
+        yüklendiğinde başlıkları katalogdan verir: MovieCatalog.titles_for(model.movie_ids).
+        """
+        titles = np.asarray(titles, dtype=object)
+        titles[pd.isna(titles)] = None
+        self.item_titles = titles
+
+    def set_item_genres(self, genre_masks, vocabulary):
+        """
+        Tür bit maskelerini item index sırasında atar (movie_ids ile hizalı). Uygulama, film kataloğu
+        yüklendiğinde maskeleri katalogdan verir: MovieCatalog.genre_masks_for(model.movie_ids).
+        """
+        self.item_genre_masks = np.asarray(genre_masks, dtype=np.uint32)
+        self.genre_vocabulary = vocabulary
+
+    def _genre_blocked(self, genre_filter):
+        """
+        Tür filtresine uymayan filmler (boolean, item index sırasında); filtre yoksa None.
+
+        Raises:
+            ValueError: Filtre verildi ama modelde tür maskeleri yoksa.
+        """
+        if not genre_filter:
+            return None
+        if self.item_genre_masks is None:
+            raise ValueError("Tür filtresi için film türleri yüklenmemiş (set_item_genres).")
+        return genre_filter.blocked(self.item_genre_masks)
+
+    def _use_ratings_matrix(self, ratings):
+        """
+        utils/preprocess.load_ratings_matrix ile akışlı olarak hazırlanmış RatingsMatrix'i kullanır.
+        Matris zaten kodlanmış olduğu için DataFrame, kategori kodları veya kopya oluşturulmaz.
+        """
+        logger.info("Hazır puan matrisi (RatingsMatrix) kullanılıyor...")
+        self._set_id_maps(ratings.user_ids, ratings.movie_ids)
+        if ratings.item_titles is not None:
+            self.set_item_titles(ratings.item_titles)
+        self.global_average_rating = ratings.global_average_rating
+        logger.info("Global ortalama puan: %.2f", self.global_average_rating)
+        self.rating_store = RatingStore.from_csr(ratings.matrix)
+        logger.info("%d kullanıcı için oylama geçmişi (puanlarla) oluşturuldu (%d puan, %.1f MB).",
+                    self.rating_store.n_users, self.rating_store.nnz, self.rating_store.nbytes / 1024 / 1024)
+        return ratings.matrix
 
     def _create_user_movie_data(self, df):
         """
         DataFrame'i işler, matrisi oluşturur ve gerekli haritalamaları yapar.
-        Ayrıca ters haritalamaları ve film başlıklarını da burada oluşturur.
+        Ayrıca index -> id dizilerini ve film başlıklarını da burada oluşturur.
+        df bir RatingsMatrix ise (büyük veri setleri için akışlı yükleme) doğrudan o kullanılır.
         """
-        print("Kullanıcı-Film verisi ve matrisi işleniyor...")
-        df['user_code'] = df['userId'].astype('category').cat.codes
-        df['movie_code'] = df['movieId'].astype('category').cat.codes
-
-        # Haritalamaları oluştur
-        user_map_cat = dict(enumerate(df['userId'].astype('category').cat.categories))
-        movie_map_cat = dict(enumerate(df['movieId'].astype('category').cat.categories))
-        self.user_map = {v: k for k, v in user_map_cat.items()}
-        self.movie_map = {v: k for k, v in movie_map_cat.items()}
-        
-        # Ters haritalamaları oluştur ve ata
-        self.user_map_inv = {v: k for k, v in self.user_map.items()} # Direkt user_map'ten ters çevir
-        self.movie_map_inv = {v: k for k, v in self.movie_map.items()} # Direkt movie_map'ten ters çevir
-        print("Ters haritalamalar (user_map_inv, movie_map_inv) oluşturuldu.")
+        if not isinstance(df, pd.DataFrame):
+            return self._use_ratings_matrix(df)
+        logger.info("Kullanıcı-Film verisi ve matrisi işleniyor...")
+        user_categories = df['userId'].astype('category')
+        movie_categories = df['movieId'].astype('category')
+        df['user_code'] = user_categories.cat.codes
+        df['movie_code'] = movie_categories.cat.codes
+
+        # Haritalamaları oluştur (kategori sırası = matris indexi)
+        self._set_id_maps(user_categories.cat.categories.to_numpy(dtype=np.int64),
+                          movie_categories.cat.categories.to_numpy(dtype=np.int64))
+        logger.info("Haritalamalar (user_map, movie_map, movie_ids) oluşturuldu.")
 
         sparse_matrix = csr_matrix((df['rating'], (df['user_code'], df['movie_code'])), shape=(len(self.user_map), len(self.movie_map)))
-        print(f"Kullanıcı-Film matrisi oluşturuldu. Boyut: {sparse_matrix.shape}")
+        logger.info("Kullanıcı-Film matrisi oluşturuldu. Boyut: %s", sparse_matrix.shape)
         
-        # Film başlıklarını oluştur ve ata
-        self.movie_titles = df.set_index('movieId')['title'].drop_duplicates().to_dict()
-        print(f"Film başlıkları (movie_titles) oluşturuldu. Toplam {len(self.movie_titles)} başlık.")
+        # Film başlıklarını item index sırasında oluştur ve ata
+        titles = df.drop_duplicates('movieId').set_index('movieId')['title']
+        self.set_item_titles(titles.reindex(self.movie_ids).to_numpy(dtype=object))
+        logger.info("Film başlıkları (item_titles) oluşturuldu. Toplam %d başlık.", len(self.item_titles))
         
         # Global ortalama puanı hesaplama
         self.global_average_rating = df['rating'].mean()
-        print(f"Global ortalama puan: {self.global_average_rating:.2f}")
+        logger.info("Global ortalama puan: %.2f", self.global_average_rating)
 
-        # Kullanıcıların oyladığı filmleri ve puanları saklayan sözlük
-        print("Kullanıcıların oyladığı filmler ve puanlar haritası oluşturuluyor...")
-        grouped = df.groupby('userId')[['movieId', 'rating']].apply(lambda x: dict(zip(x['movieId'], x['rating']))).to_dict()
-        self.user_rated_movies_with_ratings = grouped
-        print(f"{len(self.user_rated_movies_with_ratings)} kullanıcı için oylama geçmişi (puanlarla) oluşturuldu.")
+        # Kullanıcıların oyladığı filmleri ve puanları saklayan CSR deposu
+        logger.info("Kullanıcıların oyladığı filmler ve puanlar deposu (CSR) oluşturuluyor...")
+        self.rating_store = RatingStore.from_codes(df['user_code'].to_numpy(), df['movie_code'].to_numpy(),
+                                                   df['rating'].to_numpy(), len(self.user_map))
+        logger.info("%d kullanıcı için oylama geçmişi (puanlarla) oluşturuldu (%d puan, %.1f MB).",
+                    self.rating_store.n_users, self.rating_store.nnz, self.rating_store.nbytes / 1024 / 1024)
 
         return sparse_matrix
 
-    def fit(self, df):
+    def _warm_start_vectors(self, old_ids, old_vectors, new_ids):
+        """
+        Önceki eğitimin vektörlerini yeni index sırasına taşır (id'ye göre). Yeni id'ler için küçük
+        rastgele değerler kullanılır. Boyut uyuşmuyorsa None (soğuk başlangıç).
+        """
+        if old_vectors is None or old_vectors.shape[1] != self.n_components:
+            return None
+        rows = IdMap(old_ids).lookup(new_ids)
+        rng = np.random.default_rng(self.random_state)
+        vectors = rng.normal(scale=0.01, size=(len(new_ids), self.n_components))
+        vectors[rows >= 0] = old_vectors[rows[rows >= 0]]
+        return vectors
+
+    def fit(self, df, solver=None, warm_start=False, **solver_params):
         """
         Modeli eğitir ve gerekli vektörleri/haritaları saklar.
         _create_user_movie_data çağrıldığı için haritalar burada oluşur.
+
+        Args:
+            df: load_and_prepare_data'nın DataFrame'i veya load_ratings_matrix'in RatingsMatrix'i.
+            solver (str): Bu eğitim için çözücü; verilmezse model yapılandırmasındaki (svd_solver).
+            warm_start (bool): ALS çözücülerinde, modelin mevcut vektörlerinden (id'ye göre eşlenerek)
+                               başlar; yeni veriyle yeniden eğitim birkaç iterasyonda yakınsar.
+            **solver_params: Çözücü parametreleri; verilirse yapılandırmadakilerin yerine geçer.
         """
+        if solver is not None:
+            self.svd_solver = solver
+            self.solver_params = solver_params
+        elif solver_params:
+            self.solver_params = solver_params
+        previous = (self.user_ids, self.user_vectors, self.movie_ids, self.item_vectors) if warm_start else None
         user_movie_matrix = self._create_user_movie_data(df)
-        print(f"{self.n_components} bileşenli TruncatedSVD modeli eğitiliyor...")
-        self.user_vectors = self.model.fit_transform(user_movie_matrix)
-        self.item_vectors = self.model.components_.T
-        print("Model eğitimi ve vektör dönüşümü tamamlandı.")
-        # _create_user_movie_data içinde zaten user_map_inv, movie_map_inv ve movie_titles atandı.
+        logger.info("%d bileşenli model eğitiliyor (çözücü: %s, parametreler: %s)...", self.n_components,
+                    self.svd_solver, self.solver_params)
+        start = time.perf_counter()
+        if self.svd_solver in ALS_SOLVERS:
+            init = {}
+            if previous is not None and previous[1] is not None:
+                init = {'user_init': self._warm_start_vectors(previous[0], previous[1], self.user_ids),
+                        'item_init': self._warm_start_vectors(previous[2], previous[3], self.movie_ids)}
+                logger.info("Önceki vektörlerden sıcak başlangıç yapılıyor.")
+            result = fit_als(user_movie_matrix, self.n_components, implicit=self.svd_solver == 'implicit_als',
+                             random_state=self.random_state, **init, **self.solver_params)
+            self.user_vectors = result.user_vectors
+            self.item_vectors = result.item_vectors
+            self.singular_values = None
+        else:
+            result = fit_svd(user_movie_matrix, self.n_components, solver=self.svd_solver,
+                             random_state=self.random_state, **self.solver_params)
+            self.user_vectors = result.user_vectors
+            self.item_vectors = result.components.T
+            self.singular_values = result.singular_values
+        self.solver_params = result.params
+        logger.info("Model eğitimi ve vektör dönüşümü tamamlandı (%.2f sn).", time.perf_counter() - start)
+        self.model_version = _model_version(time.time(), self.svd_solver, self.user_vectors.shape,
+                                            self.item_vectors.shape)
+        self.build_neighbor_index()
+        self.item_similarity = None # Film indexleri değişti; benzerlik indeksi çevrimdışı yeniden hesaplanmalı
+        # _create_user_movie_data içinde zaten haritalamalar ve item_titles atandı.
         del user_movie_matrix
 
-    def predict(self, user_id, n_recommendations=10):
+    def predict(self, user_id, n_recommendations=10, genre_filter=None):
         """
         Latent vektörleri kullanarak belirli bir kullanıcı için film önerileri üretir.
+        genre_filter (models/genres.GenreFilter) verilirse sadece filtreye uyan filmler önerilir.
         """
-        if user_id not in self.user_map:
-            print(f"Hata: Kullanıcı ID {user_id} modelde bulunamadı.")
+        if not self.has_user(user_id):
+            logger.info("Kullanıcı ID %s modelde bulunamadı.", user_id)
             return []
         if self.user_vectors is None or self.item_vectors is None:
-            print("Hata: Model vektörleri (user/item) yüklenmemiş veya eğitilmemiş.")
+            logger.error("Model vektörleri (user/item) yüklenmemiş veya eğitilmemiş.")
             return []
 
-        print(f"{user_id} için öneriler hesaplanıyor (vektörler kullanılarak)...")
-        user_index = self.user_map[user_id]
-        user_vector = self.user_vectors[user_index, :] # İlgili kullanıcının latent vektörü
-
-        # Kullanıcı vektörü ile tüm film vektörlerinin nokta çarpımını hesapla
-        scores = user_vector.dot(self.item_vectors.T)
-
-        # Skorları movieId ile eşleştir (movie_map'in tersi lazım)
-        # movie_map: movieId -> index ; movie_map_inv: index -> movieId
-        movie_map_inv = {v: k for k, v in self.movie_map.items()}
-        movie_indices = np.arange(len(scores))
-        movie_ids = [movie_map_inv[i] for i in movie_indices] # Tüm film ID'leri
-
-        # DataFrame oluştur
-        score_df = pd.DataFrame({'movieId': movie_ids, 'score': scores})
-
-        # Kullanıcının zaten oy verdiği filmleri filtrele
-        rated_movies_dict = self.user_rated_movies_with_ratings.get(user_id, {})
-        rated_movies_set = set(rated_movies_dict.keys())
-        recommendations = score_df[~score_df['movieId'].isin(rated_movies_set)]
-
-        # En yüksek skora sahip N filmi al
-        recommendations = recommendations.nlargest(n_recommendations, 'score')
-
-        # Film başlıklarını ekle
-        recommendations['title'] = recommendations['movieId'].map(self.movie_titles)
+        logger.debug("%s için öneriler hesaplanıyor (vektörler kullanılarak)...", user_id)
+        started = time.perf_counter()
+        user_vector = self._user_vector(user_id) # İlgili kullanıcının latent vektörü
+        top_indices, top_scores = self._top_items(user_vector, self._rated_item_indices(user_id), n_recommendations,
+                                                  blocked=self._genre_blocked(genre_filter))
+        started = self._observe_stage('scoring', started)
+        top_movie_ids = self.movie_ids[top_indices]
+
+        # (movieId, title, score) tuple listesi döndür
+        recommendations = [
+            (int(movie_id), title, float(score))
+            for movie_id, title, score in zip(top_movie_ids.tolist(), self.item_titles[top_indices].tolist(),
+                                              top_scores.tolist())
+        ]
+        self._observe_stage('title_join', started)
+        logger.debug("%s için %d öneri bulundu.", user_id, len(recommendations))
+        return recommendations
+
+    def _top_items(self, user_vector, rated_indices, n, blocked=None):
+        """
+        Kullanıcı vektörüne göre oylanmamış (ve blocked maskesinde olmayan) filmler arasından en yüksek skorlu n film.
+        Nicemleme açıksa skorlar nicemlenmiş film vektörlerinden (float32) hesaplanır ve adaylar
+        (rerank_factor > 0 ise) float64 vektörlerle yeniden skorlanır.
 
-        print(f"{user_id} için öneriler:")
-        print(recommendations[['movieId', 'title', 'score']])
+        Returns:
+            tuple: (item indexleri, skorlar) - büyükten küçüğe.
+        """
+        if self.quantized_item_vectors is None:
+            # Kullanıcı vektörü ile tüm film vektörlerinin nokta çarpımını hesapla
+            scores = self.item_vectors.dot(user_vector)
+        else:
+            scores = self.quantized_item_vectors.matmul(user_vector)
+        # Kullanıcının zaten oy verdiği ve tür filtresine uymayan filmleri -inf ile maskele
+        scores[rated_indices] = -np.inf
+        if blocked is not None:
+            scores[blocked] = -np.inf
+        if self.quantized_item_vectors is None or not self.rerank_factor:
+            # En yüksek skora sahip N filmi al (tam sıralama yerine argpartition)
+            top_indices = self._top_n_indices(scores, n)
+            return top_indices, scores[top_indices].astype(np.float64)
+        candidates = np.sort(self._top_n_indices(scores, n * self.rerank_factor))
+        exact = self.item_vectors[candidates].dot(user_vector)
+        top = self._top_n_indices(exact, n)
+        return candidates[top], exact[top]
+
+    def predict_batch(self, user_ids, n_recommendations=10, max_batch_bytes=BATCH_MEMORY_BUDGET, genre_filter=None):
+        """
+        Birden fazla mevcut kullanıcı için önerileri tek seferde üretir.
+        Kullanıcılar parçalara (chunk) bölünür; her parça tek bir matris çarpımı
+        (user_vectors[idx] @ item_vectors.T) ile skorlanır. Parça boyutu, skor
+        matrisi ve argpartition index matrisinin max_batch_bytes'ı aşmayacağı şekilde seçilir.
+        Nicemleme açıksa skorlar nicemlenmiş film vektörlerinden hesaplanır; her satırın
+        k x rerank_factor adayı float64 vektörlerle yeniden skorlanır.
 
-        # Sadece film ID listesi döndürelim (API için daha uygun olabilir)
-        # return recommendations['movieId'].tolist()
-        # Veya daha fazla bilgi: (movieId, title, score) tuple listesi
-        return list(recommendations.itertuples(index=False, name=None))
+        Args:
+            user_ids (iterable): Öneri üretilecek userId'ler.
+            n_recommendations (int): Kullanıcı başına öneri sayısı.
+            max_batch_bytes (int): Bir parçanın geçici matrisleri için bellek bütçesi.
+            genre_filter (GenreFilter): Verilirse sadece filtreye uyan filmler önerilir.
 
-    def predict_for_new_user(self, ratings_dict, n_recommendations=10, k_neighbors=50, rating_threshold=3.5):
+        Returns:
+            dict: {userId: [(movieId, title, score), ...]}. Modelde olmayan kullanıcılar için boş liste.
+        """
+        if self.user_vectors is None or self.item_vectors is None:
+            logger.error("Model vektörleri (user/item) yüklenmemiş veya eğitilmemiş.")
+            return {}
+
+        started = time.perf_counter()
+        results = {}
+        known_user_ids = []
+        for user_id in user_ids:
+            if self.has_user(user_id):
+                known_user_ids.append(user_id)
+            else:
+                results[user_id] = []
+
+        n_items = self.item_vectors.shape[0]
+        k = min(n_recommendations, n_items)
+        if k <= 0 or not known_user_ids:
+            for user_id in known_user_ids:
+                results[user_id] = []
+            return results
+
+        # Satır başına: float64 skor + int64 argpartition indexi
+        rows_per_chunk = max(1, int(max_batch_bytes // (n_items * 16)))
+        item_vectors_t = self.item_vectors.T
+        quantized = self.quantized_item_vectors
+        rerank = quantized is not None and self.rerank_factor > 0
+        blocked = self._genre_blocked(genre_filter)
+        k_select = min(k * self.rerank_factor, n_items) if rerank else k
+        logger.debug("%d kullanıcı için toplu öneri hesaplanıyor (parça boyutu: %d)...", len(known_user_ids),
+                     rows_per_chunk)
+
+        for start in range(0, len(known_user_ids), rows_per_chunk):
+            chunk_user_ids = known_user_ids[start:start + rows_per_chunk]
+            if self.fold_ins.users:
+                chunk_vectors = np.vstack([self._user_vector(u) for u in chunk_user_ids])
+            else:
+                user_indices = np.fromiter((self.user_map[u] for u in chunk_user_ids), dtype=np.int64,
+                                           count=len(chunk_user_ids))
+                chunk_vectors = self.user_vectors[user_indices]
+            scores = chunk_vectors @ item_vectors_t if quantized is None else quantized.matmul(chunk_vectors)
+
+            # Oylanmış filmleri tek bir fancy-index ataması ile maskele
+            rated = [self._rated_item_indices(u) for u in chunk_user_ids]
+            rows = np.repeat(np.arange(len(chunk_user_ids)), [len(r) for r in rated])
+            cols = np.concatenate(rated) if rated else np.empty(0, dtype=np.int64)
+            scores[rows, cols] = -np.inf
+            if blocked is not None:
+                scores[:, blocked] = -np.inf
+
+            # Satır bazında top-k: yerinde negatifle, argpartition, sonra sadece k elemanı sırala
+            np.negative(scores, out=scores)
+            if k_select < n_items:
+                top = np.argpartition(scores, k_select - 1, axis=1)[:, :k_select]
+            else:
+                top = np.broadcast_to(np.arange(n_items), scores.shape)
+            top_scores = -np.take_along_axis(scores, top, axis=1)
+            if rerank:
+                # Adayları float64 vektörlerle yeniden skorla (maskelenmiş adaylar -inf kalır)
+                top = np.sort(top, axis=1)
+                masked = ~np.isfinite(-np.take_along_axis(scores, top, axis=1))
+                top_scores = np.einsum('ij,ikj->ik', chunk_vectors, self.item_vectors[top])
+                top_scores[masked] = -np.inf
+            top_scores = top_scores.astype(np.float64)
+            order = np.argsort(-top_scores, axis=1, kind='stable')[:, :k]
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            top_movie_ids = self.movie_ids[top]
+            top_titles = self.item_titles[top]
+
+            for row, user_id in enumerate(chunk_user_ids):
+                finite = np.isfinite(top_scores[row])
+                results[user_id] = [
+                    (int(movie_id), title, float(score))
+                    for movie_id, title, score in zip(top_movie_ids[row][finite].tolist(),
+                                                      top_titles[row][finite].tolist(),
+                                                      top_scores[row][finite].tolist())
+                ]
+            del scores, top
+
+        self._observe_stage('batch_scoring', started)
+        return results
+
+    def predict_for_new_user(self, ratings_dict, n_recommendations=10, k_neighbors=50, rating_threshold=3.5,
+                             user_vector=None, genre_filter=None):
         """
         Yeni bir kullanıcının puanlarına göre, benzer kullanıcıları bularak öneri üretir.
         Öneri skoru, komşuların filme verdiği puanların benzerlik ağırlıklı ortalamasıdır.
         ratings_dict: {movieId: rating} formatında.
         k_neighbors: Benzerlik için dikkate alınacak komşu sayısı.
         rating_threshold: Komşuların bir filmi önermesi için vermesi gereken min puan.
+        user_vector: Kullanıcının fold-in ile hesaplanmış vektörü (fold_in_user); verilirse komşu araması
+                     geçici vektör yerine bununla yapılır.
+        genre_filter: Verilirse sadece filtreye uyan filmler önerilir (models/genres.GenreFilter).
         """
-        if self.item_vectors is None or self.user_vectors is None or not self.movie_map or not self.user_map or not self.user_rated_movies_with_ratings or self.global_average_rating is None:
-            print("Hata: Model vektörleri veya haritalamalar yüklenmemiş veya global ortalama yüklenmemiş.")
+        if self.item_vectors is None or self.user_vectors is None or not self.movie_map or not self.user_map or self.rating_store is None or self.global_average_rating is None:
+            logger.error("Model vektörleri veya haritalamalar yüklenmemiş veya global ortalama yüklenmemiş.")
             return []
-        if not self.user_map_inv:
-             print("Hata: user_map_inv modelde bulunamadı.")
-             return []
 
-        print(f"Kullanıcı tabanlı öneriler hesaplanıyor (k={k_neighbors}, threshold={rating_threshold}): {ratings_dict}")
+        logger.debug("Kullanıcı tabanlı öneriler hesaplanıyor (k=%d, threshold=%s): %s", k_neighbors, rating_threshold,
+                     ratings_dict)
 
         # 1. Geçerli movieId'leri ve normalize edilmiş puanları al
+        started = time.perf_counter()
         valid_ratings_normalized = []
-        rated_movie_ids = set()
         for movie_id, rating in ratings_dict.items():
             try:
                 movie_id = int(movie_id)
@@ -159,106 +568,92 @@ class CollaborativeFilteringModel:
                     item_index = self.movie_map[movie_id]
                     normalized_rating = float(rating) - self.global_average_rating
                     valid_ratings_normalized.append((item_index, normalized_rating))
-                    rated_movie_ids.add(movie_id)
             except (ValueError, TypeError):
-                print(f"Uyarı: Geçersiz film ID'si veya puan formatı: {movie_id} -> {rating}. Atlanıyor.")
+                logger.warning("Geçersiz film ID'si veya puan formatı: %s -> %s. Atlanıyor.", movie_id, rating)
                 continue
 
         if not valid_ratings_normalized:
-            print("Hata: Yeni kullanıcının puanladığı ve modelde bulunan geçerli film bulunamadı.")
+            logger.info("Yeni kullanıcının puanladığı ve modelde bulunan geçerli film bulunamadı.")
             return []
 
-        # 2. Geçici kullanıcı vektörünü oluştur
-        temp_user_vector = np.zeros(self.n_components)
-        total_absolute_weight = 0
-        for item_index, norm_rating in valid_ratings_normalized:
-            weight = abs(norm_rating)
-            temp_user_vector += norm_rating * self.item_vectors[item_index, :]
-            total_absolute_weight += weight
-
-        if total_absolute_weight > 0:
-            norm = np.linalg.norm(temp_user_vector)
-            if norm > 0:
-                temp_user_vector /= norm
+        started = self._observe_stage('id_translation', started)
+
+        # 2. Geçici kullanıcı vektörünü oluştur (fold-in vektörü verildiyse o kullanılır)
+        if user_vector is not None and np.any(user_vector):
+            temp_user_vector = np.asarray(user_vector, dtype=np.float64)
+        else:
+            temp_user_vector = np.zeros(self.n_components)
+            total_absolute_weight = 0
+            for item_index, norm_rating in valid_ratings_normalized:
+                weight = abs(norm_rating)
+                temp_user_vector += norm_rating * self.item_vectors[item_index, :]
+                total_absolute_weight += weight
+
+            if total_absolute_weight > 0:
+                norm = np.linalg.norm(temp_user_vector)
+                if norm > 0:
+                    temp_user_vector /= norm
+                else:
+                    logger.warning("Geçici kullanıcı vektörü sıfır normuna sahip. Benzerlik hesaplanamaz.")
+                    return []
             else:
-                print("Uyarı: Geçici kullanıcı vektörü sıfır normuna sahip. Benzerlik hesaplanamaz.")
+                logger.warning("Geçici kullanıcı vektörü için ağırlık toplamı sıfır. Benzerlik hesaplanamaz.")
                 return []
-        else:
-            print("Uyarı: Geçici kullanıcı vektörü için ağırlık toplamı sıfır. Benzerlik hesaplanamaz.")
-            return []
-
-        # 3. Benzer Kullanıcıları Bulma
-        temp_user_vector_reshaped = temp_user_vector.reshape(1, -1)
-        similarities = cosine_similarity(temp_user_vector_reshaped, self.user_vectors)
-        user_similarity_scores = list(enumerate(similarities[0]))
-        user_similarity_scores.sort(key=lambda x: x[1], reverse=True)
-        top_k_neighbors = user_similarity_scores[:k_neighbors]
-        print(f"En benzer {len(top_k_neighbors)} komşu bulundu (max {k_neighbors}).")
-
-        # 4. Komşuların Puanlarına Göre Film Skorlarını Hesaplama (ESKİ YÖNTEM: Benzerlik Toplamı)
-        recommended_movie_scores = defaultdict(float) # {movieId: toplam_benzerlik_skoru}
-        recommendation_counts = defaultdict(int)    # {movieId: öneren_komşu_sayısı}
-
-        print("\n--- Komşu Analizi (neighbor_idx, similarity) ---")
-        for neighbor_idx, neighbor_similarity in top_k_neighbors:
-            if neighbor_similarity <= 0:
-                continue
-
-            neighbor_user_id = self.user_map_inv.get(neighbor_idx)
-            if neighbor_user_id is None:
-                continue
-
-            neighbor_ratings = self.user_rated_movies_with_ratings.get(neighbor_user_id, {})
-
-            for movie_id, rating in neighbor_ratings.items():
-                if movie_id in rated_movie_ids:
-                    continue
-
-                # Eşik değere göre filtreleme (Opsiyonel ama performansı artırabilir)
-                if rating < rating_threshold:
-                    continue
-
-                # Filme ait skora komşunun sadece BENZERLİK skorunu ekle.
-                recommended_movie_scores[movie_id] += neighbor_similarity
-                recommendation_counts[movie_id] += 1
 
-        if not recommended_movie_scores:
-             print("Filtreleme sonrası komşulardan önerilebilecek yeni film bulunamadı.")
+        started = self._observe_stage('user_vector', started)
+
+        # 3. Benzer Kullanıcıları Bulma (komşu indeksi ile, tam sıralama olmadan)
+        if self.neighbor_index is None:
+            self.build_neighbor_index()
+        neighbor_indices, neighbor_similarities = self.neighbor_index.search(temp_user_vector, k_neighbors)
+        started = self._observe_stage('neighbor_search', started)
+        logger.debug("En benzer %d komşu bulundu (max %d).", len(neighbor_indices), k_neighbors)
+
+        # 4. Komşuların Puanlarına Göre Film Skorlarını Hesaplama (Benzerlik Toplamı)
+        # Skor(film) = eşiği geçen puan veren pozitif benzerlikli komşuların benzerlik toplamı.
+        # Seyrek matris-vektör çarpımı olarak: scores = B^T @ s, B[i, j] = 1 (komşu i filme j >= eşik verdiyse)
+        positive = neighbor_similarities > 0
+        neighbor_indices = neighbor_indices[positive]
+        neighbor_similarities = neighbor_similarities[positive]
+        n_items = self.item_vectors.shape[0]
+
+        neighbor_ratings = self.rating_store.rows_csr(neighbor_indices, n_items)
+        neighbor_ratings.data = (neighbor_ratings.data >= rating_threshold).astype(np.float64)
+        recommended_movie_scores = neighbor_ratings.T.dot(neighbor_similarities) # film index -> toplam benzerlik
+        recommendation_counts = neighbor_ratings.T.dot(np.ones(len(neighbor_indices))) # film index -> öneren komşu sayısı
+
+        # 5. Kullanıcının oyladığı ve hiçbir komşunun önermediği filmleri maskele, en iyi N'i seç
+        recommended_movie_scores[recommendation_counts == 0] = -np.inf
+        recommended_movie_scores[[index for index, _ in valid_ratings_normalized]] = -np.inf
+        blocked = self._genre_blocked(genre_filter)
+        if blocked is not None:
+            recommended_movie_scores[blocked] = -np.inf
+        top_indices = self._top_n_indices(recommended_movie_scores, n_recommendations)
+        started = self._observe_stage('aggregation', started)
+
+        if len(top_indices) == 0:
+             logger.debug("Filtreleme sonrası komşulardan önerilebilecek yeni film bulunamadı.")
              return []
 
-        # 5. Skorları Hesapla ve Sırala (Artık sadece toplama ve sıralama)
-        final_recommendations = []
-        for movie_id, total_similarity_score in recommended_movie_scores.items():
-            final_recommendations.append({
-                'movieId': movie_id,
-                'score': total_similarity_score, # Doğrudan toplam benzerlik skorunu kullan
-                'count': recommendation_counts[movie_id] # İsteğe bağlı: Kaç komşunun önerdiğini tut
-            })
-
-        if not final_recommendations:
-             print("Öneriye dönüştürülecek film bulunamadı (beklenmedik durum).")
-             return []
-
-        # Toplam benzerlik skoruna göre büyükten küçüğe sırala
-        final_recommendations.sort(key=lambda x: x['score'], reverse=True)
-
-        # En iyi N tanesini al
-        top_recommendations_data = final_recommendations[:n_recommendations]
-
-        # 6. Sonuçları Formatla
-        recs_df = pd.DataFrame(top_recommendations_data)
-        if self.movie_titles:
-             recs_df['title'] = recs_df['movieId'].map(self.movie_titles)
-             recs_df = recs_df.dropna(subset=['title'])
-        else:
-             print("Uyarı: movie_titles yüklenmemiş, başlıklar eklenemiyor.")
-             recs_df['title'] = 'Title Unavailable'
+        # 6. Sonuçları Formatla (başlığı olmayan filmler atlanır)
+        recommendations = []
+        titles = self.item_titles[top_indices].tolist() if self.item_titles is not None else None
+        for position, (index, movie_id) in enumerate(zip(top_indices.tolist(), self.movie_ids[top_indices].tolist())):
+            if titles is not None:
+                title = titles[position]
+                if title is None:
+                    continue
+            else:
+                title = 'Title Unavailable'
+            recommendations.append((movie_id, title, float(recommended_movie_scores[index])))
+        if titles is None:
+             logger.warning("item_titles yüklenmemiş, başlıklar eklenemiyor.")
+        self._observe_stage('title_join', started)
 
-        print(f"\nYeni kullanıcı için bulunan öneriler (Toplam Benzerlik Skoruna Göre):")
-        print(recs_df[['movieId', 'title', 'score', 'count']]) # count'u da ekleyelim
+        logger.debug("Yeni kullanıcı için %d öneri bulundu (Toplam Benzerlik Skoruna Göre).", len(recommendations))
 
         # (movieId, title, score) tuple listesi döndür (skor artık toplam benzerlik)
-        return list(recs_df[['movieId', 'title', 'score']].itertuples(index=False, name=None))
+        return recommendations
 
     def get_all_item_ids(self):
         """Modelin bildiği tüm geçerli item (movie) ID'lerini döndürür."""
@@ -266,102 +661,172 @@ class CollaborativeFilteringModel:
             return []
         return list(self.movie_map.keys())
 
+    def _to_artifact_dict(self):
+        """Modeli sadece NumPy dizileri, listeler ve skalerlerden oluşan bir sözlüğe çevirir."""
+        return {
+            'n_components': self.n_components,
+            'random_state': self.random_state,
+            'global_average_rating': float(self.global_average_rating),
+            'user_ids': np.asarray(self.user_ids),
+            'movie_ids': np.asarray(self.movie_ids),
+            'user_vectors': self.user_vectors,
+            'item_vectors': self.item_vectors, # SVD bileşenleri = item_vectors.T (ayrıca saklanmaz)
+            'svd_solver': self.svd_solver,
+            'solver_params': dict(self.solver_params), # ALS fold-in'i eğitimdeki düzenlileştirmeyi kullanır
+            'movie_titles': self.item_titles.tolist(), # movie_ids ile hizalı liste
+            'rating_store': self.rating_store.to_dict(), # CSR dizileri (eski iç içe sözlük yerine)
+            'neighbor_index': self.neighbor_index.to_dict() if self.neighbor_index is not None else None,
+            'item_similarity': self.item_similarity.to_dict() if self.item_similarity is not None else None,
+            'fold_in_seq': int(self.fold_in_seq),
+            'quantization': {'kind': self.quantization, 'rerank_factor': self.rerank_factor,
+                             'item_vectors': self.quantized_item_vectors.to_dict()}
+                            if self.quantized_item_vectors is not None else None,
+        }
+
     def save_model(self, filepath='cf_model.joblib'):
         """
-        Eğitilmiş modeli, vektörleri ve haritaları dosyaya kaydeder.
+        Eğitilmiş modeli, vektörleri ve haritaları kaydeder.
+        filepath '.joblib' ile bitiyorsa tek sıkıştırılmış joblib dosyası yazılır; aksi halde
+        bellek eşlemeli (mmap) açılabilen klasör formatı (ham .npy dizileri + manifest.json) kullanılır.
+
+        Returns:
+            bool: Kayıt başarılıysa True.
         """
-        # Kontrol edilecek alanlara user_map_inv, movie_map_inv ve movie_titles eklendi
         if self.user_vectors is None or self.item_vectors is None or \
            self.user_map is None or self.movie_map is None or \
-           self.user_map_inv is None or self.movie_map_inv is None or \
-           self.movie_titles is None or \
-           self.user_rated_movies_with_ratings is None or self.global_average_rating is None:
-            print("Hata: Model tam olarak eğitilmemiş veya bazı bileşenler eksik. Kaydedilemiyor.")
+           self.item_titles is None or \
+           self.rating_store is None or self.global_average_rating is None:
+            logger.error("Model tam olarak eğitilmemiş veya bazı bileşenler eksik. Kaydedilemiyor.")
             # Hangi alanın eksik olduğunu bulmaya yardımcı log ekleyelim:
             missing = []
             if self.user_vectors is None: missing.append('user_vectors')
             if self.item_vectors is None: missing.append('item_vectors')
             if self.user_map is None: missing.append('user_map')
             if self.movie_map is None: missing.append('movie_map')
-            if self.user_map_inv is None: missing.append('user_map_inv')
-            if self.movie_map_inv is None: missing.append('movie_map_inv')
-            if self.movie_titles is None: missing.append('movie_titles')
-            if self.user_rated_movies_with_ratings is None: missing.append('user_rated_movies_with_ratings')
+            if self.item_titles is None: missing.append('item_titles')
+            if self.rating_store is None: missing.append('rating_store')
             if self.global_average_rating is None: missing.append('global_average_rating')
-            print(f"Eksik alanlar: {missing}")
-            return
+            logger.error("Eksik alanlar: %s", missing)
+            return False
 
-        print(f"Model verileri şuraya kaydediliyor: {filepath}")
-        model_data = {
-            'user_vectors': self.user_vectors,
-            'item_vectors': self.item_vectors,
-            'user_map': self.user_map,
-            'movie_map': self.movie_map,
-            'user_rated_movies_with_ratings': self.user_rated_movies_with_ratings,
-            'global_average_rating': self.global_average_rating,
-            'n_components': self.n_components,
-            'svd_model_components': self.model.components_, # Bu SVD modelinin kendisini değil, componentlerini saklar
-            'movie_map_inv': self.movie_map_inv, # Artık _create_user_movie_data'da atanıyor
-            'user_map_inv': self.user_map_inv,   # Artık _create_user_movie_data'da atanıyor
-            'movie_titles': self.movie_titles     # Artık _create_user_movie_data'da atanıyor
-        }
+        source = self.compact_fold_ins()[0] if len(self.fold_ins) else None # Bekleyen fold-in'ler de kaydedilsin
+        logger.info("Model verileri şuraya kaydediliyor: %s", filepath)
+        model_data = (source or self)._to_artifact_dict()
         try:
-            joblib.dump(model_data, filepath, compress=3)
-            print(f"Model verileri başarıyla kaydedildi: {filepath}")
+            if filepath.endswith('.joblib'):
+                joblib.dump(model_data, filepath, compress=3)
+            else:
+                save_artifact_dir(model_data, filepath)
+            logger.info("Model verileri başarıyla kaydedildi: %s", filepath)
+            return True
         except Exception as e:
-            print(f"Model verileri kaydedilirken hata oluştu: {e}")
+            logger.exception("Model verileri kaydedilirken hata oluştu: %s", e)
+            return False
+
+    @staticmethod
+    def _upgrade_legacy_artifact(model_data):
+        """
+        Eski joblib formatındaki (user_map/movie_map sözlükleri, movie_titles sözlüğü,
+        user_rated_movies_with_ratings) veriyi güncel dizi tabanlı sözlüğe çevirir.
+        """
+        required_keys = ['user_vectors', 'item_vectors', 'user_map', 'movie_map', 'movie_titles',
+                         'global_average_rating', 'n_components']
+        missing_keys = [key for key in required_keys if key not in model_data]
+        if missing_keys:
+            raise KeyError(f"Model dosyası eksik anahtarlar içeriyor: {missing_keys}")
+        if 'rating_store' not in model_data and 'user_rated_movies_with_ratings' not in model_data:
+            raise KeyError("Model dosyası oylama geçmişi içermiyor (rating_store)")
+
+        user_map = IdMap.from_dict(model_data['user_map'])
+        movie_map = IdMap.from_dict(model_data['movie_map'])
+        if 'rating_store' in model_data:
+            rating_store = model_data['rating_store']
+        else:
+            logger.info("Eski oylama geçmişi sözlüğü CSR deposuna çevriliyor...")
+            rating_store = RatingStore.from_nested_dict(
+                model_data['user_rated_movies_with_ratings'], user_map, movie_map).to_dict()
+
+        titles = model_data['movie_titles']
+        return {
+            'n_components': model_data['n_components'],
+            'global_average_rating': model_data['global_average_rating'],
+            'user_ids': user_map.ids,
+            'movie_ids': movie_map.ids,
+            'user_vectors': model_data['user_vectors'],
+            'item_vectors': model_data['item_vectors'],
+            'movie_titles': [titles.get(movie_id) for movie_id in movie_map.ids.tolist()],
+            'rating_store': rating_store,
+            'neighbor_index': model_data.get('neighbor_index'),
+        }
 
     @classmethod
-    def load_model(cls, filepath='cf_model.joblib'):
+    def load_model(cls, filepath='cf_model.joblib', neighbor_index_kind=None, neighbor_index_params=None,
+                   mmap_mode='r'):
         """
         Kaydedilmiş model verilerini yükler ve bir model nesnesi döndürür.
+        filepath bir model klasörüyse diziler np.load(mmap_mode=...) ile bellek eşlemeli açılır:
+        worker'lar milisaniyeler içinde başlar ve sayfa önbelleğini paylaşır.
+        Aksi halde joblib dosyası (eski format dahil) okunur.
+        Dosyadaki komşu indeksi yüklenir; dosyada yoksa (eski modeller) veya farklı bir
+        neighbor_index_kind istendiyse indeks yüklemede yeniden oluşturulur.
         """
-        print(f"Model verileri şuradan yükleniyor: {filepath}")
+        logger.info("Model verileri şuradan yükleniyor: %s", filepath)
         try:
-            model_data = joblib.load(filepath)
-
-            # Kontrol edilecek anahtarlar save_model ile tutarlı olmalı
-            required_keys = [
-                'user_vectors', 'item_vectors', 'user_map', 'movie_map',
-                'movie_map_inv', 'user_map_inv', 'movie_titles',
-                'user_rated_movies_with_ratings', 'global_average_rating', 'n_components',
-                'svd_model_components' # Kaydedildiği için kontrol listesine ekleyelim
-            ]
-            if not all(key in model_data for key in required_keys):
-                missing_keys = [key for key in required_keys if key not in model_data]
-                print(f"Hata: Model dosyası eksik anahtarlar içeriyor: {missing_keys}. Yüklenemiyor.")
-                return None
-
-            instance = cls(n_components=model_data['n_components'])
-
+            manifest = None
+            if is_artifact_dir(filepath):
+                model_data, manifest = load_artifact_dir(filepath, mmap_mode=mmap_mode)
+            else:
+                model_data = joblib.load(filepath)
+                if 'user_ids' not in model_data:
+                    model_data = cls._upgrade_legacy_artifact(model_data)
+
+            instance = cls(n_components=model_data['n_components'],
+                           random_state=model_data.get('random_state', 42),
+                           svd_solver=model_data.get('svd_solver', DEFAULT_SVD_SOLVER),
+                           solver_params=model_data.get('solver_params'))
+            instance.artifact_manifest = manifest
+            instance.artifact_path = filepath
+            if manifest is not None:
+                instance.model_version = _model_version(manifest['created_at'], manifest['arrays']['user_vectors']['shape'])
+            else:
+                stat = os.stat(filepath)
+                instance.model_version = _model_version(stat.st_size, stat.st_mtime_ns)
+            instance._set_id_maps(model_data['user_ids'], model_data['movie_ids'])
             instance.user_vectors = model_data['user_vectors']
             instance.item_vectors = model_data['item_vectors']
-            instance.user_map = model_data['user_map']
-            instance.movie_map = model_data['movie_map']
-            instance.movie_map_inv = model_data.get('movie_map_inv')
-            instance.user_map_inv = model_data.get('user_map_inv')
-            instance.movie_titles = model_data['movie_titles']
-            instance.user_rated_movies_with_ratings = model_data['user_rated_movies_with_ratings']
+            instance.set_item_titles(model_data['movie_titles'])
             instance.global_average_rating = model_data['global_average_rating']
+            instance.rating_store = RatingStore.from_dict(model_data['rating_store'])
+            instance.fold_in_seq = instance.fold_ins.applied_seq = int(model_data.get('fold_in_seq', 0))
+
+            quantization = model_data.get('quantization')
+            if quantization:
+                instance.quantization = quantization['kind']
+                instance.rerank_factor = quantization['rerank_factor']
+                instance.quantized_item_vectors = QuantizedVectors.from_dict(quantization['item_vectors'])
+                if manifest is None:
+                    logger.warning("Nicemlenmiş model joblib dosyasından yüklendi: float64 ve %s vektörler birlikte "
+                                   "bellekte tutulur. Bellek kazancı için mmap model klasörü kullanın "
+                                   "(python models/artifact.py).", instance.quantization)
+
+            saved_index = model_data.get('neighbor_index')
+            if saved_index and (neighbor_index_kind is None or saved_index.get('kind') == neighbor_index_kind) \
+                    and not neighbor_index_params:
+                instance.neighbor_index = neighbor_index_from_dict(saved_index)
+                instance.neighbor_index_kind = instance.neighbor_index.kind
+            else:
+                instance.build_neighbor_index(neighbor_index_kind or DEFAULT_INDEX_KIND, **(neighbor_index_params or {}))
+            if model_data.get('item_similarity'):
+                instance.item_similarity = ItemSimilarityIndex.from_dict(model_data['item_similarity'])
 
-            # Eksik map'leri yeniden oluştur (defansif kodlama)
-            if instance.movie_map and not instance.movie_map_inv:
-                 instance.movie_map_inv = {v: k for k, v in instance.movie_map.items()}
-            if instance.user_map and not instance.user_map_inv:
-                 instance.user_map_inv = {v: k for k, v in instance.user_map.items()}
-
-            if not instance.movie_map_inv or not instance.user_map_inv:
-                 print("Hata: Ters haritalamalar (inv_map) yüklenemedi veya oluşturulamadı.")
-                 return None
-
-            print(f"Model verileri başarıyla yüklendi ({instance.n_components} bileşenli).")
+            logger.info("Model verileri başarıyla yüklendi (%d bileşenli).", instance.n_components)
             return instance
 
         except FileNotFoundError:
-            print(f"Hata: Model dosyası bulunamadı: {filepath}")
+            logger.error("Model dosyası bulunamadı: %s", filepath)
             return None
         except Exception as e:
-            print(f"Model yüklenirken genel bir hata oluştu: {e}")
+            logger.exception("Model yüklenirken genel bir hata oluştu: %s", e)
             return None
 
 # Test bloğu
@@ -374,6 +839,7 @@ if __name__ == '__main__':
     TEST_USER_ID = 1
 
     # --- Path ve Import Ayarları ---
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     print("Test modülü çalıştırılıyor...")
     import sys
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -0,0 +1,321 @@
+# Yeni/güncellenen kullanıcıların ve yeni filmlerin tam yeniden eğitim olmadan latent uzaya eklenmesi (fold-in)
+#
+# - SVD modelleri: user_vectors = U S = X V olduğundan yeni bir kullanıcı satırı x için vektör x @ item_vectors;
+#   yeni bir film sütunu c için vektör (c^T @ user_vectors) / S^2 (S^2 = user_vectors sütun normlarının karesi).
+# - ALS modelleri: karşı taraf sabitken eğitimdeki en küçük kareler problemi tek satır için kesin çözülür.
+#
+# Fold-in sonuçları önce bekleyen (pending) tamponlarda tutulur ve predict tarafından hemen kullanılır.
+# compacted_model() tamponları dizilere (user_vectors, item_vectors, rating_store, id eşlemeleri) yazılmış
+# yeni bir model üretir; mevcut model ve (mmap ile açılmış, worker'lar arasında paylaşılan) dizileri değişmez.
+# Servis tarafında fold-in kayıtları worker'lar arasında paylaşılan bir günlükten (utils/fold_in_journal.py)
+# tampona uygulanır; compaction arka planda yeni artifact yazar ve worker'lar onu yeniden yükler.
+import copy
+import logging
+import threading
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from models.als import ALS_SOLVERS, solve_rows
+from models.id_map import IdMap
+from models.rating_store import RatingStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPACT_THRESHOLD = 1000 # Bu kadar bekleyen kullanıcı/film olunca compaction gerekir (needs_compaction)
+
+
+class PendingUser:
+    """Fold-in edilmiş (henüz compaction yapılmamış) kullanıcı: vektör ve tüm puanları."""
+    __slots__ = ('vector', 'ratings', 'item_indices')
+
+    def __init__(self, vector, ratings, item_indices):
+        self.vector = vector
+        self.ratings = ratings # {movieId: puan}; modelde henüz olmayan filmler dahil
+        self.item_indices = item_indices # Modeldeki filmlerin item indexleri (predict maskesi için)
+
+
+class FoldInBuffer:
+    """
+    Bir CollaborativeFilteringModel için bekleyen fold-in kayıtları.
+
+    users: {userId: PendingUser}; items: {movieId: (vektör, başlık, {userId: puan})}.
+    Aynı kullanıcı tekrar fold-in edilirse kaydı güncellenir (puanları birleştirilir).
+    applied_seq: tampona (veya modelin dizilerine) uygulanmış son fold-in günlüğü kaydı (apply_events).
+    """
+
+    def __init__(self, model, compact_threshold=DEFAULT_COMPACT_THRESHOLD):
+        self.model = model
+        self.compact_threshold = compact_threshold
+        self.users = {}
+        self.items = {}
+        self.item_genre_masks = {} # movieId -> tür bit maskesi (bekleyen filmler için, models/genres.py)
+        self.lock = threading.RLock()
+        self.applied_seq = getattr(model, 'fold_in_seq', 0)
+        self.stats = {'user_fold_ins': 0, 'item_fold_ins': 0}
+        self._cache = {} # Compaction'a kadar sabit kalan ara sonuçlar (ALS Gram matrisleri, S^2)
+
+    def __len__(self):
+        return len(self.users) + len(self.items)
+
+    # --- Projeksiyon ---
+    @property
+    def linear(self):
+        """SVD'de kullanıcı vektörü puanlarda doğrusaldır; puan farkları ayrıca projekte edilip eklenebilir."""
+        return self.model.svd_solver not in ALS_SOLVERS
+
+    def _als_params(self):
+        params = self.model.solver_params
+        implicit = self.model.svd_solver == 'implicit_als'
+        regularization = params.get('regularization')
+        if regularization is None:
+            regularization = 0.1 if implicit else 0.05
+        return regularization, implicit, params.get('alpha', 10.0)
+
+    def _gram(self, name, vectors):
+        if name not in self._cache:
+            self._cache[name] = vectors.T.astype(np.float64) @ vectors
+        return self._cache[name]
+
+    def project_user(self, item_indices, ratings):
+        """Modeldeki filmlere verilen puanlardan kullanıcı vektörü."""
+        model = self.model
+        row = csr_matrix((np.asarray(ratings, dtype=np.float64), np.asarray(item_indices), [0, len(item_indices)]),
+                         shape=(1, model.item_vectors.shape[0]))
+        if model.svd_solver in ALS_SOLVERS:
+            regularization, implicit, alpha = self._als_params()
+            base_gram = self._gram('item_gram', model.item_vectors) if implicit else None
+            vector = solve_rows(row, model.item_vectors, regularization, implicit, alpha, base_gram)[0]
+        else:
+            vector = (row @ model.item_vectors)[0]
+        return vector.astype(model.user_vectors.dtype)
+
+    def project_item(self, user_vectors, ratings):
+        """Kullanıcı vektörleri (satırlar) ve bu kullanıcıların filme verdiği puanlardan film vektörü."""
+        model = self.model
+        ratings = np.asarray(ratings, dtype=np.float64)
+        if model.svd_solver in ALS_SOLVERS:
+            regularization, implicit, alpha = self._als_params()
+            row = csr_matrix((ratings, np.arange(len(ratings)), [0, len(ratings)]), shape=(1, len(ratings)))
+            base_gram = self._gram('user_gram', model.user_vectors) if implicit else None
+            vector = solve_rows(row, user_vectors, regularization, implicit, alpha, base_gram)[0]
+        else:
+            if 'singular_values_sq' not in self._cache:
+                self._cache['singular_values_sq'] = np.einsum('ij,ij->j', model.user_vectors, model.user_vectors,
+                                                              dtype=np.float64)
+            singular_values_sq = self._cache['singular_values_sq']
+            vector = (ratings @ np.asarray(user_vectors, dtype=np.float64)) / np.where(
+                singular_values_sq > 0, singular_values_sq, 1.0)
+        return vector.astype(model.item_vectors.dtype)
+
+    def _user_vector(self, user_id):
+        """Bekleyen veya modeldeki kullanıcı vektörü; yoksa None."""
+        pending = self.users.get(user_id)
+        if pending is not None:
+            return pending.vector
+        index = self.model.user_map.get(user_id)
+        return None if index is None else self.model.user_vectors[index]
+
+    # --- Fold-in ---
+    def fold_in_user(self, user_id, ratings_dict, replace=False):
+        """
+        Kullanıcının puanlarını latent uzaya ekler. Modelde olan kullanıcılar için mevcut puanlarla
+        birleştirilir (replace=True ise sadece verilen puanlar kullanılır). Modelde olmayan filmlere verilen
+        puanlar saklanır; bu filmler fold_in_item ile (veya compaction'da) modele eklenir.
+
+        Returns:
+            PendingUser veya None (modeldeki filmlere hiç geçerli puan yoksa).
+        """
+        model = self.model
+        ratings = {}
+        for movie_id, rating in ratings_dict.items():
+            try:
+                ratings[int(movie_id)] = float(rating)
+            except (TypeError, ValueError):
+                logger.warning("Geçersiz film ID'si veya puan formatı: %s -> %s. Atlanıyor.", movie_id, rating)
+        with self.lock:
+            if not replace:
+                previous = self.users.get(user_id)
+                if previous is not None:
+                    ratings = {**previous.ratings, **ratings}
+                elif user_id in model.user_map:
+                    item_indices, values = model.rating_store.row(model.user_map[user_id])
+                    ratings = {**dict(zip(model.movie_ids[item_indices].tolist(), values.tolist())), **ratings}
+
+            movie_ids = np.fromiter(ratings, dtype=np.int64, count=len(ratings))
+            values = np.fromiter(ratings.values(), dtype=np.float64, count=len(ratings))
+            item_indices = model.movie_map.lookup(movie_ids)
+            known = item_indices >= 0
+            if not known.any():
+                return None
+            order = np.argsort(item_indices[known])
+            item_indices, known_values = item_indices[known][order], values[known][order]
+            pending = PendingUser(self.project_user(item_indices, known_values), ratings,
+                                  item_indices.astype(np.int32))
+            self.users[user_id] = pending
+            self.stats['user_fold_ins'] += 1
+            # Bu kullanıcının puanladığı bekleyen filmlerin vektörlerini güncelle
+            for movie_id in movie_ids[~known].tolist():
+                if movie_id in self.items:
+                    self.items[movie_id][2][user_id] = ratings[movie_id]
+                    self._refresh_item(movie_id)
+        return pending
+
+    def _refresh_item(self, movie_id):
+        vector, title, ratings_by_user = self.items[movie_id]
+        vectors, values = [], []
+        for user_id, rating in ratings_by_user.items():
+            user_vector = self._user_vector(user_id)
+            if user_vector is not None:
+                vectors.append(user_vector)
+                values.append(rating)
+        if vectors:
+            vector = self.project_item(np.vstack(vectors), values)
+        self.items[movie_id] = (vector, title, ratings_by_user)
+
+    def fold_in_item(self, movie_id, title=None, ratings_by_user=None, genre_mask=0):
+        """
+        Modelde olmayan bir filmi ekler. Film sütunu, verilen {userId: puan} ile bekleyen kullanıcıların
+        bu filme verdiği puanlardan oluşur. Sütunda bilinen kullanıcı yoksa vektör sıfırdır.
+        genre_mask, compaction'da modelin tür maskelerine eklenir.
+
+        Returns:
+            np.ndarray: Filmin latent vektörü; film zaten modeldeyse None.
+        """
+        movie_id = int(movie_id)
+        if movie_id in self.model.movie_map:
+            return None
+        with self.lock:
+            ratings = {user_id: pending.ratings[movie_id] for user_id, pending in self.users.items()
+                       if movie_id in pending.ratings}
+            ratings.update({int(u): float(r) for u, r in (ratings_by_user or {}).items()})
+            zero = np.zeros(self.model.item_vectors.shape[1], dtype=self.model.item_vectors.dtype)
+            self.items[movie_id] = (zero, title, ratings)
+            self.item_genre_masks[movie_id] = int(genre_mask)
+            self._refresh_item(movie_id)
+            self.stats['item_fold_ins'] += 1
+            return self.items[movie_id][0]
+
+    def apply_events(self, events):
+        """
+        Fold-in günlüğü kayıtlarını (seq, tür, id, veri) sırayla uygular; applied_seq'ten eski kayıtlar atlanır.
+        Aynı kayıtlar her worker'da aynı sırayla uygulandığı için tamponlar aynı duruma gelir.
+
+        Returns:
+            int: Uygulanan kayıt sayısı.
+        """
+        applied = 0
+        with self.lock:
+            for seq, kind, entity_id, payload in events:
+                if seq <= self.applied_seq:
+                    continue
+                if kind == 'user':
+                    self.fold_in_user(entity_id, dict(payload['ratings']), replace=payload.get('replace', False))
+                elif kind == 'item':
+                    self.fold_in_item(entity_id, title=payload.get('title'),
+                                      genre_mask=payload.get('genre_mask', 0))
+                self.applied_seq = seq
+                applied += 1
+        return applied
+
+    # --- Compaction ---
+    def needs_compaction(self):
+        """Bekleyen kayıt sayısı compact_threshold'a ulaştı mı (0: sadece elle/CLI ile compaction)?"""
+        return bool(self.compact_threshold) and len(self) >= self.compact_threshold
+
+    def compacted_model(self):
+        """
+        Bekleyen film ve kullanıcıların dizilere yazıldığı yeni bir model oluşturur:
+        yeni filmler item_vectors/movie_ids/item_titles sonuna, yeni kullanıcılar user_vectors/user_ids
+        sonuna eklenir; güncellenen kullanıcıların satırları değiştirilir. rating_store ve id eşlemeleri
+        yeniden kurulur, komşu indeksi yeniden oluşturulur. Bu model ve dizileri değişmez: mmap ile açılmış
+        diziler ancak yeni diziler hazır olduğunda (yeni artifact yüklenince) bırakılır. Yeni modelin
+        fold_in_seq değeri applied_seq'tir (günlükte bu kayda kadar olanlar dizilere yazılmıştır).
+
+        Returns:
+            tuple: (yeni model, eklenen/güncellenen kullanıcı ve film sayıları); bekleyen kayıt yoksa (None, özet).
+        """
+        model = self.model
+        with self.lock:
+            users = dict(self.users)
+            items = {movie_id: (vector, title, dict(ratings)) for movie_id, (vector, title, ratings) in self.items.items()}
+            item_genre_masks = dict(self.item_genre_masks)
+            applied_seq = self.applied_seq
+        if not users and not items:
+            return None, {'new_users': 0, 'updated_users': 0, 'new_items': 0}
+
+        # 1. Filmler (mevcut item index'leri değişmez, yeni filmler sona eklenir)
+        new_movie_ids = list(items)
+        movie_ids = np.concatenate([model.movie_ids, np.asarray(new_movie_ids, dtype=model.movie_ids.dtype)])
+        item_vectors = np.vstack([model.item_vectors] + [items[m][0][None, :] for m in new_movie_ids]) \
+            if new_movie_ids else model.item_vectors
+        item_titles = np.concatenate([model.item_titles, np.asarray([items[m][1] for m in new_movie_ids],
+                                                                    dtype=object)])
+        genre_masks = model.item_genre_masks
+        if genre_masks is not None:
+            genre_masks = np.concatenate([genre_masks, np.asarray(
+                [item_genre_masks.get(m, 0) for m in new_movie_ids], dtype=np.uint32)])
+        movie_map = IdMap(movie_ids)
+
+        # 2. Kullanıcılar: yeni dizi bir kez ayrılır, eski satırlar kopyalanır (mmap dizisi değişmez)
+        updated = {user_id: model.user_map.get(user_id) for user_id in users}
+        new_user_ids = [u for u, index in updated.items() if index is None]
+        n_old = len(model.user_ids)
+        user_vectors = np.empty((n_old + len(new_user_ids), model.user_vectors.shape[1]), dtype=model.user_vectors.dtype)
+        user_vectors[:n_old] = model.user_vectors
+        for user_id, index in updated.items():
+            if index is not None:
+                user_vectors[index] = users[user_id].vector
+        for offset, user_id in enumerate(new_user_ids):
+            user_vectors[n_old + offset] = users[user_id].vector
+        user_ids = np.concatenate([model.user_ids, np.asarray(new_user_ids, dtype=model.user_ids.dtype)])
+        user_map = IdMap(user_ids)
+
+        # 3. Puan deposu: güncellenen kullanıcıların eski satırları atılır, bekleyen puanlar eklenir
+        store = model.rating_store
+        counts = np.diff(store.indptr.astype(np.int64))
+        old_users = np.repeat(np.arange(store.n_users), counts)
+        keep = np.ones(store.n_users, dtype=bool)
+        keep[[index for index in updated.values() if index is not None]] = False
+        keep_rows = keep[old_users]
+        user_codes = [old_users[keep_rows]]
+        movie_codes = [store.movie_idx[keep_rows].astype(np.int64)]
+        values = [store.ratings[keep_rows].astype(np.float32) / store.scale]
+        for movie_id in new_movie_ids:
+            # fold_in_item ile verilen puanlar; kullanıcının bekleyen puanları sonra eklendiği için önceliklidir
+            extra = [(user_map[u], r) for u, r in items[movie_id][2].items() if u in user_map]
+            if extra:
+                user_codes.append(np.asarray([u for u, _ in extra], dtype=np.int64))
+                movie_codes.append(np.full(len(extra), movie_map[movie_id], dtype=np.int64))
+                values.append(np.asarray([r for _, r in extra], dtype=np.float32))
+        for user_id, pending in users.items():
+            item_indices = movie_map.lookup(np.fromiter(pending.ratings, dtype=np.int64))
+            known = item_indices >= 0
+            user_codes.append(np.full(known.sum(), user_map[user_id], dtype=np.int64))
+            movie_codes.append(item_indices[known])
+            values.append(np.fromiter(pending.ratings.values(), dtype=np.float32)[known])
+        rating_store = RatingStore.from_codes(np.concatenate(user_codes), np.concatenate(movie_codes),
+                                              np.concatenate(values), len(user_ids))
+
+        # 4. Yeni model (diğer alanlar paylaşılır; sürüm ve artifact bilgisi kaydedilince belirlenir)
+        compacted = copy.copy(model)
+        compacted.item_vectors = item_vectors
+        compacted.item_titles = item_titles
+        compacted.item_genre_masks = genre_masks
+        compacted.movie_map, compacted.movie_ids = movie_map, movie_map.ids
+        compacted.user_vectors = user_vectors
+        compacted.user_map, compacted.user_ids = user_map, user_map.ids
+        compacted.rating_store = rating_store
+        compacted.model_version = compacted.artifact_path = compacted.artifact_manifest = None
+        compacted.fold_in_seq = applied_seq
+        compacted.fold_ins = FoldInBuffer(compacted, self.compact_threshold)
+        summary = {'new_users': len(new_user_ids), 'updated_users': len(updated) - len(new_user_ids),
+                   'new_items': len(new_movie_ids), 'fold_in_seq': applied_seq}
+        logger.info("Fold-in compaction: %s", summary)
+        compacted.build_neighbor_index()
+        return compacted, summary
+
+    def get_stats(self):
+        with self.lock:
+            return {**self.stats, 'pending_users': len(self.users), 'pending_items': len(self.items),
+                    'applied_seq': self.applied_seq, 'compact_threshold': self.compact_threshold}
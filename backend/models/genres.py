@@ -0,0 +1,82 @@
+# Film türleri için bit maskeleri
+#
+# movies.csv'deki 'Adventure|Comedy' gibi tür dizgileri bir kez uint32 maskeye çevrilir (tür başına bir bit,
+# en fazla 32 tür). Tür filtresi, skorlama dizisinde tek bir vektörel maske olarak uygulanır:
+#   include: maskesi seçilen türlerden en az birini içeren filmler (OR)
+#   exclude: seçilen türlerden hiçbirini içermeyen filmler
+import numpy as np
+import pandas as pd
+
+NO_GENRES = '(no genres listed)'
+MAX_GENRES = 32
+
+
+class GenreFilter:
+    """include/exclude tür bitleri; GenreVocabulary.filter ile oluşturulur."""
+
+    def __init__(self, include=0, exclude=0):
+        self.include = include
+        self.exclude = exclude
+
+    def __bool__(self):
+        return bool(self.include or self.exclude)
+
+    def key(self):
+        """Sonuç cache anahtarı için (include, exclude)."""
+        return self.include, self.exclude
+
+    def blocked(self, masks):
+        """Filtreye uymayan filmler için True olan boolean dizi (masks: item başına uint32)."""
+        blocked = (masks & np.uint32(self.exclude)) != 0
+        if self.include:
+            blocked |= (masks & np.uint32(self.include)) == 0
+        return blocked
+
+
+class GenreVocabulary:
+    """Tür adı -> bit eşlemesi (adlar büyük/küçük harf duyarsız aranır)."""
+
+    def __init__(self, names):
+        if len(names) > MAX_GENRES:
+            raise ValueError(f"En fazla {MAX_GENRES} tür desteklenir ({len(names)} tür bulundu).")
+        self.names = list(names)
+        self._bits = {name.lower(): 1 << bit for bit, name in enumerate(self.names)}
+
+    @classmethod
+    def from_strings(cls, genre_strings):
+        """'|' ile ayrılmış tür dizgilerindeki tüm türlerden (alfabetik sırayla) sözlük oluşturur."""
+        names = set()
+        for value in pd.unique(pd.Series(genre_strings).dropna()):
+            names.update(name for name in str(value).split('|') if name and name != NO_GENRES)
+        return cls(sorted(names))
+
+    def mask(self, names):
+        """
+        Tür adları için bit maskesi.
+
+        Raises:
+            ValueError: Sözlükte olmayan bir tür verilirse.
+        """
+        mask = 0
+        for name in names:
+            bit = self._bits.get(name.strip().lower())
+            if bit is None:
+                raise ValueError(f"Bilinmeyen tür: {name}")
+            mask |= bit
+        return mask
+
+    def encode(self, genre_strings):
+        """Tür dizgilerini uint32 maskelere çevirir (her farklı dizgi bir kez ayrıştırılır); türü olmayanlar 0."""
+        codes, uniques = pd.factorize(pd.Series(genre_strings, dtype=object).fillna(''))
+        unique_masks = np.fromiter(
+            (self.mask(name for name in value.split('|') if name and name != NO_GENRES) for value in uniques),
+            dtype=np.uint32, count=len(uniques))
+        return unique_masks[codes] if len(codes) else np.empty(0, dtype=np.uint32)
+
+    def decode(self, mask):
+        """Bit maskesindeki tür adları."""
+        return [name for bit, name in enumerate(self.names) if mask >> bit & 1]
+
+    def filter(self, include=(), exclude=()):
+        """Tür adlarından GenreFilter (bilinmeyen türde ValueError)."""
+        return GenreFilter(self.mask(include), self.mask(exclude))
@@ -0,0 +1,130 @@
+# NumPy dizisi üzerinde salt okunur id -> index eşlemesi
+import numpy as np
+
+
+class IdMap:
+    """
+    {id: index} sözlüğünün yerine geçen, sıralı NumPy dizisi üzerinde çalışan salt okunur eşleme.
+    Aramalar np.searchsorted ile yapılır; büyük Python sözlükleri oluşturulmadığı için
+    model yükleme hızlıdır ve diziler bellek eşlemeli (mmap) dosyalardan doğrudan kullanılabilir.
+
+    ids: index -> id dizisi (index i'deki eleman, matris satır/sütun i'nin id'si).
+    """
+
+    def __init__(self, ids):
+        self.ids = np.asarray(ids)
+        if len(self.ids) < 2 or np.all(self.ids[1:] > self.ids[:-1]):
+            # Kategori kodlarından gelen id'ler zaten sıralıdır: index = sıralı konum
+            self._sorted_ids = self.ids
+            self._order = None
+        else:
+            self._order = np.argsort(self.ids, kind='stable')
+            self._sorted_ids = self.ids[self._order]
+
+    @classmethod
+    def from_dict(cls, mapping):
+        """Eski {id: index} sözlüğünden eşleme oluşturur."""
+        ids = np.empty(len(mapping), dtype=np.int64)
+        for key, index in mapping.items():
+            ids[index] = key
+        return cls(ids)
+
+    def lookup(self, keys):
+        """
+        Birden fazla id'yi tek seferde index'e çevirir.
+
+        Returns:
+            np.ndarray: index dizisi; modelde olmayan id'ler için -1.
+        """
+        keys = np.asarray(keys, dtype=self._sorted_ids.dtype)
+        positions = np.searchsorted(self._sorted_ids, keys)
+        positions = np.minimum(positions, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[positions] == keys if len(self._sorted_ids) else np.zeros(keys.shape, dtype=bool)
+        indices = positions if self._order is None else self._order[positions]
+        return np.where(found, indices, -1)
+
+    def get(self, key, default=None):
+        try:
+            key = int(key)
+        except (TypeError, ValueError):
+            return default
+        if len(self._sorted_ids) == 0:
+            return default
+        position = int(np.searchsorted(self._sorted_ids, key))
+        if position < len(self._sorted_ids) and self._sorted_ids[position] == key:
+            return position if self._order is None else int(self._order[position])
+        return default
+
+    def __getitem__(self, key):
+        index = self.get(key)
+        if index is None:
+            raise KeyError(key)
+        return index
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def keys(self):
+        return self.ids.tolist()
+
+    def values(self):
+        return range(len(self.ids))
+
+    def items(self):
+        return zip(self.ids.tolist(), range(len(self.ids)))
+
+
+class IdValueMap:
+    """
+    {id: tamsayı değer} sözlüğünün (ör. movieId -> tmdbId) dizi tabanlı, salt okunur karşılığı.
+    Anahtar ve değerler NumPy dizilerinde tutulur; Python nesnesi olmadığı için gunicorn
+    worker'ları arasında copy-on-write ile paylaşılan sayfalar referans sayacı yüzünden kirlenmez.
+    """
+
+    def __init__(self, keys, values):
+        self._index = IdMap(keys)
+        self.values_array = np.asarray(values)
+
+    @classmethod
+    def from_pairs(cls, keys, values):
+        """Anahtar/değer dizilerinden oluşturur; tekrarlanan anahtarlarda sözlükteki gibi sonuncusu kalır."""
+        keys = np.asarray(keys)
+        values = np.asarray(values)
+        # Ters çevirip ilk görüleni almak = orijinal sırada sonuncuyu almak
+        unique_keys, first_positions = np.unique(keys[::-1], return_index=True)
+        return cls(unique_keys, values[::-1][first_positions])
+
+    def lookup(self, keys, missing=-1):
+        """Birden fazla anahtarı tek seferde değerlere çevirir; olmayanlar için missing döner."""
+        indices = self._index.lookup(keys)
+        return np.where(indices >= 0, self.values_array[np.maximum(indices, 0)], missing)
+
+    def get(self, key, default=None):
+        index = self._index.get(key)
+        if index is None:
+            return default
+        return self.values_array[index].item()
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def keys(self):
+        return self._index.keys()
+
+    def items(self):
+        return zip(self._index.ids.tolist(), self.values_array.tolist())
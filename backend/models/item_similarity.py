@@ -0,0 +1,152 @@
+# Film-film benzerlik indeksi: her film için item_vectors üzerinde kosinüs benzerliğine göre en benzer K film
+#
+# Çevrimdışı hesaplanır ve model dosyasına kompakt diziler olarak yazılır:
+#   neighbors    (n_items x K) int32    -> benzer filmlerin item indexleri (büyükten küçüğe)
+#   similarities (n_items x K) float16  -> kosinüs benzerlikleri
+# Sorgu tek bir satır okumasıdır (O(K)); GET /api/movies/<movie_id>/similar bunu kullanır.
+#
+# Kullanım (backend klasöründen; model yerinde güncellenir veya --output'a yazılır):
+#   python models/item_similarity.py models/cf_svd_model_data_k20_v2 --k 50 --workers 4
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIMILAR_K = 50
+DEFAULT_BLOCK_MEMORY = 64 * 1024 * 1024 # Bir bloğun benzerlik matrisi için bellek sınırı (byte, worker başına)
+
+# Süreç havuzundaki worker'ların paylaştığı normalize vektörler (fork ile kopyalanmadan devralınır)
+_SHARED = {}
+
+
+class ItemSimilarityIndex:
+    """Önceden hesaplanmış film-film en yakın komşu tablosu (satır = item index)."""
+
+    def __init__(self, neighbors, similarities):
+        self.neighbors = neighbors
+        self.similarities = similarities
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1]
+
+    @property
+    def n_items(self):
+        return self.neighbors.shape[0]
+
+    def similar(self, item_index, n=None):
+        """
+        Bir filme en benzer n film (n en fazla k).
+
+        Returns:
+            tuple: (item indexleri, kosinüs benzerlikleri) - büyükten küçüğe; film indekste yoksa boş.
+        """
+        if not 0 <= item_index < self.n_items:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        n = self.k if n is None else min(n, self.k)
+        return self.neighbors[item_index, :n], self.similarities[item_index, :n].astype(np.float32)
+
+    def to_dict(self):
+        """Model dosyasına kaydedilecek (sadece NumPy dizisi içeren) temsil."""
+        return {'neighbors': self.neighbors, 'similarities': self.similarities}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['neighbors'], data['similarities'])
+
+
+def _similarity_block(bounds):
+    """Havuz görevi: [start, end) satırlarının tüm filmlerle benzerliğini hesaplar ve en benzer k'yı seçer."""
+    start, end = bounds
+    normalized, k = _SHARED['normalized'], _SHARED['k']
+    similarities = normalized[start:end] @ normalized.T # (blok x n_items) float32
+    similarities[np.arange(end - start), np.arange(start, end)] = -np.inf # Filmin kendisi hariç
+    top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    top_similarities = np.take_along_axis(similarities, top, axis=1)
+    order = np.argsort(-top_similarities, axis=1, kind='stable')
+    return (start, np.take_along_axis(top, order, axis=1).astype(np.int32),
+            np.take_along_axis(top_similarities, order, axis=1).astype(np.float16))
+
+
+def _run_blocks(blocks, n_jobs):
+    """Blokları sırayla ya da fork ile başlatılan süreç havuzunda (worker başına tek BLAS thread'i) çalıştırır."""
+    if n_jobs > 1 and len(blocks) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        from threadpoolctl import threadpool_limits
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(blocks)), mp_context=context,
+                                 initializer=threadpool_limits, initargs=(1,)) as executor:
+            yield from executor.map(_similarity_block, blocks)
+    else:
+        for bounds in blocks:
+            yield _similarity_block(bounds)
+
+
+def build_item_similarity(item_vectors, k=DEFAULT_SIMILAR_K, n_jobs=None, block_memory=DEFAULT_BLOCK_MEMORY):
+    """
+    Tüm filmler için kosinüs benzerliğine göre en benzer k filmi hesaplar.
+
+    Satırlar, (blok x n_items) float32 benzerlik matrisi block_memory'yi aşmayacak bloklara bölünür;
+    bloklar süreç havuzunda paralel hesaplanır. Toplam bellek kullanımı n_items^2 ile değil,
+    worker sayısı x block_memory ile sınırlıdır.
+
+    Args:
+        item_vectors (np.ndarray): Film latent vektörleri (n_items x k).
+        k (int): Film başına saklanacak komşu sayısı.
+        n_jobs (int): Süreç sayısı (varsayılan: CPU sayısı).
+        block_memory (int): Bir bloğun benzerlik matrisi için bellek sınırı (byte).
+
+    Returns:
+        ItemSimilarityIndex
+    """
+    vectors = np.asarray(item_vectors, dtype=np.float32)
+    n_items = vectors.shape[0]
+    k = max(1, min(k, n_items - 1))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0 # Sıfır vektörlü filmlerin benzerliği 0 kalır
+    n_jobs = n_jobs or os.cpu_count() or 1
+    block_rows = max(1, min(n_items, block_memory // (4 * max(n_items, 1))))
+    blocks = [(start, min(start + block_rows, n_items)) for start in range(0, n_items, block_rows)]
+
+    neighbors = np.empty((n_items, k), dtype=np.int32)
+    similarities = np.empty((n_items, k), dtype=np.float16)
+    start_time = time.perf_counter()
+    _SHARED.update(normalized=vectors / norms, k=k)
+    try:
+        for start, block_neighbors, block_similarities in _run_blocks(blocks, n_jobs):
+            neighbors[start:start + len(block_neighbors)] = block_neighbors
+            similarities[start:start + len(block_neighbors)] = block_similarities
+    finally:
+        _SHARED.clear()
+    logger.info("Film benzerlik indeksi hesaplandı: %d film, k=%d, %d blok, %d süreç (%.2f sn, %.1f MB)", n_items, k,
+                len(blocks), n_jobs, time.perf_counter() - start_time,
+                (neighbors.nbytes + similarities.nbytes) / 1024**2)
+    return ItemSimilarityIndex(neighbors, similarities)
+
+
+if __name__ == '__main__':
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_dir not in sys.path:
+        sys.path.append(backend_dir)
+    from models.collaborative_filter import CollaborativeFilteringModel
+
+    parser = argparse.ArgumentParser(description="Model için film-film benzerlik indeksini hesaplar ve modele kaydeder.")
+    parser.add_argument('model', help="Model klasörü veya .joblib dosyası")
+    parser.add_argument('--k', type=int, default=DEFAULT_SIMILAR_K, help="Film başına komşu sayısı")
+    parser.add_argument('--workers', type=int, default=None, help="Süreç sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument('--block-memory-mb', type=int, default=DEFAULT_BLOCK_MEMORY // (1024 * 1024))
+    parser.add_argument('--output', default=None, help="Çıktı yolu (varsayılan: modelin üzerine yazılır)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    model = CollaborativeFilteringModel.load_model(args.model)
+    if model is None:
+        sys.exit(1)
+    model.build_item_similarity(k=args.k, n_jobs=args.workers, block_memory=args.block_memory_mb * 1024 * 1024)
+    sys.exit(0 if model.save_model(args.output or args.model) else 1)
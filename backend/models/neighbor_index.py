@@ -0,0 +1,261 @@
+# Yeni kullanıcı komşu araması için komşu indeksleri
+import numpy as np
+
+from models.quantization import QuantizedVectors
+
+# Desteklenen indeks türleri: 'exact' (tam arama) ve 'ivf' (k-means kovalı yaklaşık arama)
+DEFAULT_INDEX_KIND = 'exact'
+
+
+def _normalize_rows(vectors):
+    """
+    Satırları L2 normuna böler. Sıfır normlu satırlar sıfır kalır
+    (sklearn cosine_similarity ile aynı davranış: benzerlik 0).
+    """
+    vectors = np.asarray(vectors, dtype=np.float64)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(similarities, k):
+    """Benzerlik dizisinden en yüksek k elemanın indexlerini büyükten küçüğe döndürür."""
+    k = min(k, len(similarities))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(similarities):
+        top = np.argpartition(-similarities, k - 1)[:k]
+    else:
+        top = np.arange(len(similarities))
+    return top[np.argsort(-similarities[top], kind='stable')]
+
+
+def _scan(vectors, quantized, rerank_factor, query, k, positions=None):
+    """
+    Normalize sorgunun satırlarla (positions verilirse sadece o satırlarla) kosinüs benzerliğine göre
+    en benzer k'sını bulur. Nicemlenmiş vektörler varsa tarama onlarla (float32) yapılır; rerank_factor > 0
+    ise k x rerank_factor aday tam hassasiyetli vektörlerle yeniden skorlanır.
+
+    Returns:
+        tuple: (satır/positions içi indexler, benzerlikler) - büyükten küçüğe.
+    """
+    if quantized is None:
+        similarities = (vectors if positions is None else vectors[positions]).dot(query)
+        top = _top_k(similarities, k)
+        return top, similarities[top]
+    similarities = quantized.matmul(query) if positions is None else quantized.rows(positions) @ query.astype(np.float32)
+    if not rerank_factor:
+        top = _top_k(similarities, k)
+        return top, similarities[top].astype(np.float64)
+    candidates = np.sort(_top_k(similarities, k * rerank_factor))
+    exact = vectors[candidates if positions is None else positions[candidates]].dot(query)
+    top = _top_k(exact, k)
+    return candidates[top], exact[top]
+
+
+class _QuantizableIndex:
+    """Tarama yapılan normalize vektörlerin nicemlenmiş kopyasını tutan indeksler için ortak kısım."""
+    quantized = None
+    rerank_factor = 0
+
+    def quantize(self, kind, rerank_factor=0):
+        """Taranan vektörleri nicemler (models/quantization.py); kind=None nicemlemeyi kaldırır."""
+        self.quantized = QuantizedVectors.quantize(self._scanned_vectors(), kind) if kind else None
+        self.rerank_factor = rerank_factor if kind else 0
+
+    def _quantization_dict(self):
+        if self.quantized is None:
+            return {}
+        return {'quantized': self.quantized.to_dict(), 'rerank_factor': self.rerank_factor}
+
+    def _restore_quantization(self, data):
+        if data.get('quantized'):
+            self.quantized = QuantizedVectors.from_dict(data['quantized'])
+            self.rerank_factor = data.get('rerank_factor', 0)
+        return self
+
+
+class ExactNeighborIndex(_QuantizableIndex):
+    """
+    Önceden normalize edilmiş kullanıcı vektörleri üzerinde tam kosinüs araması.
+    Her sorgu tek bir matris-vektör çarpımı + argpartition'dır (tam sıralama yok).
+    Nicemlendiyse (quantize) tarama nicemlenmiş vektörlerle yapılır.
+    """
+    kind = 'exact'
+
+    def __init__(self, normalized_vectors):
+        self.normalized_vectors = normalized_vectors
+
+    @classmethod
+    def build(cls, vectors):
+        return cls(_normalize_rows(vectors))
+
+    def search(self, query, k):
+        """
+        Sorgu vektörüne en benzer k satırı bulur.
+
+        Returns:
+            tuple: (indexler, kosinüs benzerlikleri) - benzerliğe göre büyükten küçüğe.
+        """
+        query = np.asarray(query, dtype=np.float64).ravel()
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return _scan(self.normalized_vectors, self.quantized, self.rerank_factor, query / query_norm, k)
+
+    def _scanned_vectors(self):
+        return self.normalized_vectors
+
+    def to_dict(self):
+        """Model dosyasına kaydedilecek (sadece NumPy dizisi içeren) temsil."""
+        return {'kind': self.kind, 'normalized_vectors': self.normalized_vectors, **self._quantization_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['normalized_vectors'])._restore_quantization(data)
+
+
+class IVFNeighborIndex(_QuantizableIndex):
+    """
+    Saf NumPy ile yaklaşık komşu araması (IVF - inverted file).
+    Normalize edilmiş vektörler küresel k-means ile n_lists kovaya ayrılır; sorgu
+    sadece merkezine en yakın n_probe kovadaki kullanıcılarla karşılaştırılır.
+
+    n_probe, doğruluk (recall) / gecikme dengesini ayarlayan düğmedir:
+    n_probe = n_lists tam aramaya eşittir, küçük değerler daha hızlı ama daha az isabetlidir.
+    """
+    kind = 'ivf'
+
+    def __init__(self, centroids, list_offsets, list_members, sorted_vectors, n_probe=8):
+        self.centroids = centroids # (n_lists, d) normalize edilmiş kova merkezleri
+        self.list_offsets = list_offsets # (n_lists + 1,) her kovanın sorted_vectors içindeki aralığı
+        self.list_members = list_members # (n_users,) kova sırasına göre dizilmiş orijinal satır indexleri
+        self.sorted_vectors = sorted_vectors # (n_users, d) kova sırasına göre dizilmiş normalize vektörler
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, n_probe=8, n_iter=10, max_train_points=100000,
+              random_state=42, chunk_size=65536):
+        """
+        Küresel k-means ile kovaları oluşturur.
+
+        Args:
+            vectors (np.ndarray): Kullanıcı latent vektörleri.
+            n_lists (int): Kova sayısı (varsayılan: ~sqrt(kullanıcı sayısı)).
+            n_probe (int): Sorgu başına taranacak varsayılan kova sayısı.
+            n_iter (int): k-means iterasyon sayısı.
+            max_train_points (int): k-means eğitimi için örneklenecek maksimum satır sayısı.
+            random_state (int): Tekrarlanabilirlik için rastgelelik durumu.
+            chunk_size (int): Atama sırasında tek seferde işlenecek satır sayısı (bellek sınırı).
+        """
+        normalized = _normalize_rows(vectors)
+        n_rows = normalized.shape[0]
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(n_rows)))
+        n_lists = min(n_lists, n_rows)
+        rng = np.random.default_rng(random_state)
+
+        if n_rows > max_train_points:
+            train = normalized[rng.choice(n_rows, max_train_points, replace=False)]
+        else:
+            train = normalized
+        centroids = train[rng.choice(train.shape[0], n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            assignments = cls._assign(train, centroids, chunk_size)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, train)
+            counts = np.bincount(assignments, minlength=n_lists)
+            empty = counts == 0
+            # Boş kalan kovaları rastgele noktalarla yeniden başlat
+            if empty.any():
+                sums[empty] = train[rng.choice(train.shape[0], int(empty.sum()), replace=False)]
+            centroids = _normalize_rows(sums)
+
+        assignments = cls._assign(normalized, centroids, chunk_size)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=n_lists)
+        list_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return cls(centroids, list_offsets, order.astype(np.int32), normalized[order], n_probe=n_probe)
+
+    @staticmethod
+    def _assign(vectors, centroids, chunk_size):
+        """Her satırı en yüksek kosinüs benzerliğine sahip merkeze atar (parça parça)."""
+        assignments = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], chunk_size):
+            block = vectors[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    @property
+    def n_lists(self):
+        return self.centroids.shape[0]
+
+    def search(self, query, k, n_probe=None):
+        """
+        Sorgu vektörüne en benzer (yaklaşık) k satırı bulur.
+
+        Args:
+            query (np.ndarray): Sorgu vektörü.
+            k (int): Döndürülecek komşu sayısı.
+            n_probe (int): Bu sorgu için taranacak kova sayısı (None ise self.n_probe).
+
+        Returns:
+            tuple: (orijinal satır indexleri, kosinüs benzerlikleri) - büyükten küçüğe.
+        """
+        query = np.asarray(query, dtype=np.float64).ravel()
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        query = query / query_norm
+
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probe_lists = _top_k(self.centroids.dot(query), n_probe)
+        ranges = [np.arange(self.list_offsets[l], self.list_offsets[l + 1]) for l in probe_lists]
+        positions = np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+        if len(positions) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        top, similarities = _scan(self.sorted_vectors, self.quantized, self.rerank_factor, query, k, positions)
+        return self.list_members[positions[top]].astype(np.int64), similarities
+
+    def _scanned_vectors(self):
+        return self.sorted_vectors
+
+    def to_dict(self):
+        """Model dosyasına kaydedilecek (sadece NumPy dizisi ve skaler içeren) temsil."""
+        return {
+            'kind': self.kind,
+            'centroids': self.centroids,
+            'list_offsets': self.list_offsets,
+            'list_members': self.list_members,
+            'sorted_vectors': self.sorted_vectors,
+            'n_probe': self.n_probe,
+            **self._quantization_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['centroids'], data['list_offsets'], data['list_members'],
+                   data['sorted_vectors'], n_probe=data.get('n_probe', 8))._restore_quantization(data)
+
+
+NEIGHBOR_INDEX_TYPES = {
+    ExactNeighborIndex.kind: ExactNeighborIndex,
+    IVFNeighborIndex.kind: IVFNeighborIndex,
+}
+
+
+def build_neighbor_index(vectors, kind=DEFAULT_INDEX_KIND, **params):
+    """Verilen türde bir komşu indeksi oluşturur ('exact' veya 'ivf')."""
+    if kind not in NEIGHBOR_INDEX_TYPES:
+        raise ValueError(f"Bilinmeyen komşu indeksi türü: {kind}. Geçerli türler: {list(NEIGHBOR_INDEX_TYPES)}")
+    return NEIGHBOR_INDEX_TYPES[kind].build(vectors, **params)
+
+
+def neighbor_index_from_dict(data):
+    """to_dict ile kaydedilmiş bir indeksi geri yükler."""
+    kind = data.get('kind')
+    if kind not in NEIGHBOR_INDEX_TYPES:
+        raise ValueError(f"Bilinmeyen komşu indeksi türü: {kind}")
+    return NEIGHBOR_INDEX_TYPES[kind].from_dict(data)
@@ -0,0 +1,132 @@
+# Latent vektörler için nicemlenmiş (quantized) saklama: float16 veya satır başına ölçekli int8
+#
+#   float16: codes (n x d) float16                        -> float64'e göre 4 kat küçük
+#   int8:    codes (n x d) int8 + scales (n,) float32      -> ~8 kat küçük; satır = codes * scale
+#
+# Skorlama float32 biriktirme ile yapılır: kodlar parça parça float32'ye açılıp BLAS ile çarpılır (tüm
+# matrisin float32 kopyası oluşturulmaz). İsteğe bağlı yeniden sıralamada (re-rank) nicemlenmiş skorlarla
+# seçilen n x rerank_factor aday, tam hassasiyetli (float64) vektörlerle yeniden skorlanır; bellek eşlemeli
+# (mmap) açılan modellerde float64 dizilerin yalnızca aday satırları okunur.
+#
+# Bellek: nicemlenmiş kopyalar float64 dizilere EK olarak saklanır (float64 diziler re-rank, fold-in,
+# compaction ve film benzerlik indeksi için gerekir). Artifact boyutu int8 ile ~%12.5, float16 ile ~%25 artar.
+#   - mmap model klasörü: skorlama sadece nicemlenmiş dizileri tarar; float64 dosyalarının sadece okunan
+#     sayfaları (re-rank adayları, fold-in) belleğe gelir ve bunlar worker'lar arasında paylaşılan, gerektiğinde
+#     geri alınabilen sayfa önbelleğidir. Worker başına yerleşik bellek ve taranan bayt sayısı düşer. Büyük
+#     toplu isteklerde (predict_batch) re-rank adayları float64 dosyasının büyük kısmını önbelleğe alabilir.
+#   - joblib dosyası: her iki kopya da her worker'ın belleğine tamamen yüklenir; nicemleme yerleşik belleği
+#     AZALTMAZ, artırır (sadece skorlama hızlanır). Nicemleme sadece mmap klasörleriyle kullanılmalıdır.
+#
+# Kullanım (backend klasöründen; model yerinde güncellenir veya --output'a yazılır):
+#   python models/quantization.py models/cf_svd_model_data_k20_v2 --kind int8 --rerank-factor 4
+# Bellek / gecikme / top-k örtüşme raporu: python utils/benchmark.py quantize [model]
+import argparse
+import logging
+import os
+import sys
+
+import numpy as np
+
+QUANTIZATION_KINDS = ('float16', 'int8')
+DEFAULT_RERANK_FACTOR = 4 # Yeniden sıralanacak aday sayısı = istenen sonuç sayısı x bu çarpan (0: re-rank yok)
+DECODE_CHUNK_ROWS = 4096 # Skorlamada tek seferde float32'ye açılan satır sayısı (önbellekte kalacak kadar küçük)
+
+
+class QuantizedVectors:
+    """Nicemlenmiş vektör matrisi (satır = kullanıcı veya film)."""
+
+    def __init__(self, codes, scales=None):
+        self.codes = codes
+        self.scales = scales # Sadece int8 için: satır başına ölçek
+
+    @property
+    def kind(self):
+        return 'int8' if self.codes.dtype == np.int8 else 'float16'
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    @classmethod
+    def quantize(cls, vectors, kind):
+        """
+        Vektörleri verilen türde nicemler. int8'de her satır en büyük mutlak değeri 127'ye gelecek
+        şekilde ölçeklenir (simetrik, sıfır noktası yok); sıfır satırlar sıfır kalır.
+        """
+        if kind not in QUANTIZATION_KINDS:
+            raise ValueError(f"Bilinmeyen nicemleme türü: {kind}. Geçerli türler: {list(QUANTIZATION_KINDS)}")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if kind == 'float16':
+            return cls(vectors.astype(np.float16))
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return cls(codes, scales.astype(np.float32))
+
+    def rows(self, indices):
+        """Verilen satırları float32'ye açar."""
+        rows = self.codes[indices].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[indices][..., None]
+        return rows
+
+    def matmul(self, queries):
+        """
+        Tüm satırların sorgu vektör(ler)iyle nokta çarpımı (float32).
+
+        Args:
+            queries (np.ndarray): (d,) tek sorgu veya (m x d) sorgu matrisi.
+
+        Returns:
+            np.ndarray: (n,) veya (m x n) skorlar.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        n_rows = self.codes.shape[0]
+        scores = np.empty(queries.shape[:-1] + (n_rows,), dtype=np.float32)
+        for start in range(0, n_rows, DECODE_CHUNK_ROWS):
+            end = min(start + DECODE_CHUNK_ROWS, n_rows)
+            scores[..., start:end] = queries @ self.codes[start:end].astype(np.float32).T
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def to_dict(self):
+        """Model dosyasına kaydedilecek (sadece NumPy dizisi içeren) temsil."""
+        data = {'codes': self.codes}
+        if self.scales is not None:
+            data['scales'] = self.scales
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['codes'], data.get('scales'))
+
+
+if __name__ == '__main__':
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_dir not in sys.path:
+        sys.path.append(backend_dir)
+    from models.collaborative_filter import CollaborativeFilteringModel
+
+    parser = argparse.ArgumentParser(description="Model vektörlerini nicemler ve modele kaydeder.")
+    parser.add_argument('model', help="Model klasörü veya .joblib dosyası")
+    parser.add_argument('--kind', choices=QUANTIZATION_KINDS + ('none',), default='int8',
+                        help="Nicemleme türü ('none' nicemlemeyi kaldırır)")
+    parser.add_argument('--rerank-factor', type=int, default=DEFAULT_RERANK_FACTOR,
+                        help="Tam hassasiyetle yeniden sıralanacak aday çarpanı (0: re-rank yok)")
+    parser.add_argument('--output', default=None, help="Çıktı yolu (varsayılan: modelin üzerine yazılır)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    model = CollaborativeFilteringModel.load_model(args.model)
+    if model is None:
+        sys.exit(1)
+    model.quantize_vectors(None if args.kind == 'none' else args.kind, rerank_factor=args.rerank_factor)
+    if args.kind != 'none' and (args.output or args.model).endswith('.joblib'):
+        logging.warning("joblib dosyasında float64 ve nicemlenmiş vektörler birlikte belleğe yüklenir; bellek "
+                        "kazancı için model klasörü (mmap) kullanın.")
+    sys.exit(0 if model.save_model(args.output or args.model) else 1)
@@ -0,0 +1,152 @@
+# Kullanıcı oylama geçmişi için kompakt CSR deposu
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class RatingStore:
+    """
+    Kullanıcıların oyladığı filmleri ve puanları CSR (compressed sparse row) düzeninde saklar.
+    {userId: {movieId: rating}} iç içe sözlüğünün yerini alır.
+
+    - indptr: (n_users + 1,) kullanıcı satırlarının başlangıç/bitiş konumları
+    - movie_idx: (nnz,) int32 film matris indexleri (her satırda artan sırada)
+    - ratings: (nnz,) puanlar; yarım yıldız puanlarda uint8 (puan * 2), aksi halde float16
+
+    Satır erişimi O(1) dilimlemedir; row_indices kopya üretmez, row sadece puanları çözer.
+    """
+
+    def __init__(self, indptr, movie_idx, ratings, scale):
+        self.indptr = indptr
+        self.movie_idx = movie_idx
+        self.ratings = ratings
+        self.scale = scale # ratings / scale = gerçek puan (uint8 için 2.0, float16 için 1.0)
+
+    @staticmethod
+    def _encode_ratings(ratings):
+        """Puanlar yarım yıldız katlarıysa uint8'e (puan * 2), değilse float16'ya kodlar."""
+        ratings = np.asarray(ratings, dtype=np.float32)
+        doubled = ratings * 2
+        if len(ratings) and np.all(doubled == np.round(doubled)) and doubled.min() >= 0 and doubled.max() <= 255:
+            return doubled.astype(np.uint8), 2.0
+        return ratings.astype(np.float16), 1.0
+
+    @classmethod
+    def from_codes(cls, user_codes, movie_codes, ratings, n_users):
+        """
+        Kullanıcı/film kodlarından (matris index'leri) depoyu vektörel olarak oluşturur.
+        Aynı (kullanıcı, film) çifti birden fazla kez geçerse sözlükteki gibi sonuncusu tutulur.
+        """
+        user_codes = np.asarray(user_codes, dtype=np.int64)
+        movie_codes = np.asarray(movie_codes, dtype=np.int64)
+        ratings = np.asarray(ratings)
+
+        order = np.lexsort((movie_codes, user_codes)) # Önce kullanıcıya, sonra filme göre (kararlı)
+        user_codes = user_codes[order]
+        movie_codes = movie_codes[order]
+        ratings = ratings[order]
+
+        # Tekrarlanan çiftlerden sadece sonuncuyu tut
+        if len(order) > 1:
+            keep = np.ones(len(order), dtype=bool)
+            keep[:-1] = (user_codes[1:] != user_codes[:-1]) | (movie_codes[1:] != movie_codes[:-1])
+            user_codes, movie_codes, ratings = user_codes[keep], movie_codes[keep], ratings[keep]
+
+        counts = np.bincount(user_codes, minlength=n_users)
+        index_dtype = np.int32 if len(movie_codes) < np.iinfo(np.int32).max else np.int64
+        indptr = np.zeros(n_users + 1, dtype=index_dtype)
+        np.cumsum(counts, out=indptr[1:])
+        encoded, scale = cls._encode_ratings(ratings)
+        return cls(indptr, movie_codes.astype(np.int32), encoded, scale)
+
+    @classmethod
+    def from_csr(cls, matrix):
+        """Satırları kullanıcı, sütunları film olan (kanonik, sıralı) CSR matristen depo oluşturur."""
+        matrix = matrix.tocsr()
+        if not matrix.has_canonical_format:
+            matrix = matrix.copy()
+            matrix.sum_duplicates()
+        encoded, scale = cls._encode_ratings(matrix.data)
+        return cls(matrix.indptr.copy(), matrix.indices.astype(np.int32), encoded, scale)
+
+    @classmethod
+    def from_nested_dict(cls, ratings_by_user, user_map, movie_map):
+        """Eski {userId: {movieId: rating}} sözlüğünden depo oluşturur (eski model dosyaları için)."""
+        user_codes, movie_codes, ratings = [], [], []
+        for user_id, movie_ratings in ratings_by_user.items():
+            user_index = user_map.get(user_id)
+            if user_index is None:
+                continue
+            for movie_id, rating in movie_ratings.items():
+                movie_index = movie_map.get(movie_id)
+                if movie_index is None:
+                    continue
+                user_codes.append(user_index)
+                movie_codes.append(movie_index)
+                ratings.append(rating)
+        return cls.from_codes(user_codes, movie_codes, np.asarray(ratings, dtype=np.float32), len(user_map))
+
+    @property
+    def n_users(self):
+        return len(self.indptr) - 1
+
+    @property
+    def nnz(self):
+        return len(self.movie_idx)
+
+    @property
+    def nbytes(self):
+        """Depodaki dizilerin toplam bellek kullanımı (byte)."""
+        return self.indptr.nbytes + self.movie_idx.nbytes + self.ratings.nbytes
+
+    def row_indices(self, user_index):
+        """Kullanıcının oyladığı filmlerin matris indexleri (kopyasız dilim)."""
+        return self.movie_idx[self.indptr[user_index]:self.indptr[user_index + 1]]
+
+    def row(self, user_index):
+        """
+        Kullanıcının oylama geçmişi.
+
+        Returns:
+            tuple: (film matris indexleri, float32 puanlar)
+        """
+        start, end = self.indptr[user_index], self.indptr[user_index + 1]
+        return self.movie_idx[start:end], self.ratings[start:end].astype(np.float32) / self.scale
+
+    def rows_csr(self, user_indices, n_items, dtype=np.float32):
+        """
+        Sadece verilen kullanıcı satırlarını içeren küçük bir CSR matrisi döndürür
+        (satır sırası user_indices ile aynı). Tüm depoyu çözmeden komşu satırlarını almak için.
+        """
+        user_indices = np.asarray(user_indices, dtype=np.int64)
+        starts = self.indptr[user_indices].astype(np.int64)
+        lengths = self.indptr[user_indices + 1].astype(np.int64) - starts
+        sub_indptr = np.zeros(len(user_indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=sub_indptr[1:])
+        # Her satırın depo içindeki konumlarını tek bir vektörel işlemle üret
+        positions = np.repeat(starts - sub_indptr[:-1], lengths) + np.arange(sub_indptr[-1])
+        data = self.ratings[positions].astype(dtype) / dtype(self.scale)
+        return csr_matrix((data, self.movie_idx[positions], sub_indptr), shape=(len(user_indices), n_items))
+
+    def to_csr(self, n_items, dtype=np.float32):
+        """
+        Depoyu scipy CSR matrisine çevirir (indptr/indices paylaşılır, sadece puanlar çözülür).
+        """
+        data = self.ratings.astype(dtype) / dtype(self.scale)
+        return csr_matrix((data, self.movie_idx, self.indptr), shape=(self.n_users, n_items), copy=False)
+
+    def to_nested_dict(self, user_ids, movie_ids):
+        """Eski {userId: {movieId: rating}} temsilini üretir (karşılaştırma/geri uyumluluk için)."""
+        result = {}
+        for user_index, user_id in enumerate(user_ids):
+            movie_idx, ratings = self.row(user_index)
+            result[user_id] = dict(zip(movie_ids[movie_idx].tolist(), ratings.tolist()))
+        return result
+
+    def to_dict(self):
+        """Model dosyasına kaydedilecek (sadece NumPy dizisi ve skaler içeren) temsil."""
+        return {'indptr': self.indptr, 'movie_idx': self.movie_idx, 'ratings': self.ratings, 'scale': self.scale}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['indptr'], data['movie_idx'], data['ratings'], data['scale'])
+
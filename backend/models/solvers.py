@@ -0,0 +1,164 @@
+# Kullanıcı-film matrisi için kesik (truncated) SVD çözücüleri
+#
+# Tüm çözücüler TruncatedSVD ile aynı sözleşmeyi izler:
+#   user_vectors = U * Sigma   (n_users x k)   -> fit_transform çıktısı
+#   components   = V^T         (k x n_items)   -> components_ (item_vectors = components.T)
+# İşaretler svd_flip(u_based_decision=False) ile sabitlenir; aynı veriyle aynı sonuç üretilir.
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.linalg import lu
+from scipy.sparse import csr_matrix
+from sklearn.decomposition import TruncatedSVD
+from sklearn.utils import check_random_state
+from sklearn.utils.extmath import svd_flip
+
+SVD_SOLVERS = ('randomized', 'arpack', 'block_krylov')
+DEFAULT_SVD_SOLVER = 'randomized'
+DEFAULT_BLOCK_ROWS = 50_000 # block_krylov: bir satır bloğundaki kullanıcı sayısı
+
+SVDResult = namedtuple('SVDResult', ['user_vectors', 'components', 'singular_values', 'solver', 'params'])
+
+
+def _randomized(matrix, n_components, random_state, n_oversamples=10, n_iter=5, power_iteration_normalizer='auto'):
+    """Halko vd. rastgele SVD (TruncatedSVD varsayılanı); n_oversamples ve n_iter (kuvvet iterasyonu) ayarlanabilir."""
+    svd = TruncatedSVD(n_components=n_components, algorithm='randomized', n_oversamples=n_oversamples,
+                       n_iter=n_iter, power_iteration_normalizer=power_iteration_normalizer,
+                       random_state=random_state)
+    user_vectors = svd.fit_transform(matrix)
+    return user_vectors, svd.components_, svd.singular_values_, {
+        'n_oversamples': n_oversamples, 'n_iter': n_iter, 'power_iteration_normalizer': power_iteration_normalizer}
+
+
+def _arpack(matrix, n_components, random_state, tol=0.0):
+    """scipy ARPACK (Lanczos) ile kesin kesik SVD; k << min(boyut) için en doğru, genelde en yavaş."""
+    svd = TruncatedSVD(n_components=n_components, algorithm='arpack', tol=tol, random_state=random_state)
+    user_vectors = svd.fit_transform(matrix)
+    return user_vectors, svd.components_, svd.singular_values_, {'tol': tol}
+
+
+class RowBlocks:
+    """
+    CSR matrisini satır bloklarına böler. Bloklar indptr/indices/data dilimleri üzerinden
+    kopyasız kurulur (mmap ile açılmış önbellek matrisinde de bellek blok boyutuyla sınırlı kalır).
+    X @ M ve X^T @ P çarpımları bloklar üzerinde thread havuzunda hesaplanır; scipy'nin seyrek
+    çarpım çekirdekleri GIL'i bıraktığı için bloklar paralel çalışır.
+    """
+
+    def __init__(self, matrix, block_rows=DEFAULT_BLOCK_ROWS, n_jobs=None):
+        self.shape = matrix.shape
+        indptr = matrix.indptr
+        self.blocks = []
+        for start in range(0, matrix.shape[0], block_rows):
+            end = min(start + block_rows, matrix.shape[0])
+            lo, hi = indptr[start], indptr[end]
+            block = csr_matrix((matrix.data[lo:hi], matrix.indices[lo:hi], indptr[start:end + 1] - lo),
+                               shape=(end - start, matrix.shape[1]), copy=False)
+            self.blocks.append((start, end, block))
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+
+    def _map(self, func):
+        if self.n_jobs == 1 or len(self.blocks) == 1:
+            return [func(block) for block in self.blocks]
+        with ThreadPoolExecutor(max_workers=min(self.n_jobs, len(self.blocks))) as executor:
+            return list(executor.map(func, self.blocks))
+
+    def dot(self, dense):
+        """X @ dense (n_users x b)."""
+        out = np.empty((self.shape[0], dense.shape[1]), dtype=np.float64)
+
+        def work(item):
+            start, end, block = item
+            out[start:end] = block @ dense
+        self._map(work)
+        return out
+
+    def rdot(self, dense):
+        """X^T @ dense (n_items x b); blok katkıları toplanır."""
+        return sum(self._map(lambda item: item[2].T @ dense[item[0]:item[1]]))
+
+
+def _orthonormal_basis(vectors, rtol=1e-10):
+    """
+    Sütunların gerdiği alt uzay için ortonormal taban (Gram matrisi + özdeğer ayrışımı, iki geçiş).
+    Uzun-ince matrislerde Householder QR'dan çok daha hızlıdır (tek BLAS gemm + küçük eigh);
+    Krylov bloklarının neredeyse doğrusal bağımlı yönleri (küçük özdeğerler) atılır.
+    """
+    for _ in range(2):
+        eigenvalues, eigenvectors = np.linalg.eigh(vectors.T @ vectors)
+        keep = eigenvalues > eigenvalues[-1] * rtol
+        vectors = vectors @ (eigenvectors[:, keep] / np.sqrt(eigenvalues[keep]))
+    return vectors
+
+
+def _block_krylov(matrix, n_components, random_state, n_oversamples=5, n_iter=3, block_rows=DEFAULT_BLOCK_ROWS,
+                  n_jobs=None):
+    """
+    Blok Krylov SVD (Musco & Musco, 2015): K = [X G, (X X^T) X G, ..., (X X^T)^q X G] alt uzayında
+    Rayleigh-Ritz. Aynı iterasyon sayısında rastgele SVD'den daha geniş bir alt uzay kullanır;
+    matrise sadece satır blokları halinde (RowBlocks) ve sadece çarpımlarla erişilir.
+    """
+    rng = check_random_state(random_state)
+    blocks = RowBlocks(matrix, block_rows=block_rows, n_jobs=n_jobs)
+    width = n_components + n_oversamples
+    omega = rng.standard_normal((matrix.shape[1], width))
+
+    # Ara bloklar LU ile normalleştirilir (alt uzayı korur, QR'dan ucuz; TruncatedSVD'nin 'LU' seçeneği gibi)
+    block = lu(blocks.dot(omega), permute_l=True, check_finite=False)[0]
+    krylov = [block]
+    for _ in range(n_iter):
+        block = lu(blocks.dot(blocks.rdot(block)), permute_l=True, check_finite=False)[0]
+        krylov.append(block)
+    q = _orthonormal_basis(np.hstack(krylov))
+
+    # B = Q^T X (küçük: genişlik x n_items). B B^T = W S^2 W^T -> X ≈ (Q W) S (W^T B / S)
+    b = blocks.rdot(q).T
+    eigenvalues, eigenvectors = np.linalg.eigh(b @ b.T)
+    order = np.argsort(eigenvalues)[::-1][:n_components]
+    s = np.sqrt(np.maximum(eigenvalues[order], 0.0))
+    w = eigenvectors[:, order]
+    u = q @ w
+    vt = (w.T @ b) / np.where(s > 0, s, 1.0)[:, None]
+    u, vt = svd_flip(u, vt, u_based_decision=False)
+    dtype = np.result_type(matrix.dtype, np.float32) # TruncatedSVD gibi girdi hassasiyetinde döndür
+    return (u * s).astype(dtype), vt.astype(dtype), s.astype(dtype), {'n_oversamples': n_oversamples, 'n_iter': n_iter, 'block_rows': block_rows,
+                          'n_jobs': blocks.n_jobs}
+
+
+_SOLVERS = {'randomized': _randomized, 'arpack': _arpack, 'block_krylov': _block_krylov}
+
+
+def fit_svd(matrix, n_components, solver=DEFAULT_SVD_SOLVER, random_state=42, **params):
+    """
+    Seçilen çözücüyle kesik SVD hesaplar.
+
+    Args:
+        matrix: Kullanıcı-film CSR matrisi.
+        n_components (int): Bileşen sayısı.
+        solver (str): 'randomized', 'arpack' veya 'block_krylov'.
+        **params: Çözücüye özgü parametreler (ör. randomized için n_oversamples, n_iter).
+
+    Returns:
+        SVDResult: user_vectors, components, singular_values ve kullanılan solver/params.
+    """
+    if solver not in _SOLVERS:
+        raise ValueError(f"Geçersiz SVD çözücüsü: {solver} (seçenekler: {SVD_SOLVERS})")
+    user_vectors, components, singular_values, used_params = _SOLVERS[solver](
+        csr_matrix(matrix), n_components, random_state, **params)
+    return SVDResult(user_vectors, components, singular_values, solver, used_params)
+
+
+def reconstruction_error(matrix, user_vectors, components):
+    """
+    Göreli Frobenius hatası ||X - A V^T||_F / ||X||_F (A = user_vectors, V^T = components).
+    Yoğun yeniden kurulum matrisi oluşturulmadan küçük çarpımlarla hesaplanır:
+    ||X - A Vt||² = ||X||² - 2 <X Vt^T, A> + <A^T A, Vt Vt^T>.
+    """
+    matrix = csr_matrix(matrix)
+    data = matrix.data.astype(np.float64)
+    x_norm_sq = float(np.dot(data, data))
+    cross = float(np.sum((matrix @ components.T) * user_vectors))
+    approx_sq = float(np.sum((user_vectors.T @ user_vectors) * (components @ components.T)))
+    return float(np.sqrt(max(x_norm_sq - 2 * cross + approx_sq, 0.0) / x_norm_sq)) if x_norm_sq else 0.0
@@ -0,0 +1,350 @@
+# Performans ölçüm betikleri
+# Kullanım (backend klasöründen):
+#   python utils/benchmark.py ann [model_dosyası]
+#   python utils/benchmark.py ratings [model_dosyası]
+#   python utils/benchmark.py load <model.joblib> <model_klasörü>
+#   python utils/benchmark.py search [movies.csv]
+#   python utils/benchmark.py ingest [veri_klasörü]
+#   python utils/benchmark.py svd [veri_klasörü] [n_components]
+#   python utils/benchmark.py als [veri_klasörü] [n_components]
+#   python utils/benchmark.py quantize [model_dosyası]
+import os
+import sys
+import time
+import numpy as np
+
+# models/ ve utils/ modüllerini import edebilmek için backend klasörünü path'e ekle
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+DEFAULT_MODEL_PATH = os.path.join(BACKEND_DIR, "models", "cf_svd_model_data_k20_v2.joblib")
+DEFAULT_MOVIES_PATH = os.path.join(BACKEND_DIR, "data", "movies.csv")
+
+
+def _timeit(func, repeat):
+    """func'ı repeat kez çalıştırır, çağrı başına ortalama süreyi (ms) döndürür."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def benchmark_neighbor_index(user_vectors, k=50, n_queries=200, n_lists=None, probes=(1, 2, 4, 8, 16, 32)):
+    """
+    Tam (exact) ve yaklaşık (ivf) komşu indekslerini karşılaştırır.
+    Her n_probe değeri için recall@k ve sorgu başına gecikmeyi yazdırır.
+    Sorgular, kullanıcı vektörlerinden örneklenip gürültü eklenerek üretilir.
+    """
+    from models.neighbor_index import ExactNeighborIndex, IVFNeighborIndex
+
+    rng = np.random.default_rng(0)
+    queries = user_vectors[rng.choice(len(user_vectors), n_queries)]
+    queries = queries + rng.normal(scale=queries.std(), size=queries.shape)
+
+    start = time.perf_counter()
+    exact = ExactNeighborIndex.build(user_vectors)
+    print(f"Exact indeks kurulumu: {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    ivf = IVFNeighborIndex.build(user_vectors, n_lists=n_lists)
+    print(f"IVF indeks kurulumu ({ivf.n_lists} kova): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    truth = [set(exact.search(q, k)[0].tolist()) for q in queries]
+    exact_ms = _timeit(lambda: [exact.search(q, k) for q in queries], 1) / n_queries
+    print(f"{'indeks':<12}{'n_probe':>8}{'recall@k':>10}{'ms/sorgu':>10}")
+    print(f"{'exact':<12}{'-':>8}{1.0:>10.3f}{exact_ms:>10.3f}")
+    for n_probe in probes:
+        if n_probe > ivf.n_lists:
+            break
+        found = [set(ivf.search(q, k, n_probe=n_probe)[0].tolist()) for q in queries]
+        recall = np.mean([len(f & t) / max(len(t), 1) for f, t in zip(found, truth)])
+        ms = _timeit(lambda: [ivf.search(q, k, n_probe=n_probe) for q in queries], 1) / n_queries
+        print(f"{'ivf':<12}{n_probe:>8}{recall:>10.3f}{ms:>10.3f}")
+
+
+def deep_sizeof(obj, _seen=None):
+    """
+    Python nesnesinin (iç içe sözlük/liste dahil) yaklaşık toplam bellek kullanımı (byte).
+    RatingStore ile eski sözlük temsilini karşılaştırmak için kullanılır.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, _seen) + deep_sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(v, _seen) for v in obj)
+    return size
+
+
+def benchmark_rating_store(model):
+    """
+    CSR oylama deposu ile eski {userId: {movieId: rating}} sözlüğünün bellek kullanımını
+    ve satır erişim süresini karşılaştırır.
+    """
+    store = model.rating_store
+    user_ids = np.empty(len(model.user_map), dtype=np.int64)
+    for user_id, index in model.user_map.items():
+        user_ids[index] = user_id
+
+    start = time.perf_counter()
+    nested = store.to_nested_dict(user_ids.tolist(), model.movie_ids)
+    build_ms = (time.perf_counter() - start) * 1000
+    dict_bytes = deep_sizeof(nested)
+
+    print(f"Puan sayısı: {store.nnz}, kullanıcı sayısı: {store.n_users}")
+    print(f"{'temsil':<28}{'bellek (MB)':>14}{'byte/puan':>12}")
+    print(f"{'iç içe sözlük (eski)':<28}{dict_bytes / 1024 / 1024:>14.1f}{dict_bytes / max(store.nnz, 1):>12.1f}")
+    print(f"{'RatingStore (CSR)':<28}{store.nbytes / 1024 / 1024:>14.1f}{store.nbytes / max(store.nnz, 1):>12.1f}")
+    print(f"Sözlük / CSR oranı: {dict_bytes / max(store.nbytes, 1):.1f}x (sözlüğü kurmak {build_ms:.0f} ms sürdü)")
+
+    sample = np.random.default_rng(0).choice(store.n_users, min(1000, store.n_users), replace=False)
+    sample_ids = user_ids[sample].tolist()
+    dict_ms = _timeit(lambda: [list(nested[u].items()) for u in sample_ids], 5)
+    csr_ms = _timeit(lambda: [store.row(i) for i in sample], 5)
+    print(f"{len(sample)} satır okuma: sözlük {dict_ms:.2f} ms, CSR {csr_ms:.2f} ms")
+
+
+def benchmark_model_load(joblib_path, dir_path, repeat=3):
+    """joblib dosyası ile mmap klasör formatının yüklenme süresini karşılaştırır."""
+    import contextlib
+    import io
+    from models.collaborative_filter import CollaborativeFilteringModel
+
+    def load(path, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return CollaborativeFilteringModel.load_model(path, **kwargs)
+
+    print(f"{'format':<24}{'yükleme (ms)':>14}")
+    print(f"{'joblib (compress=3)':<24}{_timeit(lambda: load(joblib_path), repeat):>14.1f}")
+    print(f"{'klasör, mmap_mode=r':<24}{_timeit(lambda: load(dir_path), repeat):>14.1f}")
+    print(f"{'klasör, mmap yok':<24}{_timeit(lambda: load(dir_path, mmap_mode=None), repeat):>14.1f}")
+
+
+def benchmark_title_search(movies_path, queries=('a', 'the', 'star', 'star wars', 'toy story (1995)', 'love',
+                                                   'godfather', 'xyz', 'é', '(2015)'), repeat=5):
+    """
+    /api/movies araması: eski DataFrame taraması (copy + str.contains) ile trigram indeksini karşılaştırır.
+    Her sorgu için sonuçların birebir aynı olduğunu doğrular ve sorgu başına gecikmeyi yazdırır.
+    """
+    import pandas as pd
+    from utils.search_index import TitleSearchIndex
+
+    movies_df = pd.read_csv(movies_path)
+    start = time.perf_counter()
+    index = TitleSearchIndex(movies_df['title'].tolist())
+    print(f"{len(movies_df)} başlık, indeks kurulumu: {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{index.nbytes / 1024**2:.1f} MB")
+
+    def scan(term, prefix=False):
+        titles = movies_df.copy()['title']
+        mask = titles.str.upper().str.startswith(term.upper(), na=False) if prefix \
+            else titles.str.contains(term, case=False, regex=False, na=False)
+        return np.flatnonzero(mask.to_numpy())
+
+    print(f"{'sorgu':<20}{'mod':>10}{'sonuç':>8}{'tarama (ms)':>13}{'indeks (ms)':>13}{'aynı':>6}")
+    for term in queries:
+        for mode in ('substring', 'prefix'):
+            expected = scan(term, prefix=mode == 'prefix')
+            found = index.search(term, mode=mode)
+            scan_ms = _timeit(lambda: scan(term, prefix=mode == 'prefix'), repeat)
+            index_ms = _timeit(lambda: index.search(term, mode=mode), repeat)
+            same = 'evet' if np.array_equal(expected, found) else 'HAYIR'
+            print(f"{term:<20}{mode:>10}{len(found):>8}{scan_ms:>13.2f}{index_ms:>13.2f}{same:>6}")
+
+
+def _ingest_worker(mode, data_path):
+    """
+    Alt süreçte çalışır: veriyi verilen yöntemle yükleyip eğitime hazır matrisi kurar,
+    süre ve tepe RSS'i JSON olarak yazdırır (her yöntem kendi temiz sürecinde ölçülür).
+    """
+    import contextlib
+    import io
+    import json
+    from models.collaborative_filter import CollaborativeFilteringModel
+    from utils.preprocess import load_and_prepare_data, load_ratings_matrix, load_ratings_matrix_cached, peak_rss_mb
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == 'dataframe':
+            data = load_and_prepare_data(data_path)
+        elif mode == 'cached':
+            data = load_ratings_matrix_cached(data_path)
+        else:
+            data = load_ratings_matrix(data_path)
+        matrix = CollaborativeFilteringModel()._create_user_movie_data(data)
+    print(json.dumps({'seconds': time.perf_counter() - start, 'baseline_mb': baseline,
+                      'peak_rss_mb': peak_rss_mb(), 'nnz': int(matrix.nnz)}))
+
+
+def benchmark_ingest(data_path):
+    """
+    Eski (tam okuma + merge + kategori kodları), akışlı CSR ve ikili önbellekli yüklemenin süre/tepe RSS
+    karşılaştırması. Önbellek <veri_klasörü>/cache/ratings_matrix altında ilk 'cached' çalıştırmada kurulur.
+    """
+    import json
+    import subprocess
+
+    print(f"{'yöntem':<28}{'süre (s)':>10}{'tepe RSS (MB)':>15}{'import sonrası (MB)':>21}{'puan':>12}")
+    for mode, label in (('dataframe', 'load_and_prepare_data'), ('stream', 'load_ratings_matrix'),
+                        ('cached', 'cached (ilk/önbellek kurma)'), ('cached', 'cached (mmap önbellek)')):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '_ingest', mode, data_path],
+                                capture_output=True, text=True, check=True).stdout
+        stats = json.loads(output.strip().splitlines()[-1])
+        print(f"{label:<28}{stats['seconds']:>10.2f}{stats['peak_rss_mb']:>15.0f}{stats['baseline_mb']:>21.0f}"
+              f"{stats['nnz']:>12}")
+
+
+def benchmark_svd_solvers(data_path, n_components=20, fractions=(0.25, 0.5, 1.0), solvers=None):
+    """
+    SVD çözücülerinin (models/solvers.py) eğitim süresi ve göreli yeniden kurulum hatası
+    ||X - U S V^T||_F / ||X||_F karşılaştırması. Veri boyutu, kullanıcıların ilk %25/%50/%100'ü
+    alınarak değiştirilir. arpack kesin sonuca en yakın referanstır.
+    """
+    import contextlib
+    import io
+    from models.solvers import fit_svd, reconstruction_error
+    from utils.preprocess import load_ratings_matrix_cached
+
+    solvers = solvers or (
+        ('randomized', {}), ('randomized', {'n_iter': 2}), ('randomized', {'n_oversamples': 30, 'n_iter': 7}),
+        ('arpack', {}), ('block_krylov', {}), ('block_krylov', {'n_iter': 1}),
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        matrix = load_ratings_matrix_cached(data_path).matrix
+    print(f"n_components={n_components}")
+    print(f"{'kullanıcı':>10}{'puan':>11}  {'çözücü':<44}{'süre (s)':>10}{'hata':>10}{'σ1 sapma':>12}")
+    for fraction in fractions:
+        subset = matrix[:max(n_components + 1, int(matrix.shape[0] * fraction))]
+        reference = None
+        rows = []
+        for solver, params in solvers:
+            start = time.perf_counter()
+            result = fit_svd(subset, n_components, solver=solver, **params)
+            seconds = time.perf_counter() - start
+            error = reconstruction_error(subset, result.user_vectors, result.components)
+            if solver == 'arpack':
+                reference = result.singular_values
+            rows.append((f"{solver} {params or ''}", seconds, error, result.singular_values))
+        for label, seconds, error, singular_values in rows:
+            deviation = abs(singular_values[0] - reference[0]) / reference[0] if reference is not None else float('nan')
+            print(f"{subset.shape[0]:>10}{subset.nnz:>11}  {label:<44}{seconds:>10.2f}{error:>10.5f}{deviation:>12.2e}")
+
+
+def benchmark_als(data_path, n_components=50, n_iter=5):
+    """
+    ALS eğiticisinin (models/als.py) iterasyon süreleri: explicit/implicit, toplu CG ve kesin
+    (toplu np.linalg.solve) çözüm. Thread sayısı varsayılan olarak CPU sayısıdır.
+    """
+    import contextlib
+    import io
+    from models.als import fit_als
+    from utils.preprocess import load_ratings_matrix_cached
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        matrix = load_ratings_matrix_cached(data_path).matrix
+    print(f"{matrix.shape[0]} kullanıcı, {matrix.shape[1]} film, {matrix.nnz} puan, n_components={n_components}, "
+          f"{os.cpu_count()} CPU")
+    print(f"{'çözücü':<16}{'yöntem':>8}{'sn/iterasyon':>15}{'toplam (s)':>12}{'son değişim':>14}")
+    for implicit in (False, True):
+        for method in ('cg', 'exact'):
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = fit_als(matrix, n_components, implicit=implicit, method=method, n_iter=n_iter, tol=0)
+            total = sum(step['seconds'] for step in result.history)
+            print(f"{result.solver:<16}{method:>8}{total / len(result.history):>15.2f}{total:>12.2f}"
+                  f"{result.history[-1]['relative_change']:>14.2e}")
+
+
+def benchmark_quantization(model, n=10, k_neighbors=50, n_queries=200, rerank_factors=(0, 4)):
+    """
+    Nicemlenmiş vektörlerle (models/quantization.py) skorlamayı float64 ile karşılaştırır: taranan
+    dizilerin belleği, sorgu başına gecikme ve float64 sonuçlarıyla top-k örtüşmesi. İki yol ölçülür:
+    mevcut kullanıcıya film önerisi (top-n, predict) ve yeni kullanıcı komşu araması (top-k kosinüs).
+    """
+    import contextlib
+    import io
+    from models.quantization import QUANTIZATION_KINDS
+
+    rng = np.random.default_rng(0)
+    user_indices = rng.choice(len(model.user_ids), min(n_queries, len(model.user_ids)), replace=False)
+    user_vectors = [np.asarray(model.user_vectors[i]) for i in user_indices]
+    rated = [model.rating_store.row_indices(i) for i in user_indices]
+    queries = np.asarray(user_vectors)
+    queries = queries + rng.normal(scale=queries.std(), size=queries.shape)
+
+    def run():
+        items = [model._top_items(v, r, n)[0] for v, r in zip(user_vectors, rated)]
+        neighbors = [model.neighbor_index.search(q, k_neighbors)[0] for q in queries]
+        return items, neighbors
+
+    def overlap(found, truth, size):
+        return np.mean([len(set(f.tolist()) & set(t.tolist())) / size for f, t in zip(found, truth)])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.quantize_vectors(None)
+    truth_items, truth_neighbors = run()
+    item_ms = _timeit(lambda: [model._top_items(v, r, n) for v, r in zip(user_vectors, rated)], 1) / len(rated)
+    neighbor_ms = _timeit(lambda: [model.neighbor_index.search(q, k_neighbors) for q in queries], 1) / len(queries)
+    base_mb = (model.item_vectors.nbytes + model.neighbor_index._scanned_vectors().nbytes) / 1024**2
+    print(f"{len(model.movie_ids)} film, {len(model.user_ids)} kullanıcı, d={model.item_vectors.shape[1]}, "
+          f"n={n}, k_neighbors={k_neighbors}, {len(rated)} sorgu")
+    print(f"{'tür':<9}{'re-rank':>8}{'MB':>9}{'film ms':>10}{'örtüşme@n':>11}{'komşu ms':>10}{'örtüşme@k':>11}")
+    print(f"{'float64':<9}{'-':>8}{base_mb:>9.1f}{item_ms:>10.3f}{1.0:>11.3f}{neighbor_ms:>10.3f}{1.0:>11.3f}")
+    for kind in QUANTIZATION_KINDS:
+        for rerank_factor in rerank_factors:
+            with contextlib.redirect_stdout(io.StringIO()):
+                model.quantize_vectors(kind, rerank_factor=rerank_factor)
+            items, neighbors = run()
+            item_ms = _timeit(lambda: [model._top_items(v, r, n) for v, r in zip(user_vectors, rated)], 1) / len(rated)
+            neighbor_ms = _timeit(lambda: [model.neighbor_index.search(q, k_neighbors) for q in queries], 1) / len(queries)
+            mb = (model.quantized_item_vectors.nbytes + model.neighbor_index.quantized.nbytes) / 1024**2
+            print(f"{kind:<9}{'x' + str(rerank_factor) if rerank_factor else 'yok':>8}{mb:>9.1f}{item_ms:>10.3f}"
+                  f"{overlap(items, truth_items, n):>11.3f}{neighbor_ms:>10.3f}"
+                  f"{overlap(neighbors, truth_neighbors, k_neighbors):>11.3f}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.quantize_vectors(None)
+
+
+def _load_model(path):
+    from models.collaborative_filter import CollaborativeFilteringModel
+    model = CollaborativeFilteringModel.load_model(path)
+    if model is None:
+        sys.exit(f"Model yüklenemedi: {path}")
+    return model
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'ann'
+    model_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_MODEL_PATH
+
+    if command == 'ann':
+        model = _load_model(model_path)
+        benchmark_neighbor_index(model.user_vectors)
+    elif command == 'ratings':
+        model = _load_model(model_path)
+        benchmark_rating_store(model)
+    elif command == 'load':
+        if len(sys.argv) != 4:
+            sys.exit("Kullanım: python utils/benchmark.py load <model.joblib> <model_klasörü>")
+        benchmark_model_load(sys.argv[2], sys.argv[3])
+    elif command == 'ingest':
+        benchmark_ingest(sys.argv[2] if len(sys.argv) > 2 else os.path.join(BACKEND_DIR, "data"))
+    elif command == '_ingest':
+        _ingest_worker(sys.argv[2], sys.argv[3])
+    elif command == 'svd':
+        benchmark_svd_solvers(sys.argv[2] if len(sys.argv) > 2 else os.path.join(BACKEND_DIR, "data"),
+                              int(sys.argv[3]) if len(sys.argv) > 3 else 20)
+    elif command == 'als':
+        benchmark_als(sys.argv[2] if len(sys.argv) > 2 else os.path.join(BACKEND_DIR, "data"),
+                      int(sys.argv[3]) if len(sys.argv) > 3 else 50)
+    elif command == 'quantize':
+        model = _load_model(model_path)
+        benchmark_quantization(model)
+    elif command == 'search':
+        benchmark_title_search(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_MOVIES_PATH)
+    else:
+        sys.exit(f"Bilinmeyen komut: {command}")
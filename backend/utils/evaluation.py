@@ -0,0 +1,338 @@
+# Çevrimdışı değerlendirme ve hiper-parametre taraması (n_components, k_neighbors, rating_threshold)
+# Kullanım (backend klasöründen):
+#   python utils/evaluation.py --components 10 20 50 100 --k-neighbors 20 50 --thresholds 3.5 4.0 \
+#       --strategy leave_last_out --workers 4 --output evaluation_report.json
+# Rapor JSON olarak yazılır; her satır bir (yöntem, parametre) kombinasyonunun metrikleridir.
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+from models.collaborative_filter import CollaborativeFilteringModel
+from models.als import ALS_SOLVERS
+from models.solvers import DEFAULT_SVD_SOLVER, SVD_SOLVERS
+from utils.preprocess import RATINGS_DTYPES, ratings_matrix_from_arrays
+
+DEFAULT_DATA_PATH = os.path.join(BACKEND_DIR, "data")
+SPLIT_STRATEGIES = ('holdout', 'leave_last_out')
+
+# Süreç havuzundaki worker'ların paylaştığı veri. fork ile başlatılan worker'lar bu sözlüğü (ve
+# içindeki CSR matrisini) kopyalamadan, copy-on-write sayfalar üzerinden devralır.
+_SHARED = {}
+
+
+# --- Veri ve bölme (split) ---
+def load_ratings_with_timestamps(data_path=DEFAULT_DATA_PATH):
+    """
+    ratings.csv'yi kompakt tiplerle okur (timestamp varsa o da), sadece movies.csv'deki filmleri tutar.
+
+    Returns:
+        tuple: (ratings DataFrame'i [userId, movieId, rating, (timestamp)], movies DataFrame'i [movieId, title])
+    """
+    movies_df = pd.read_csv(os.path.join(data_path, 'movies.csv'), usecols=['movieId', 'title'])
+    ratings_file = os.path.join(data_path, 'ratings.csv')
+    columns = pd.read_csv(ratings_file, nrows=0).columns
+    usecols = ['userId', 'movieId', 'rating'] + (['timestamp'] if 'timestamp' in columns else [])
+    ratings_df = pd.read_csv(ratings_file, usecols=usecols, dtype={**RATINGS_DTYPES, 'timestamp': np.int64})
+    ratings_df = ratings_df[ratings_df['movieId'].isin(movies_df['movieId'])].reset_index(drop=True)
+    return ratings_df, movies_df
+
+
+def split_ratings(ratings_df, strategy='holdout', test_fraction=0.2, n_last=1, min_user_ratings=5,
+                  new_user_fraction=0.1, seed=42):
+    """
+    Puanları eğitim/test olarak böler.
+
+    - holdout: en az min_user_ratings puanı olan her kullanıcının puanlarının rastgele test_fraction kadarı teste.
+    - leave_last_out: her kullanıcının timestamp'e göre son n_last puanı teste.
+
+    Ayrıca uygun kullanıcıların new_user_fraction kadarı "yeni kullanıcı" olarak eğitimden tamamen
+    çıkarılır: bu kullanıcıların test dışı puanları predict_for_new_user'a girdi olarak verilir.
+
+    Returns:
+        dict: 'is_test' ve 'is_new_user' satır maskeleri (bool dizileri) ve özet bilgiler.
+    """
+    if strategy not in SPLIT_STRATEGIES:
+        raise ValueError(f"Geçersiz bölme stratejisi: {strategy} (seçenekler: {SPLIT_STRATEGIES})")
+    if strategy == 'leave_last_out' and 'timestamp' not in ratings_df:
+        raise ValueError("leave_last_out için ratings.csv'de timestamp sütunu gerekli.")
+
+    rng = np.random.default_rng(seed)
+    users = ratings_df['userId'].to_numpy()
+    n = len(users)
+    # Kullanıcı içinde sıralama anahtarı: zaman (leave_last_out) veya rastgele (holdout)
+    within_key = ratings_df['timestamp'].to_numpy() if strategy == 'leave_last_out' else rng.random(n)
+    order = np.lexsort((within_key, users))
+    sorted_users = users[order]
+    starts = np.flatnonzero(np.r_[True, sorted_users[1:] != sorted_users[:-1]])
+    counts = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, counts) # Kullanıcı içindeki sıra (0 = en eski / ilk)
+
+    eligible = counts >= min_user_ratings
+    if strategy == 'holdout':
+        n_test = np.maximum(1, np.round(counts * test_fraction)).astype(np.int64)
+    else:
+        n_test = np.full(len(counts), n_last, dtype=np.int64)
+    n_test[~eligible] = 0
+    is_test_sorted = rank >= np.repeat(counts - n_test, counts)
+
+    user_ids = sorted_users[starts]
+    eligible_users = user_ids[eligible]
+    n_new = int(round(len(eligible_users) * new_user_fraction))
+    new_users = rng.choice(eligible_users, size=n_new, replace=False) if n_new else np.empty(0, dtype=users.dtype)
+
+    is_test = np.empty(n, dtype=bool)
+    is_test[order] = is_test_sorted
+    is_new_user = np.isin(users, new_users)
+    return {
+        'is_test': is_test,
+        'is_new_user': is_new_user,
+        'strategy': strategy,
+        'test_fraction': test_fraction if strategy == 'holdout' else None,
+        'n_last': n_last if strategy == 'leave_last_out' else None,
+        'min_user_ratings': min_user_ratings,
+        'n_ratings': n,
+        'n_train': int((~is_test & ~is_new_user).sum()),
+        'n_test': int(is_test.sum()),
+        'n_users': len(user_ids),
+        'n_new_users': n_new,
+    }
+
+
+def _group_by_user(users, movies, ratings=None):
+    """Satırları {userId: [movieId, ...]} (ratings verilirse {userId: {movieId: rating}}) olarak gruplar."""
+    groups = {}
+    if ratings is None:
+        for user_id, movie_id in zip(users.tolist(), movies.tolist()):
+            groups.setdefault(user_id, []).append(movie_id)
+    else:
+        for user_id, movie_id, rating in zip(users.tolist(), movies.tolist(), ratings.tolist()):
+            groups.setdefault(user_id, {})[movie_id] = rating
+    return groups
+
+
+# --- Metrikler ---
+def ranking_metrics(recommended, relevant, k):
+    """
+    Tek bir kullanıcı için precision@k, recall@k ve NDCG@k (ikili alaka).
+
+    Args:
+        recommended (list): Önerilen movieId'ler (sıralı).
+        relevant (set): Testte alakalı (yüksek puanlı) movieId'ler.
+    """
+    top = recommended[:k]
+    gains = np.fromiter((movie_id in relevant for movie_id in top), dtype=np.float64, count=len(top))
+    hits = gains.sum()
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = float((gains * discounts[:len(gains)]).sum())
+    idcg = float(discounts[:min(len(relevant), k)].sum())
+    return hits / k, hits / len(relevant), dcg / idcg if idcg else 0.0
+
+
+def summarize_metrics(recommendations, relevant_by_user, k, n_items):
+    """Kullanıcı ortalamalı metrikler ve katalog kapsaması (önerilen tekil film / toplam film)."""
+    rows = [ranking_metrics(recommendations.get(user_id, []), relevant, k)
+            for user_id, relevant in relevant_by_user.items()]
+    recommended_items = {movie_id for items in recommendations.values() for movie_id in items[:k]}
+    precision, recall, ndcg = np.mean(rows, axis=0) if rows else (0.0, 0.0, 0.0)
+    return {
+        'k': k,
+        'precision': round(float(precision), 6),
+        'recall': round(float(recall), 6),
+        'ndcg': round(float(ndcg), 6),
+        'coverage': round(len(recommended_items) / n_items, 6) if n_items else 0.0,
+        'n_users': len(rows),
+    }
+
+
+# --- Değerlendirme ---
+def evaluate_predict(model, relevant_by_user, k=10):
+    """Mevcut (eğitimde görülen) kullanıcılar için predict_batch ile değerlendirme."""
+    user_ids = [u for u in relevant_by_user if u in model.user_map]
+    batch = model.predict_batch(user_ids, n_recommendations=k)
+    recommendations = {user_id: [movie_id for movie_id, _, _ in recs] for user_id, recs in batch.items()}
+    return summarize_metrics(recommendations, {u: relevant_by_user[u] for u in user_ids}, k, len(model.movie_ids))
+
+
+def evaluate_new_users(model, given_by_user, relevant_by_user, k=10, k_neighbors=50, rating_threshold=3.5):
+    """Eğitimde olmayan kullanıcılar için predict_for_new_user ile değerlendirme."""
+    recommendations = {}
+    for user_id, relevant in relevant_by_user.items():
+        given = given_by_user.get(user_id)
+        if not given:
+            continue
+        recs = model.predict_for_new_user(given, n_recommendations=k, k_neighbors=k_neighbors,
+                                          rating_threshold=rating_threshold)
+        recommendations[user_id] = [movie_id for movie_id, _, _ in recs]
+    return summarize_metrics(recommendations, {u: relevant_by_user[u] for u in recommendations}, k,
+                             len(model.movie_ids))
+
+
+def _evaluate_components(n_components):
+    """
+    Havuz görevi: paylaşılan eğitim matrisiyle n_components bileşenli modeli eğitir, predict ve
+    tüm (k_neighbors, rating_threshold) kombinasyonları için predict_for_new_user metriklerini döndürür.
+    """
+    settings = _SHARED['settings']
+    limits = contextlib.nullcontext()
+    if settings['workers'] > 1:
+        # Her worker tek BLAS thread'i kullansın (süreçler çekirdekleri zaten paylaşıyor)
+        from threadpoolctl import threadpool_limits
+        limits = threadpool_limits(limits=1)
+    with limits:
+        start = time.perf_counter()
+        model = CollaborativeFilteringModel(n_components=n_components, random_state=settings['seed'],
+                                            svd_solver=settings['svd_solver'])
+        model.fit(_SHARED['train'])
+        fit_seconds = time.perf_counter() - start
+
+        results = []
+        start = time.perf_counter()
+        row = evaluate_predict(model, _SHARED['known_relevant'], k=settings['k'])
+        row.update(method='predict', n_components=n_components, fit_seconds=round(fit_seconds, 3),
+                   eval_seconds=round(time.perf_counter() - start, 3))
+        results.append(row)
+
+        for k_neighbors in settings['k_neighbors']:
+            for rating_threshold in settings['rating_thresholds']:
+                start = time.perf_counter()
+                row = evaluate_new_users(model, _SHARED['new_given'], _SHARED['new_relevant'], k=settings['k'],
+                                         k_neighbors=k_neighbors, rating_threshold=rating_threshold)
+                row.update(method='predict_for_new_user', n_components=n_components, k_neighbors=k_neighbors,
+                           rating_threshold=rating_threshold, fit_seconds=round(fit_seconds, 3),
+                           eval_seconds=round(time.perf_counter() - start, 3))
+                results.append(row)
+    print(f"  n_components={n_components} tamamlandı (eğitim {fit_seconds:.1f} sn).")
+    return results
+
+
+def _sample_users(groups, max_users, rng):
+    if max_users is None or len(groups) <= max_users:
+        return groups
+    keep = rng.choice(np.fromiter(groups, dtype=np.int64), size=max_users, replace=False)
+    return {int(u): groups[int(u)] for u in keep}
+
+
+def run_sweep(data_path=DEFAULT_DATA_PATH, components=(10, 20, 50, 100), k_neighbors=(50,), rating_thresholds=(3.5,),
+              k=10, strategy='holdout', test_fraction=0.2, n_last=1, relevance_threshold=4.0, new_user_fraction=0.1,
+              max_users=1000, max_new_users=300, workers=None, seed=42, svd_solver=DEFAULT_SVD_SOLVER):
+    """
+    Veriyi böler, eğitim matrisini bir kez kurar ve n_components değerlerini süreç havuzunda paralel
+    değerlendirir. k_neighbors ve rating_threshold sadece predict_for_new_user'ı etkilediği için
+    her n_components modeli üzerinde yeniden eğitim yapılmadan taranır.
+
+    Returns:
+        dict: Makine tarafından okunabilir rapor (ayarlar, veri/bölme özeti, sonuç satırları, en iyiler).
+    """
+    workers = workers or os.cpu_count() or 1
+    print(f"Veri yükleniyor: {data_path}")
+    ratings_df, movies_df = load_ratings_with_timestamps(data_path)
+    split = split_ratings(ratings_df, strategy=strategy, test_fraction=test_fraction, n_last=n_last,
+                          new_user_fraction=new_user_fraction, seed=seed)
+    is_test, is_new_user = split.pop('is_test'), split.pop('is_new_user')
+    print(f"Bölme ({strategy}): {split['n_train']} eğitim, {split['n_test']} test puanı, "
+          f"{split['n_new_users']} yeni kullanıcı.")
+
+    users = ratings_df['userId'].to_numpy()
+    movies = ratings_df['movieId'].to_numpy()
+    ratings = ratings_df['rating'].to_numpy()
+    relevant_rows = is_test & (ratings >= relevance_threshold)
+    known_relevant = _group_by_user(users[relevant_rows & ~is_new_user], movies[relevant_rows & ~is_new_user])
+    new_relevant = _group_by_user(users[relevant_rows & is_new_user], movies[relevant_rows & is_new_user])
+    given_rows = ~is_test & is_new_user
+    new_given = _group_by_user(users[given_rows], movies[given_rows], ratings[given_rows])
+
+    rng = np.random.default_rng(seed)
+    train_rows = ~is_test & ~is_new_user
+    train = ratings_matrix_from_arrays(users[train_rows].copy(), movies[train_rows].copy(),
+                                       ratings[train_rows].copy(), movies_df)
+    del ratings_df, users, movies, ratings
+
+    _SHARED.clear()
+    _SHARED.update(
+        train=train,
+        known_relevant={u: set(items) for u, items in _sample_users(known_relevant, max_users, rng).items()},
+        new_relevant={u: set(items) for u, items in _sample_users(new_relevant, max_new_users, rng).items()},
+        new_given=new_given,
+        settings={'k': k, 'k_neighbors': list(k_neighbors), 'rating_thresholds': list(rating_thresholds),
+                  'seed': seed, 'workers': workers, 'svd_solver': svd_solver},
+    )
+
+    components = [c for c in components if c < min(train.matrix.shape)]
+    print(f"{len(components)} n_components değeri {min(workers, len(components))} süreçte değerlendiriliyor...")
+    start = time.perf_counter()
+    results = []
+    if workers > 1 and len(components) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=min(workers, len(components)), mp_context=context) as executor:
+            for rows in executor.map(_evaluate_components, components):
+                results.extend(rows)
+    else:
+        for n_components in components:
+            results.extend(_evaluate_components(n_components))
+
+    best = {}
+    for method in ('predict', 'predict_for_new_user'):
+        rows = [r for r in results if r['method'] == method]
+        if rows:
+            best[method] = max(rows, key=lambda r: r['ndcg'])
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'data_path': os.path.abspath(data_path),
+        'settings': {'k': k, 'relevance_threshold': relevance_threshold, 'components': list(components),
+                     'k_neighbors': list(k_neighbors), 'rating_thresholds': list(rating_thresholds),
+                     'max_users': max_users, 'max_new_users': max_new_users, 'workers': workers, 'seed': seed,
+                     'svd_solver': svd_solver},
+        'split': split,
+        'train_shape': list(train.matrix.shape),
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+        'results': results,
+        'best': best,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Öneri modeli için çevrimdışı değerlendirme ve parametre taraması")
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="movies.csv ve ratings.csv klasörü")
+    parser.add_argument('--components', type=int, nargs='+', default=[10, 20, 50, 100])
+    parser.add_argument('--k-neighbors', type=int, nargs='+', default=[50])
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[3.5], help="rating_threshold değerleri")
+    parser.add_argument('--k', type=int, default=10, help="@k metrikleri için öneri sayısı")
+    parser.add_argument('--strategy', choices=SPLIT_STRATEGIES, default='holdout')
+    parser.add_argument('--test-fraction', type=float, default=0.2, help="holdout için test oranı")
+    parser.add_argument('--n-last', type=int, default=1, help="leave_last_out için kullanıcı başına test puanı")
+    parser.add_argument('--relevance-threshold', type=float, default=4.0, help="Alakalı sayılan en düşük test puanı")
+    parser.add_argument('--new-user-fraction', type=float, default=0.1)
+    parser.add_argument('--max-users', type=int, default=1000, help="predict için değerlendirilecek en fazla kullanıcı")
+    parser.add_argument('--max-new-users', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=None, help="Süreç sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--solver', choices=SVD_SOLVERS + ALS_SOLVERS, default=DEFAULT_SVD_SOLVER,
+                        help="Eğitim çözücüsü")
+    parser.add_argument('--output', default='evaluation_report.json')
+    args = parser.parse_args()
+
+    report = run_sweep(args.data, args.components, args.k_neighbors, args.thresholds, k=args.k, strategy=args.strategy,
+                       test_fraction=args.test_fraction, n_last=args.n_last,
+                       relevance_threshold=args.relevance_threshold, new_user_fraction=args.new_user_fraction,
+                       max_users=args.max_users, max_new_users=args.max_new_users, workers=args.workers,
+                       seed=args.seed, svd_solver=args.solver)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"{'yöntem':<22}{'n_comp':>7}{'k_nb':>6}{'eşik':>6}{'prec':>8}{'recall':>8}{'ndcg':>8}{'kapsam':>8}")
+    for row in report['results']:
+        print(f"{row['method']:<22}{row['n_components']:>7}{row.get('k_neighbors', '-'):>6}"
+              f"{row.get('rating_threshold', '-'):>6}{row['precision']:>8.4f}{row['recall']:>8.4f}"
+              f"{row['ndcg']:>8.4f}{row['coverage']:>8.4f}")
+    print(f"Rapor yazıldı: {args.output}")
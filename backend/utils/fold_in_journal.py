@@ -0,0 +1,268 @@
+# Fold-in günlüğü: worker'lar arasında paylaşılan, yeniden başlatmada korunan fold-in kayıtları (SQLite, WAL)
+#
+# Fold-in'ler (models/fold_in.py) doğrudan bir worker'ın belleğine değil, önce bu günlüğe sadece eklenen
+# (append-only) kayıtlar olarak yazılır. Her worker istek başında kendi modelinin uyguladığı son kayıttan
+# (FoldInBuffer.applied_seq) sonrakileri tamponuna uygular; yeniden yüklenen veya yeniden başlatılan modeller
+# artifact'teki fold_in_seq'ten sonraki kayıtları aynı şekilde alır.
+#
+# Compaction (FoldInCompactor / CLI) servis edilen modele dokunmaz: artifact ayrı bir model olarak yüklenir
+# (mmap klasöründe sayfalar paylaşılır), günlük uygulanır, bekleyen kayıtlar dizilere yazılıp artifact aynı
+# yola kaydedilir (fold_in_seq ile). Worker'lar yeni artifact'e dosya izleme (MODEL_WATCH_INTERVAL) ile veya
+# kendi eşikleri dolduğunda geçer. Deployment genelinde aynı anda tek compaction çalışır (günlükteki kiralama).
+#
+# Kullanım (backend klasöründen):
+#   python utils/fold_in_journal.py status [--journal data/fold_in_journal.sqlite3]
+#   python utils/fold_in_journal.py compact models/cf_svd_model_data_k20_v2 [--threshold 0]
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPACTION_LEASE = 3600.0 # Bu süreden eski compaction kiralaması (çöken süreç) geçersiz sayılır (sn)
+DEFAULT_RETRY_INTERVAL = 60.0 # Eşik tetiklemeli compaction denemeleri arasındaki en kısa süre (sn)
+
+
+def user_event(user_id, ratings, replace=False):
+    """Kullanıcı fold-in kaydı ({movieId: puan}; replace=True ise modeldeki eski puanlar kullanılmaz)."""
+    return 'user', int(user_id), {'ratings': [[int(m), float(r)] for m, r in ratings.items()], 'replace': bool(replace)}
+
+
+def item_event(movie_id, title=None, genre_mask=0):
+    """Modelde olmayan film için fold-in kaydı (vektörü onu puanlayan kullanıcılardan hesaplanır)."""
+    return 'item', int(movie_id), {'title': title, 'genre_mask': int(genre_mask)}
+
+
+class FoldInJournal:
+    """Fold-in kayıtları: seq (artan) -> (tür, id, veri). Kayıtlar silinmez; model artifact'i fold_in_seq'e kadarını içerir."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local() # Thread (ve süreç) başına SQLite bağlantısı
+        self._connection() # Tabloları başlangıçta oluştur
+
+    def _connection(self):
+        """Bu thread için SQLite bağlantısı (fork sonrası yeniden açılır)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS fold_in_events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, entity_id INTEGER NOT NULL,"
+            " payload TEXT NOT NULL, created_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS fold_in_compaction ("
+            " id INTEGER PRIMARY KEY CHECK (id = 1), pid INTEGER NOT NULL, started_at REAL NOT NULL);"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _write(self, func):
+        """func(conn)'u tek bir BEGIN IMMEDIATE işleminde çalıştırır (hata olursa geri alınır)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    # --- Kayıtlar ---
+    def append(self, events):
+        """
+        Kayıtları (user_event / item_event) tek işlemde sırayla ekler.
+
+        Returns:
+            int: Son eklenen kaydın seq değeri.
+        """
+        now = time.time()
+
+        def write(conn):
+            seq = 0
+            for kind, entity_id, payload in events:
+                seq = conn.execute("INSERT INTO fold_in_events (kind, entity_id, payload, created_at) VALUES (?, ?, ?, ?)",
+                                   (kind, entity_id, json.dumps(payload, separators=(',', ':')), now)).lastrowid
+            return seq
+        return self._write(write)
+
+    def events_after(self, seq):
+        """seq'ten sonraki kayıtlar: [(seq, tür, id, veri), ...] (seq sırasıyla)."""
+        return [(row_seq, kind, entity_id, json.loads(payload)) for row_seq, kind, entity_id, payload in
+                self._connection().execute("SELECT seq, kind, entity_id, payload FROM fold_in_events"
+                                           " WHERE seq > ? ORDER BY seq", (seq,))]
+
+    def last_seq(self):
+        return self._connection().execute("SELECT COALESCE(MAX(seq), 0) FROM fold_in_events").fetchone()[0]
+
+    # --- Compaction kiralaması ---
+    def claim_compaction(self, lease=DEFAULT_COMPACTION_LEASE):
+        """Compaction kiralamasını alır; başka bir süreç (lease saniyeden kısa süredir) çalışıyorsa False."""
+        now = time.time()
+
+        def claim(conn):
+            row = conn.execute("SELECT started_at FROM fold_in_compaction WHERE id = 1").fetchone()
+            if row is not None and row[0] > now - lease:
+                return False
+            conn.execute("INSERT OR REPLACE INTO fold_in_compaction (id, pid, started_at) VALUES (1, ?, ?)",
+                         (os.getpid(), now))
+            return True
+        return self._write(claim)
+
+    def release_compaction(self):
+        self._write(lambda conn: conn.execute("DELETE FROM fold_in_compaction WHERE id = 1 AND pid = ?",
+                                              (os.getpid(),)))
+
+    def get_stats(self):
+        conn = self._connection()
+        events, last_seq = conn.execute("SELECT COUNT(*), COALESCE(MAX(seq), 0) FROM fold_in_events").fetchone()
+        running = conn.execute("SELECT pid, started_at FROM fold_in_compaction WHERE id = 1").fetchone()
+        return {'events': events, 'last_seq': last_seq, 'db_path': self.db_path,
+                'compaction_running': {'pid': running[0], 'started_at': running[1]} if running else None}
+
+
+def apply_journal(model, journal):
+    """Modelin henüz uygulamadığı günlük kayıtlarını tamponuna uygular; uygulanan kayıt sayısını döndürür."""
+    return model.fold_ins.apply_events(journal.events_after(model.fold_ins.applied_seq))
+
+
+def compact_artifact(model, journal, path, threshold=0):
+    """
+    path'ten yüklenmiş modele günlüğü uygular; bekleyen kayıt sayısı threshold'a ulaşırsa (0: en az bir kayıt)
+    kayıtları dizilere yazıp artifact'i path'e kaydeder.
+
+    Returns:
+        dict: status ('compacted' veya 'up_to_date'), bekleyen kayıt sayısı ve compaction özeti.
+    """
+    apply_journal(model, journal)
+    pending = len(model.fold_ins)
+    if not pending or pending < threshold:
+        return {'status': 'up_to_date', 'pending': pending}
+    compacted, summary = model.compact_fold_ins()
+    if not compacted.save_model(path):
+        raise RuntimeError(f"Compaction sonucu kaydedilemedi: {path}")
+    return {'status': 'compacted', 'pending': pending, **summary}
+
+
+class FoldInCompactor:
+    """
+    Arka plan thread'inde compaction. İstek yolunda çalışmaz ve servis edilen modelin dizilerine dokunmaz;
+    yeni artifact yazıldıktan (veya diskte servis edilenden yeni bir artifact varsa) reload ile bu worker geçer.
+
+    Args:
+        journal (FoldInJournal): Paylaşılan fold-in günlüğü.
+        load (callable): load(path) -> model (hata durumunda None veya exception).
+        reload (callable): reload(path) -> bu worker'da artifact'i yeniden yükler (ModelReloader).
+        artifact_path (callable): Compaction yapılacak artifact yolunu döndürür.
+        retry_interval (float): Eşik tetiklemeli iki deneme arasındaki en kısa süre (sn).
+    """
+
+    def __init__(self, journal, load, reload, artifact_path, retry_interval=DEFAULT_RETRY_INTERVAL):
+        self.journal = journal
+        self.load = load
+        self.reload = reload
+        self.artifact_path = artifact_path
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._running = False
+        self._next_attempt = 0.0
+        self.stats = {'compactions': 0, 'failures': 0}
+        self.last = None # Son denemenin özeti
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self, served_version, threshold=0, force=False, wait=False, reason='admin'):
+        """
+        Compaction'ı arka plan thread'inde başlatır (wait=True ise bitmesini bekler).
+        force=False iken son denemeden bu yana retry_interval geçmediyse başlatılmaz.
+
+        Returns:
+            bool: Başlatıldıysa True.
+        """
+        with self._lock:
+            if self._running or (not force and time.monotonic() < self._next_attempt):
+                return False
+            self._running = True
+        thread = threading.Thread(target=self._run, args=(served_version, threshold, reason),
+                                  name='fold-in-compaction', daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return True
+
+    def _run(self, served_version, threshold, reason):
+        started = time.time()
+        summary = {'reason': reason, 'started_at': started, 'pid': os.getpid()}
+        try:
+            if not self.journal.claim_compaction():
+                summary['status'] = 'busy' # Başka bir süreç compaction yapıyor
+                return
+            try:
+                path = summary['path'] = self.artifact_path()
+                model = self.load(path)
+                if model is None:
+                    raise RuntimeError(f"Model yüklenemedi: {path}")
+                summary.update(compact_artifact(model, self.journal, path, threshold))
+            finally:
+                self.journal.release_compaction()
+            if summary['status'] == 'compacted':
+                self.stats['compactions'] += 1
+                logger.info("Fold-in compaction artifact'e yazıldı (%s): %s", reason, path)
+            if summary['status'] == 'compacted' or model.model_version != served_version:
+                self.reload(path)
+        except Exception as e:
+            summary.update(status='failed', error=str(e))
+            self.stats['failures'] += 1
+            logger.exception("Fold-in compaction başarısız: %s", e)
+        finally:
+            summary['seconds'] = round(time.time() - started, 3)
+            self.last = summary
+            self._next_attempt = time.monotonic() + self.retry_interval
+            self._running = False
+
+    def get_status(self):
+        return {'running': self._running, 'last_compaction': self.last, **self.stats}
+
+
+if __name__ == '__main__':
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if backend_dir not in sys.path:
+        sys.path.append(backend_dir)
+    from models.collaborative_filter import CollaborativeFilteringModel
+
+    parser = argparse.ArgumentParser(description="Fold-in günlüğü durumu ve çevrimdışı compaction.")
+    parser.add_argument('command', choices=['status', 'compact'])
+    parser.add_argument('model', nargs='?', help="compact için model klasörü veya .joblib dosyası (yerinde güncellenir)")
+    parser.add_argument('--journal', default=os.path.join(backend_dir, 'data', 'fold_in_journal.sqlite3'))
+    parser.add_argument('--threshold', type=int, default=0,
+                        help="En az bu kadar bekleyen kullanıcı/film varsa compaction yapılır (0: en az bir)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    journal = FoldInJournal(args.journal)
+    if args.command == 'status':
+        print(json.dumps(journal.get_stats(), indent=2))
+        sys.exit(0)
+    if not args.model:
+        parser.error("compact için model yolu gerekli")
+    if not journal.claim_compaction():
+        sys.exit("Başka bir süreç compaction yapıyor.")
+    try:
+        model = CollaborativeFilteringModel.load_model(args.model)
+        if model is None:
+            sys.exit(1)
+        print(json.dumps(compact_artifact(model, journal, args.model, args.threshold), indent=2))
+    finally:
+        journal.release_compaction()
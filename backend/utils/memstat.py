@@ -0,0 +1,68 @@
+# Süreç bellek kullanımı (RSS/PSS) raporlama yardımcıları (Linux /proc üzerinden)
+# Kullanım (gunicorn master PID'i ile, tüm worker'ları listeler):
+#   python utils/memstat.py <master_pid>
+import os
+import sys
+
+# smaps_rollup içinden okunacak alanlar (kB)
+MEMORY_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def process_memory(pid='self'):
+    """
+    Bir sürecin bellek kullanımını /proc/<pid>/smaps_rollup dosyasından okur.
+    PSS (proportional set size), paylaşılan sayfaları paylaşan süreç sayısına böler; worker'lar
+    arasında modelin gerçekten paylaşılıp paylaşılmadığını görmek için RSS'ten daha doğrudur.
+
+    Returns:
+        dict: {'pid': ..., 'rss_kb': ..., 'pss_kb': ..., ...}; /proc yoksa (Linux dışı) None.
+    """
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        return None
+    stats = {'pid': os.getpid() if pid == 'self' else int(pid)}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(':') in MEMORY_FIELDS:
+                stats[parts[0].rstrip(':').lower() + '_kb'] = int(parts[1])
+    return stats
+
+
+def child_pids(pid):
+    """Bir sürecin doğrudan alt süreçlerinin PID'leri (gunicorn master -> worker'lar)."""
+    children = []
+    task_dir = f"/proc/{pid}/task"
+    if not os.path.isdir(task_dir):
+        return children
+    for task in os.listdir(task_dir):
+        try:
+            with open(os.path.join(task_dir, task, 'children')) as f:
+                children.extend(int(c) for c in f.read().split())
+        except OSError:
+            continue
+    return sorted(set(children))
+
+
+def report(master_pid):
+    """Master ve tüm worker'lar için RSS/PSS tablosunu yazdırır."""
+    pids = [int(master_pid)] + child_pids(master_pid)
+    print(f"{'pid':>8}{'rol':>8}{'RSS (MB)':>12}{'PSS (MB)':>12}{'paylaşılan (MB)':>18}{'özel (MB)':>12}")
+    total_pss = 0
+    for pid in pids:
+        stats = process_memory(pid)
+        if stats is None:
+            continue
+        shared = stats.get('shared_clean_kb', 0) + stats.get('shared_dirty_kb', 0)
+        private = stats.get('private_clean_kb', 0) + stats.get('private_dirty_kb', 0)
+        total_pss += stats.get('pss_kb', 0)
+        role = 'master' if pid == int(master_pid) else 'worker'
+        print(f"{pid:>8}{role:>8}{stats.get('rss_kb', 0) / 1024:>12.1f}{stats.get('pss_kb', 0) / 1024:>12.1f}"
+              f"{shared / 1024:>18.1f}{private / 1024:>12.1f}")
+    print(f"Toplam PSS (gerçek toplam bellek): {total_pss / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit("Kullanım: python utils/memstat.py <gunicorn_master_pid>")
+    report(sys.argv[1])
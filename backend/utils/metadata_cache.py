@@ -0,0 +1,251 @@
+# TMDB film metadatası (poster, özet, puan, çıkış tarihi) için sınırlı, TTL'li ve isteğe bağlı kalıcı cache
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Cache'te tutulan TMDB alanları (TMDB yanıtının geri kalanı atılır)
+METADATA_FIELDS = ('poster_path', 'overview', 'vote_average', 'release_date')
+
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_TTL = 7 * 24 * 3600 # Başarılı yanıtlar: 7 gün
+DEFAULT_NEGATIVE_TTL = 10 * 60 # TMDB'de bulunamayan (404) filmler: 10 dakika
+DEFAULT_ERROR_TTL = 30 # Geçici hatalar (zaman aşımı, 429, 5xx): 30 sn, sadece bellekte (diske/worker'lara yazılmaz)
+
+
+def extract_metadata(tmdb_data):
+    """TMDB film yanıtından yalnızca cache'lenen alanları alır."""
+    return {field: tmdb_data.get(field) for field in METADATA_FIELDS}
+
+
+class MetadataStore:
+    """
+    utils/prefetch_tmdb.py'nin doldurduğu kalıcı, süresiz TMDB metadata deposu (SQLite).
+    Uygulama bu dosyayı başlangıçta salt okunur açar; depoda bulunan filmler için istek sırasında
+    ağa hiç çıkılmaz. found=0 kayıtları TMDB'de bulunamayan (404) filmlerdir ve None döner.
+    """
+
+    MISS = object()
+
+    def __init__(self, db_path, read_only=True):
+        self.db_path = db_path
+        self.read_only = read_only
+        self._local = threading.local()
+        self._connection()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        if self.read_only:
+            conn = sqlite3.connect(f"file:{os.path.abspath(self.db_path)}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tmdb_metadata_store ("
+                " tmdb_id INTEGER PRIMARY KEY, found INTEGER NOT NULL, poster_path TEXT, overview TEXT,"
+                " vote_average REAL, release_date TEXT, fetched_at REAL NOT NULL)"
+            )
+            conn.commit()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, tmdb_id):
+        """Depodaki metadata'yı (veya bulunamayan film için None), kayıt yoksa MISS döndürür."""
+        try:
+            row = self._connection().execute(
+                "SELECT found, poster_path, overview, vote_average, release_date"
+                " FROM tmdb_metadata_store WHERE tmdb_id = ?", (int(tmdb_id),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("TMDB metadata deposu okunamadı: %s", e)
+            return self.MISS
+        if row is None:
+            return self.MISS
+        return dict(zip(METADATA_FIELDS, row[1:])) if row[0] else None
+
+    def known_ids(self):
+        """Depoda kaydı olan tüm tmdbId'ler (prefetch işinin kaldığı yerden devam etmesi için)."""
+        return {row[0] for row in self._connection().execute("SELECT tmdb_id FROM tmdb_metadata_store")}
+
+    def write_many(self, items):
+        """(tmdbId, metadata veya None) çiftlerini tek işlemde yazar."""
+        now = time.time()
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO tmdb_metadata_store"
+            " (tmdb_id, found, poster_path, overview, vote_average, release_date, fetched_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(int(tmdb_id), metadata is not None, *((metadata or {}).get(field) for field in METADATA_FIELDS), now)
+             for tmdb_id, metadata in items]
+        )
+        conn.commit()
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM tmdb_metadata_store").fetchone()[0]
+
+
+class MetadataCache:
+    """
+    tmdbId -> metadata sözlüğü için LRU cache.
+
+    - Bellekte en fazla max_entries kayıt tutulur; dolunca en uzun süredir kullanılmayan atılır.
+    - Başarılı kayıtlar ttl, TMDB'de bulunamayan (None) kayıtlar negative_ttl saniye sonra geçersiz olur.
+    - Geçici hatalar (set_error) sadece bu sürecin belleğinde error_ttl saniye tutulur: kısa bir TMDB
+      kesintisi paylaşılan SQLite dosyası üzerinden diğer worker'lara ve yeniden başlatmalara taşınmaz.
+    - db_path verilirse kayıtlar ayrıca SQLite dosyasına (WAL modu) yazılır: gunicorn worker'ları
+      aynı dosyayı paylaşır ve cache yeniden başlatmalarda sıcak kalır. Bellekte bulunamayan
+      kayıtlar önce diskten okunur.
+    - store (MetadataStore) verilirse, TTL'li katmanlardan önce bu kalıcı depoya bakılır.
+
+    get() bulunamayan/süresi dolmuş kayıt için MISS döndürür; None, "TMDB'de bulunamadı" anlamına
+    gelen geçerli bir (negatif) kayıttır.
+    """
+
+    MISS = object()
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 db_path=None, store=None, error_ttl=DEFAULT_ERROR_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.error_ttl = error_ttl
+        self.db_path = db_path
+        self.store = store
+        self._entries = OrderedDict() # tmdbId -> (expires_at, metadata veya None)
+        self._lock = threading.Lock()
+        self._local = threading.local() # Thread (ve süreç) başına SQLite bağlantısı
+        self.stats = {'hits': 0, 'negative_hits': 0, 'store_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0,
+                      'evictions': 0}
+        if db_path:
+            self._connection() # Tabloyu başlangıçta oluştur
+
+    # --- SQLite ---
+    def _connection(self):
+        """Bu thread için SQLite bağlantısı (fork sonrası yeniden açılır)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tmdb_metadata ("
+            " tmdb_id INTEGER PRIMARY KEY, found INTEGER NOT NULL, poster_path TEXT, overview TEXT,"
+            " vote_average REAL, release_date TEXT, expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _disk_get(self, tmdb_id):
+        try:
+            row = self._connection().execute(
+                "SELECT found, poster_path, overview, vote_average, release_date, expires_at"
+                " FROM tmdb_metadata WHERE tmdb_id = ?", (int(tmdb_id),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("TMDB cache veritabanı okunamadı: %s", e)
+            return None
+        if row is None:
+            return None
+        metadata = dict(zip(METADATA_FIELDS, row[1:5])) if row[0] else None
+        return row[5], metadata
+
+    def _disk_set_many(self, records):
+        try:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO tmdb_metadata"
+                " (tmdb_id, found, poster_path, overview, vote_average, release_date, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(int(tmdb_id), metadata is not None,
+                  *((metadata or {}).get(field) for field in METADATA_FIELDS), expires_at)
+                 for tmdb_id, expires_at, metadata in records]
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("TMDB cache veritabanına yazılamadı: %s", e)
+
+    # --- Bellek (LRU) ---
+    def _memory_put(self, tmdb_id, expires_at, metadata):
+        with self._lock:
+            self._entries[tmdb_id] = (expires_at, metadata)
+            self._entries.move_to_end(tmdb_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def get(self, tmdb_id):
+        """Geçerli kayıt varsa metadata'yı (veya negatif kayıt için None), yoksa MISS döndürür."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(tmdb_id)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(tmdb_id)
+                    self.stats['hits' if entry[1] is not None else 'negative_hits'] += 1
+                    return entry[1]
+                del self._entries[tmdb_id]
+                self.stats['expired'] += 1
+        if self.store is not None:
+            metadata = self.store.get(tmdb_id)
+            if metadata is not MetadataStore.MISS:
+                # Depo kayıtları süresizdir; LRU'ya normal TTL ile alınır
+                self._memory_put(tmdb_id, now + self.ttl, metadata)
+                with self._lock:
+                    self.stats['store_hits'] += 1
+                return metadata
+        if self.db_path:
+            entry = self._disk_get(tmdb_id)
+            if entry is not None and entry[0] > now:
+                self._memory_put(tmdb_id, *entry)
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                return entry[1]
+        with self._lock:
+            self.stats['misses'] += 1
+        return self.MISS
+
+    def set(self, tmdb_id, metadata):
+        """Bir kaydı yazar; metadata None ise (TMDB'de bulunamadı) negatif TTL ile saklanır."""
+        self.set_many([(tmdb_id, metadata)])
+
+    def set_error(self, tmdb_id):
+        """Geçici bir hatayı sadece bellekte error_ttl saniye tutar (aynı filme art arda istek açılmaz)."""
+        if self.error_ttl > 0:
+            self._memory_put(tmdb_id, time.time() + self.error_ttl, None)
+
+    def set_many(self, items):
+        """(tmdbId, metadata) çiftlerini tek SQLite işlemiyle yazar."""
+        now = time.time()
+        records = []
+        for tmdb_id, metadata in items:
+            expires_at = now + (self.ttl if metadata is not None else self.negative_ttl)
+            self._memory_put(tmdb_id, expires_at, metadata)
+            records.append((tmdb_id, expires_at, metadata))
+        if self.db_path and records:
+            self._disk_set_many(records)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """Hit/miss sayaçları ve doluluk bilgisi (bu süreç için)."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['negative_hits'] + stats['store_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else None
+        stats.update(max_entries=self.max_entries, ttl=self.ttl, negative_ttl=self.negative_ttl, error_ttl=self.error_ttl,
+                     db_path=self.db_path, store_path=self.store.db_path if self.store is not None else None)
+        return stats
@@ -0,0 +1,279 @@
+# Süreç içi metrik kaydı (sayaç ve histogram) ve Prometheus metin formatı (/metrics)
+#
+# Her gunicorn worker'ı kendi kaydını tutar; directory verilmişse anlık görüntüsünü (snapshot) en fazla
+# flush_interval saniyede bir <directory>/metrics-<pid>.json dosyasına yazar (geçici dosya + os.replace).
+# /metrics isteği hangi worker'a düşerse düşsün dizindeki tüm dosyalar toplanır. Sonlanan worker'ların
+# dosyaları metrics-retired.json toplamına eklenip silinir (toplama sırasında veya aynı PID'i alan yeni bir
+# süreç ilk yazmasını yapmadan önce); böylece toplam sayaçlar geri gitmez ve metrics_workers sadece yaşayan
+# worker'ları sayar. gunicorn.conf.py dizini master başına ayırır.
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows: dosya kilidi yok (tek süreçli geliştirme sunucusu)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_FLUSH_INTERVAL = 5.0
+RETIRED_FILENAME = 'metrics-retired.json'
+LOCK_FILENAME = 'metrics.lock'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in items) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _merge(counters, histograms, snapshot):
+    """Snapshot'ın sayaç ve histogramlarını {(ad, etiketler): ...} sözlüklerine ekler."""
+    for name, labels, value in snapshot['counters']:
+        key = (name, tuple(tuple(label) for label in labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, values in snapshot['histograms']:
+        key = (name, tuple(tuple(label) for label in labels))
+        total = histograms.get(key)
+        histograms[key] = values if total is None else [a + b for a, b in zip(total, values)]
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True # Süreç var, sinyal izni yok
+    return True
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class MetricsRegistry:
+    """
+    Sayaç ve histogram kaydı (thread-safe, süreç başına).
+
+    Args:
+        directory (str): Worker snapshot dosyalarının yazılacağı ortak dizin; None ise sadece bu süreç raporlanır.
+        flush_interval (float): maybe_flush'ın snapshot yazma aralığı (sn).
+    """
+
+    def __init__(self, directory=None, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._definitions = {} # ad -> (tür, açıklama, histogram sınırları)
+        self._counters = {} # (ad, etiketler) -> değer
+        self._histograms = {} # (ad, etiketler) -> [kova sayıları (+Inf dahil, birikimsiz)..., toplam]
+        self._collectors = []
+        self._last_flush = 0.0
+        self._flushed_pid = None # Dosyasını bu süreçte ilk kez yazan PID (eski dosya devralınmasın)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Fork'ta (gunicorn preload) master'da kaydedilenler worker'lara kopyalanıp iki kez sayılmasın
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+        self._flushed_pid = None
+
+    # --- Tanımlar ---
+    def counter(self, name, description):
+        self._definitions[name] = ('counter', description, None)
+
+    def histogram(self, name, description, buckets=DEFAULT_BUCKETS):
+        self._definitions[name] = ('histogram', description, tuple(sorted(buckets)))
+
+    def add_collector(self, collect):
+        """
+        Snapshot alınırken çağrılan fonksiyon ekler. collect() -> [(sayaç adı, {etiketler}, değer), ...];
+        bileşenlerin kendi tuttuğu birikimli sayaçları (ör. cache istatistikleri) kayda aktarmak için.
+        """
+        self._collectors.append(collect)
+
+    # --- Kayıt ---
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Histograma bir gözlem (saniye) ekler."""
+        buckets = self._definitions[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(buckets, value) # value <= sınır olan ilk kova (le)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += value
+
+    # --- Snapshot ve dosya paylaşımı ---
+    def snapshot(self):
+        """Bu sürecin değerleri (JSON'a yazılabilir)."""
+        counters = {}
+        for collect in self._collectors:
+            try:
+                for name, labels, value in collect():
+                    key = (name, tuple(sorted(labels.items())))
+                    counters[key] = counters.get(key, 0) + value
+            except Exception:
+                logger.exception("Metrik toplayıcısı çalıştırılamadı")
+        with self._lock:
+            for key, value in self._counters.items():
+                counters[key] = counters.get(key, 0) + value
+            histograms = [[name, list(labels), list(values)] for (name, labels), values in self._histograms.items()]
+        return {'pid': os.getpid(), 'time': time.time(),
+                'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+                'histograms': histograms}
+
+    def _retire(self, pids):
+        """
+        Verilen PID'lerin dosyalarını metrics-retired.json toplamına ekleyip siler. Dizin kilidi altında çalışır;
+        kilit alındıktan sonra hâlâ yaşayan (kendisi hariç) PID'ler atlanır, böylece aynı dosya iki kez eklenmez.
+        """
+        with open(os.path.join(self.directory, LOCK_FILENAME), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            retired_path = os.path.join(self.directory, RETIRED_FILENAME)
+            retired = _read_json(retired_path) or {'workers': 0, 'counters': [], 'histograms': []}
+            counters, histograms = {}, {}
+            _merge(counters, histograms, retired)
+            paths = []
+            for pid in pids:
+                if pid != os.getpid() and _pid_alive(pid):
+                    continue
+                path = os.path.join(self.directory, f"metrics-{pid}.json")
+                snapshot = _read_json(path)
+                if snapshot is None:
+                    continue
+                _merge(counters, histograms, snapshot)
+                retired['workers'] += 1
+                paths.append(path)
+            if not paths:
+                return
+            _write_json(retired_path, {
+                'workers': retired['workers'], 'time': time.time(),
+                'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+                'histograms': [[name, list(labels), values] for (name, labels), values in histograms.items()]})
+            for path in paths:
+                os.remove(path)
+
+    def flush(self):
+        """
+        Snapshot'ı bu worker'ın dosyasına yazar (directory yoksa bir şey yapmaz). Süreçteki ilk yazmadan önce
+        aynı PID'le kalmış eski bir dosya varsa (PID yeniden kullanımı) emekli toplamına eklenir.
+        """
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+        if self._flushed_pid != os.getpid():
+            if os.path.exists(path):
+                self._retire([os.getpid()])
+            self._flushed_pid = os.getpid()
+        _write_json(path, self.snapshot())
+
+    def maybe_flush(self):
+        """Son yazmadan bu yana flush_interval geçtiyse snapshot'ı yazar (her istekten sonra çağrılır)."""
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def collect(self):
+        """
+        Tüm worker'ların toplamı: bu süreç güncel snapshot ile, diğerleri dizindeki son dosyalarıyla.
+
+        Sonlanmış worker'ların dosyaları önce emekli toplamına taşınır.
+
+        Returns:
+            tuple: ({(ad, etiketler): değer}, {(ad, etiketler): [kova sayıları..., toplam]},
+                    yaşayan worker sayısı, sonlanmış worker sayısı)
+        """
+        snapshots = [self.snapshot()]
+        retired_workers = 0
+        if self.directory:
+            self.flush()
+            pids = {}
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                suffix = os.path.basename(path)[len('metrics-'):-len('.json')]
+                if suffix.isdigit():
+                    pids[int(suffix)] = path
+            dead = [pid for pid in pids if not _pid_alive(pid)]
+            if dead:
+                self._retire(dead)
+            for pid, path in pids.items():
+                if pid == os.getpid() or pid in dead:
+                    continue
+                snapshot = _read_json(path)
+                if snapshot is not None: # Yazılmakta olan veya bozuk dosya atlanır
+                    snapshots.append(snapshot)
+            retired = _read_json(os.path.join(self.directory, RETIRED_FILENAME))
+            if retired is not None:
+                retired_workers = retired['workers']
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            _merge(counters, histograms, snapshot)
+        if retired_workers:
+            _merge(counters, histograms, retired)
+        return counters, histograms, len(snapshots), retired_workers
+
+    def render(self):
+        """Prometheus metin formatı (text/plain; version=0.0.4)."""
+        counters, histograms, n_workers, n_retired = self.collect()
+        lines = ['# HELP metrics_workers Metrikleri toplanan yaşayan worker süreci sayısı.', '# TYPE metrics_workers gauge',
+                 f'metrics_workers {n_workers}',
+                 '# HELP metrics_retired_workers Sayaçları toplama eklenmiş sonlanmış worker süreci sayısı.',
+                 '# TYPE metrics_retired_workers gauge', f'metrics_retired_workers {n_retired}']
+        for name, (kind, description, buckets) in sorted(self._definitions.items()):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float('inf'),), values[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels, ("le", _format_value(float(bound))))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(values[-1])}')
+                lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
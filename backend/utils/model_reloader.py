@@ -0,0 +1,132 @@
+# Kesintisiz model yeniden yükleme: yeni artifact arka planda yüklenir, smoke sorgusuyla doğrulanır ve
+# global model referansı tek atamayla değiştirilir.
+#
+# İstekler modeli başlangıçta bir kez alır (app.py: flask.g.model); değişim sırasında işlenen istekler eski
+# modelle tamamlanır, sonraki istekler yenisini kullanır. Doğrulama başarısız olursa eski model kalır.
+# Yeniden yükleme süreç (worker) başınadır: admin endpoint'i isteği karşılayan worker'ı günceller, dosya
+# izleme (watch) açıksa her worker değişikliği kendisi fark edip yükler.
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_signature(path):
+    """
+    Model dosyası/klasörü için değişiklik imzası: klasörde manifest.json, dosyada kendisi için (mtime_ns, boyut).
+    Yol yoksa None.
+    """
+    target = os.path.join(path, 'manifest.json') if os.path.isdir(path) else path
+    try:
+        stat = os.stat(target)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ModelReloader:
+    """
+    Args:
+        load (callable): load(path) -> yeni model (hata durumunda None döndürebilir veya exception atabilir).
+        validate (callable): validate(model) -> smoke sorgusu; başarısızsa exception atar.
+        swap (callable): swap(model) -> global referansı değiştirir.
+        default_path (callable): Yol verilmezse yüklenecek artifact yolunu döndürür.
+        poll_interval (float): Dosya izleme aralığı (sn); 0 ise izleme kapalı.
+    """
+
+    def __init__(self, load, validate, swap, default_path, poll_interval=0.0):
+        self.load = load
+        self.validate = validate
+        self.swap = swap
+        self.default_path = default_path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._loading = False
+        self._watch_pid = None
+        self._watched = None # (yol, imza) - son yüklenen/denenen artifact
+        self.stats = {'reloads': 0, 'failures': 0}
+        self.last = None # Son denemenin özeti
+
+    @property
+    def loading(self):
+        return self._loading
+
+    def reload(self, path=None, wait=False, reason='admin'):
+        """
+        Yeniden yüklemeyi arka plan thread'inde başlatır (wait=True ise bitmesini bekler).
+
+        Returns:
+            bool: Başlatıldıysa True; zaten bir yükleme sürüyorsa False.
+        """
+        with self._lock:
+            if self._loading:
+                return False
+            self._loading = True
+        path = path or self.default_path()
+        thread = threading.Thread(target=self._run, args=(path, reason), name='model-reload', daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return True
+
+    def _run(self, path, reason):
+        started = time.time()
+        summary = {'path': path, 'reason': reason, 'started_at': started, 'pid': os.getpid()}
+        signature = artifact_signature(path)
+        try:
+            logger.info("Model yeniden yükleniyor (%s): %s", reason, path)
+            model = self.load(path)
+            if model is None:
+                raise RuntimeError(f"Model yüklenemedi: {path}")
+            self.validate(model)
+            self.swap(model)
+            summary.update(status='ok', model_version=model.model_version)
+            self.stats['reloads'] += 1
+            logger.info("Model değiştirildi: sürüm %s (%.2f sn)", model.model_version, time.time() - started)
+        except Exception as e:
+            summary.update(status='failed', error=str(e))
+            self.stats['failures'] += 1
+            logger.exception("Model yeniden yüklenemedi, mevcut model kullanılmaya devam ediyor: %s", e)
+        finally:
+            summary['seconds'] = round(time.time() - started, 3)
+            self.last = summary
+            self._watched = (path, signature)
+            self._loading = False
+
+    # --- Dosya izleme ---
+    def ensure_watcher(self):
+        """
+        İzleme thread'ini bu süreçte (gerekirse) başlatır. Thread'ler fork'ta kopyalanmadığı için her worker'da
+        ilk istekte çağrılır (gunicorn preload modunda master'da başlatılan thread worker'lara geçmez).
+        """
+        if not self.poll_interval or self._watch_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watch_pid == os.getpid():
+                return
+            self._watch_pid = os.getpid()
+            path = self.default_path()
+            if self._watched is None or self._watched[0] != path:
+                self._watched = (path, artifact_signature(path))
+        threading.Thread(target=self._watch_loop, name='model-watch', daemon=True).start()
+
+    def _watch_loop(self):
+        pending = None # Yazma tamamlansın diye imzanın iki ardışık kontrolde aynı kalması beklenir
+        while True:
+            time.sleep(self.poll_interval)
+            path = self.default_path()
+            signature = artifact_signature(path)
+            if signature is None or (path, signature) == self._watched:
+                pending = None
+                continue
+            if pending != (path, signature):
+                pending = (path, signature)
+                continue
+            pending = None
+            self.reload(path, wait=True, reason='watch')
+
+    def get_status(self):
+        return {'loading': self._loading, 'poll_interval': self.poll_interval, 'last_reload': self.last,
+                **self.stats}
@@ -0,0 +1,132 @@
+# movies.csv + links.csv için sütun tabanlı (columnar) film kataloğu
+import logging
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# models/ altındaki IdMap için backend klasörünü path'e ekle
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+from models.id_map import IdMap
+from models.genres import GenreVocabulary
+
+logger = logging.getLogger(__name__)
+
+MISSING = -1 # tmdb_ids dizisinde "yok" değeri
+
+
+class MovieCatalog:
+    """
+    Tüm filmlerin bilgilerini aynı sırada hizalanmış dizilerde tutan salt okunur katalog.
+
+    - movie_ids, titles, genres: movies.csv sütunları (satır sırası korunur).
+    - genre_masks: genres sütunundan bir kez hesaplanan tür bit maskeleri (uint32, models/genres.py).
+    - tmdb_ids: links.csv'den; bağlantısı olmayan filmler için -1.
+
+    movieId -> satır araması IdMap (np.searchsorted) ile yapılır; `movies_df[movies_df['movieId'] == id]`
+    gibi 86k satırlık tarama yerine O(log n) ve birden fazla id için tek vektörel çağrı.
+    """
+
+    def __init__(self, movie_ids, titles, genres, tmdb_ids=None):
+        self.movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        self.titles = np.asarray(titles, dtype=object)
+        self.genres = np.asarray(genres, dtype=object)
+        self.genre_vocabulary = GenreVocabulary.from_strings(self.genres)
+        self.genre_masks = self.genre_vocabulary.encode(self.genres)
+        self.has_links = tmdb_ids is not None
+        self.tmdb_ids = np.asarray(tmdb_ids, dtype=np.int64) if tmdb_ids is not None \
+            else np.full(len(self.movie_ids), MISSING, dtype=np.int64)
+        self._movie_index = IdMap(self.movie_ids)
+        # tmdbId -> satır; aynı tmdbId birden fazla filmde varsa sözlükteki gibi sonuncusu kalır
+        linked = np.flatnonzero(self.tmdb_ids != MISSING)
+        tmdb_keys = self.tmdb_ids[linked]
+        unique_keys, first_positions = np.unique(tmdb_keys[::-1], return_index=True)
+        self._tmdb_rows = linked[::-1][first_positions]
+        self._tmdb_index = IdMap(unique_keys)
+
+    @classmethod
+    def from_csv(cls, movies_path, links_path=None):
+        """
+        movies.csv (ve varsa links.csv) dosyalarından katalog oluşturur.
+        links.csv bulunamazsa katalog tmdbId'siz oluşturulur (has_links=False).
+        """
+        movies = pd.read_csv(movies_path, usecols=['movieId', 'title', 'genres'])
+        tmdb_ids = None
+        if links_path is not None:
+            try:
+                links = pd.read_csv(links_path, usecols=['movieId', 'tmdbId']).dropna(subset=['tmdbId'])
+                links = links.drop_duplicates('movieId', keep='last')
+                link_map = IdMap(links['movieId'].to_numpy())
+                rows = link_map.lookup(movies['movieId'].to_numpy())
+                link_tmdb_ids = links['tmdbId'].astype(np.int64).to_numpy()
+                tmdb_ids = np.where(rows >= 0, link_tmdb_ids[np.maximum(rows, 0)], MISSING)
+            except FileNotFoundError as e:
+                logger.warning("Link dosyası bulunamadı: %s. tmdbId'ler kullanılamayacak.", e)
+        return cls(movies['movieId'].to_numpy(), movies['title'].to_numpy(), movies['genres'].to_numpy(), tmdb_ids)
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    def __contains__(self, movie_id):
+        return self._movie_index.get(movie_id) is not None
+
+    # --- Arama ---
+    def position(self, movie_id):
+        """movieId'nin katalogdaki satırı; yoksa None."""
+        return self._movie_index.get(movie_id)
+
+    def positions(self, movie_ids):
+        """Birden fazla movieId için satırlar (tek vektörel çağrı); olmayanlar -1."""
+        return self._movie_index.lookup(movie_ids)
+
+    def positions_for_tmdb(self, tmdb_ids):
+        """tmdbId'lere karşılık gelen satırlar; olmayanlar -1."""
+        rows = self._tmdb_index.lookup(tmdb_ids)
+        return np.where(rows >= 0, self._tmdb_rows[np.maximum(rows, 0)], MISSING)
+
+    def movie_id_for_tmdb(self, tmdb_id):
+        """tmdbId -> movieId; yoksa None."""
+        row = self._tmdb_index.get(tmdb_id)
+        return None if row is None else int(self.movie_ids[self._tmdb_rows[row]])
+
+    def tmdb_id(self, movie_id):
+        """movieId -> tmdbId; film veya bağlantısı yoksa None."""
+        position = self.position(movie_id)
+        if position is None or self.tmdb_ids[position] == MISSING:
+            return None
+        return int(self.tmdb_ids[position])
+
+    def titles_for(self, movie_ids):
+        """movieId'lere karşılık başlık dizisi (object); katalogda olmayanlar None."""
+        positions = self.positions(movie_ids)
+        titles = self.titles[np.maximum(positions, 0)] if len(self.titles) else np.full(len(positions), None)
+        titles[positions < 0] = None
+        return titles
+
+    def genre_masks_for(self, movie_ids):
+        """movieId'lere karşılık tür maskeleri (uint32); katalogda olmayanlar 0."""
+        positions = self.positions(movie_ids)
+        masks = self.genre_masks[np.maximum(positions, 0)] if len(self.genre_masks) else np.zeros(len(positions), dtype=np.uint32)
+        masks[positions < 0] = 0
+        return masks
+
+    # --- Yanıt satırları ---
+    def records(self, positions):
+        """
+        Verilen satırlar için API yanıtı sözlükleri: movieId, title, genres, tmdbId.
+        Sütunlar toplu olarak Python nesnelerine çevrilir (satır başına pandas erişimi yok).
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        tmdb_ids = self.tmdb_ids[positions].tolist()
+        return [
+            {"movieId": movie_id, "title": title, "genres": genres, "tmdbId": tmdb_id if tmdb_id != MISSING else None}
+            for movie_id, title, genres, tmdb_id in zip(self.movie_ids[positions].tolist(), self.titles[positions].tolist(),
+                                                        self.genres[positions].tolist(), tmdb_ids)
+        ]
+
+    def record(self, movie_id):
+        """Tek bir film için yanıt sözlüğü; yoksa None."""
+        position = self.position(movie_id)
+        return None if position is None else self.records([position])[0]
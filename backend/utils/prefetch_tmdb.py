@@ -0,0 +1,186 @@
+# links.csv'deki tüm filmler için TMDB metadatasını (poster, özet, puan, çıkış tarihi) önceden çeken iş
+# Kullanım (backend klasöründen):
+#   python utils/prefetch_tmdb.py --concurrency 8 --rate 40
+# Sonuçlar data/tmdb_metadata.sqlite3 deposuna yazılır; app.py başlangıçta bu depoyu açar ve
+# depodaki filmler için istek sırasında TMDB'ye gitmez. İş yarıda kesilirse tekrar çalıştırıldığında
+# depoda olan filmleri atlayarak kaldığı yerden devam eder.
+import argparse
+import email.utils
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+from utils.metadata_cache import MetadataStore, extract_metadata
+from utils.tmdb_client import TMDB_DEFAULT_BASE_URL
+
+DEFAULT_LINKS_PATH = os.path.join(BACKEND_DIR, "data", "links.csv")
+DEFAULT_STORE_PATH = os.path.join(BACKEND_DIR, "data", "tmdb_metadata.sqlite3")
+COMMIT_EVERY = 200 # Bu kadar sonuçta bir depoya yazılır (kesintide en fazla bu kadar iş kaybolur)
+MAX_RETRIES = 3
+MAX_RETRY_WAIT = 60.0 # Retry-After ne derse desin tek denemede en fazla bu kadar saniye beklenir
+
+
+class RateLimiter:
+    """Thread'ler arasında paylaşılan basit hız sınırlayıcı: saniyede en fazla `rate` istek."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_time)
+            self._next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def load_tmdb_ids(links_path):
+    """links.csv'den tekil tmdbId listesini okur (boş değerler atlanır)."""
+    links = pd.read_csv(links_path, usecols=['tmdbId']).dropna()
+    return links['tmdbId'].astype(int).drop_duplicates().tolist()
+
+
+def retry_wait(response, attempt):
+    """
+    Retry-After başlığından beklenecek süreyi (sn) çıkarır. Başlık saniye veya HTTP tarihi olabilir;
+    yoksa ya da ayrıştırılamazsa 2 ** attempt kullanılır. Sonuç 0..MAX_RETRY_WAIT aralığına sıkıştırılır.
+    """
+    value = response.headers.get('Retry-After')
+    wait = 2 ** attempt
+    if value:
+        try:
+            wait = float(value)
+        except ValueError:
+            try:
+                wait = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                pass
+    if wait != wait: # NaN
+        wait = 2 ** attempt
+    return min(max(wait, 0.0), MAX_RETRY_WAIT)
+
+
+def fetch_metadata(session, base_url, api_key, tmdb_id, rate_limiter, language='en-US', timeout=5.0):
+    """
+    Tek bir film için metadata çeker.
+
+    Returns:
+        tuple: (durum, metadata). durum 'ok', 'not_found' (kalıcı, depoya None yazılır) veya
+        'error' (geçici; depoya yazılmaz, sonraki çalıştırmada tekrar denenir).
+    """
+    params = {'api_key': api_key, 'language': language}
+    for attempt in range(MAX_RETRIES):
+        rate_limiter.wait()
+        try:
+            response = session.get(f"{base_url}/movie/{tmdb_id}", params=params, timeout=timeout)
+        except requests.exceptions.RequestException:
+            time.sleep(2 ** attempt)
+            continue
+        if response.status_code == 404:
+            return 'not_found', None
+        if response.status_code == 429 or response.status_code >= 500:
+            # TMDB hız sınırı veya sunucu hatası: Retry-After'a uyarak bekle ve tekrar dene
+            time.sleep(retry_wait(response, attempt))
+            continue
+        if not response.ok:
+            return 'error', None
+        try:
+            return 'ok', extract_metadata(response.json())
+        except ValueError:
+            return 'error', None
+    return 'error', None
+
+
+def prefetch(links_path=DEFAULT_LINKS_PATH, store_path=DEFAULT_STORE_PATH, api_key=None, base_url=TMDB_DEFAULT_BASE_URL,
+             concurrency=8, rate=40.0, limit=None, language='en-US'):
+    """Depoda olmayan tüm filmleri sınırlı paralellik ve hız sınırıyla çekip depoya yazar."""
+    store = MetadataStore(store_path, read_only=False)
+    known = store.known_ids()
+    pending = [tmdb_id for tmdb_id in load_tmdb_ids(links_path) if tmdb_id not in known]
+    if limit:
+        pending = pending[:limit]
+    print(f"Depoda {len(known)} film var, {len(pending)} film çekilecek "
+          f"(paralellik: {concurrency}, hız: {rate}/sn) -> {store_path}")
+    if not pending:
+        return {'ok': 0, 'not_found': 0, 'error': 0}
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    rate_limiter = RateLimiter(rate)
+    counts = {'ok': 0, 'not_found': 0, 'error': 0}
+    buffer = []
+    start = time.time()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Tüm işleri bir kerede kuyruğa almamak için en fazla concurrency * 4 iş beklemede tutulur
+        it = iter(pending)
+        in_flight = {}
+        try:
+            while True:
+                while len(in_flight) < concurrency * 4:
+                    tmdb_id = next(it, None)
+                    if tmdb_id is None:
+                        break
+                    future = executor.submit(fetch_metadata, session, base_url, api_key, tmdb_id, rate_limiter, language)
+                    in_flight[future] = tmdb_id
+                if not in_flight:
+                    break
+                future = next(as_completed(in_flight))
+                tmdb_id = in_flight.pop(future)
+                status, metadata = future.result()
+                counts[status] += 1
+                if status != 'error':
+                    buffer.append((tmdb_id, metadata))
+                if len(buffer) >= COMMIT_EVERY:
+                    store.write_many(buffer)
+                    buffer = []
+                    done = sum(counts.values())
+                    print(f"  {done}/{len(pending)} film işlendi ({done / (time.time() - start):.1f}/sn), "
+                          f"hatalar: {counts['error']}")
+        except KeyboardInterrupt:
+            print("Kesildi; işlenen sonuçlar kaydediliyor. Tekrar çalıştırınca kaldığı yerden devam eder.")
+            for future in in_flight:
+                future.cancel()
+        finally:
+            if buffer:
+                store.write_many(buffer)
+
+    print(f"Bitti: {counts['ok']} bulundu, {counts['not_found']} TMDB'de yok, {counts['error']} hata "
+          f"(hatalılar bir sonraki çalıştırmada tekrar denenir). Depoda toplam {len(store)} film.")
+    return counts
+
+
+if __name__ == '__main__':
+    load_dotenv(os.path.join(BACKEND_DIR, '.env'))
+    parser = argparse.ArgumentParser(description="links.csv'deki filmler için TMDB metadatasını önceden çeker")
+    parser.add_argument('--links', default=DEFAULT_LINKS_PATH, help="links.csv yolu")
+    parser.add_argument('--store', default=os.getenv("TMDB_METADATA_STORE") or DEFAULT_STORE_PATH,
+                        help="Çıktı SQLite deposu")
+    parser.add_argument('--concurrency', type=int, default=8, help="Aynı anda en fazla kaç istek")
+    parser.add_argument('--rate', type=float, default=40.0, help="Saniyede en fazla kaç istek (TMDB sınırı ~50)")
+    parser.add_argument('--limit', type=int, default=None, help="En fazla kaç film çekilecek (test için)")
+    parser.add_argument('--language', default='en-US')
+    args = parser.parse_args()
+
+    api_key = os.getenv("TMDB_API_KEY")
+    if not api_key:
+        sys.exit("HATA: TMDB_API_KEY ortam değişkeni bulunamadı! .env dosyasını kontrol edin.")
+    prefetch(args.links, args.store, api_key, os.getenv("TMDB_BASE_URL", TMDB_DEFAULT_BASE_URL),
+             args.concurrency, args.rate, args.limit, args.language)
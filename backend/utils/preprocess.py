@@ -1,6 +1,31 @@
 # Gerekli kütüphaneyi import et
 import pandas as pd
+import numpy as np
+from scipy.sparse import csr_matrix
 import os # İşletim sistemiyle ilgili işlemler (dosya yolu gibi) için
+import sys
+import json
+import hashlib
+import logging
+
+# models/artifact.py'deki .npy klasör formatı önbellek için de kullanılır
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+from models.artifact import MANIFEST_FILENAME, is_artifact_dir, save_artifact_dir, load_artifact_dir
+
+logger = logging.getLogger(__name__)
+
+# Akışlı (streaming) okuma ayarları: kompakt tipler, timestamp hiç okunmaz
+RATINGS_DTYPES = {'userId': np.int32, 'movieId': np.int32, 'rating': np.float32}
+DEFAULT_CHUNKSIZE = 2_000_000 # Parça başına satır (~24 MB ham veri)
+DENSE_LOOKUP_LIMIT = 50_000_000 # id -> kod için yoğun (dense) tablo kullanılacak en büyük id
+
+# İkili (binary) puan önbelleği: ayrıştırılmış ve kodlanmış CSR dizileri .npy olarak saklanır.
+# Önbelleğin içeriği/düzeni değişirse bu sürüm artırılmalı (eski önbellekler otomatik yeniden kurulur).
+RATINGS_CACHE_SCHEMA_VERSION = 1
+RATINGS_CACHE_DIRNAME = os.path.join('cache', 'ratings_matrix')
+SOURCE_FILES = ('ratings.csv', 'movies.csv')
 
 def load_and_prepare_data(data_path='../data'):
     """
@@ -53,8 +78,301 @@ def load_and_prepare_data(data_path='../data'):
         print(f"Veri yüklenirken bir hata oluştu: {e}")
         return None
 
+class RatingsMatrix:
+    """
+    fit() için hazırlanmış puan verisi: kullanıcı x film CSR matrisi ve hizalı id/başlık dizileri.
+    Puan satırlarına başlık/tür metni eklenmez; başlıklar film başına bir kez tutulur.
+
+    - matrix: (n_users, n_movies) float32 CSR, int32 indexler; satır i = user_ids[i], sütun j = movie_ids[j]
+    - user_ids, movie_ids: sıralı id dizileri (int64)
+    - item_titles: movie_ids ile hizalı başlıklar (object dizisi)
+    """
+
+    def __init__(self, matrix, user_ids, movie_ids, item_titles=None):
+        self.matrix = matrix
+        self.user_ids = user_ids
+        self.movie_ids = movie_ids
+        self.item_titles = item_titles
+
+    @property
+    def n_ratings(self):
+        return self.matrix.nnz
+
+    @property
+    def global_average_rating(self):
+        return float(self.matrix.data.mean(dtype=np.float64)) if self.matrix.nnz else 0.0
+
+    @property
+    def nbytes(self):
+        m = self.matrix
+        return m.data.nbytes + m.indices.nbytes + m.indptr.nbytes + self.user_ids.nbytes + self.movie_ids.nbytes
+
+
+def _count_rows(path, block_size=1 << 20):
+    """CSV dosyasındaki veri satırı sayısı (başlık hariç); diziler önceden tek seferde ayrılabilsin diye."""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1 # Son satır yeni satırla bitmiyor
+    return max(lines - 1, 0)
+
+
+def _encode_ids(values):
+    """
+    id dizisini yerinde 0..n-1 kodlarına çevirir ve sıralı tekil id'leri döndürür.
+    id'ler küçükse yoğun bir arama tablosu kullanılır (np.unique'in int64 geçici dizilerinden kaçınmak için).
+    """
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+    max_id = int(values.max())
+    if values.min() >= 0 and max_id < DENSE_LOOKUP_LIMIT:
+        present = np.zeros(max_id + 1, dtype=bool)
+        present[values] = True
+        unique_ids = np.flatnonzero(present)
+        lookup = np.cumsum(present, dtype=np.int32)
+        lookup -= 1
+        np.take(lookup, values, out=values)
+        return unique_ids.astype(np.int64)
+    unique_ids, codes = np.unique(values, return_inverse=True)
+    values[:] = codes
+    return unique_ids.astype(np.int64)
+
+
+def ratings_matrix_from_arrays(user_col, movie_col, rating_col, movies_df=None, user_sorted=None):
+    """
+    (userId, movieId, puan) sütunlarından RatingsMatrix oluşturur. user_col ve movie_col yerinde
+    koda çevrilir (kopya yok), bu yüzden çağıran taraf bu dizileri sonra kullanmamalıdır.
+
+    Args:
+        movies_df (pandas.DataFrame): movieId/title sütunları; verilirse başlıklar eklenir.
+        user_sorted (bool): Satırlar userId'ye göre sıralı mı; None ise kontrol edilir.
+    """
+    if user_sorted is None:
+        user_sorted = bool(np.all(user_col[1:] >= user_col[:-1]))
+    user_ids = _encode_ids(user_col)   # user_col artık kullanıcı kodları
+    movie_ids = _encode_ids(movie_col) # movie_col artık film kodları (CSR indices)
+
+    if not user_sorted:
+        logger.info("Puanlar userId'ye göre sıralı değil, satırlar sıralanıyor...")
+        order = np.argsort(user_col, kind='stable')
+        user_col, movie_col, rating_col = user_col[order], movie_col[order], rating_col[order]
+        del order
+
+    counts = np.bincount(user_col, minlength=len(user_ids))
+    del user_col
+    index_dtype = np.int32 if len(movie_col) < np.iinfo(np.int32).max else np.int64
+    indptr = np.zeros(len(user_ids) + 1, dtype=index_dtype)
+    np.cumsum(counts, out=indptr[1:])
+    matrix = csr_matrix((rating_col, movie_col, indptr), shape=(len(user_ids), len(movie_ids)), copy=False)
+    matrix.sum_duplicates() # Satır içi film sırasını düzeltir (yerinde); tekrar eden çiftler eskisi gibi toplanır
+
+    item_titles = None
+    if movies_df is not None:
+        titles = movies_df.drop_duplicates('movieId').set_index('movieId')['title']
+        item_titles = titles.reindex(movie_ids).to_numpy(dtype=object)
+    result = RatingsMatrix(matrix, user_ids, movie_ids, item_titles)
+    logger.info("Puan matrisi oluşturuldu: %s, %d puan, %.1f MB.", matrix.shape, matrix.nnz,
+                result.nbytes / 1024**2)
+    return result
+
+
+def load_ratings_matrix(data_path='../data', chunksize=DEFAULT_CHUNKSIZE):
+    """
+    ratings.csv'yi parça parça (chunk) okuyarak doğrudan CSR matrisi oluşturur.
+    RAM'den büyük veri setleri (örn. MovieLens-32M) için load_and_prepare_data'nın yerine kullanılır:
+
+    - Sütunlar kompakt tiplerle okunur (int32 id, float32 puan), timestamp okunmaz.
+    - movies.csv puanlarla birleştirilmez (merge yok); sadece movies.csv'de olan filmlerin puanları
+      tutulur (eski inner join ile aynı), başlıklar film başına bir kez eklenir.
+    - Satır sayısı önceden sayılıp diziler bir kez ayrılır; her parça doğrudan bu dizilere yazılır.
+      Dosya userId'ye göre sıralıysa (MovieLens'te öyle) ek sıralama/kopya yapılmaz.
+
+    Returns:
+        RatingsMatrix: Hata durumunda None.
+    """
+    movies_file = os.path.join(data_path, 'movies.csv')
+    ratings_file = os.path.join(data_path, 'ratings.csv')
+    logger.info("'%s' parça parça (chunksize=%d) okunuyor...", ratings_file, chunksize)
+
+    try:
+        movies_df = pd.read_csv(movies_file, usecols=['movieId', 'title'], dtype={'movieId': np.int64})
+        known_movie_ids = np.sort(movies_df['movieId'].to_numpy())
+        known = np.zeros(int(known_movie_ids.max()) + 1 if len(known_movie_ids) else 0, dtype=bool)
+        known[known_movie_ids] = True
+
+        capacity = _count_rows(ratings_file)
+        user_col = np.empty(capacity, dtype=np.int32)
+        movie_col = np.empty(capacity, dtype=np.int32)
+        rating_col = np.empty(capacity, dtype=np.float32)
+        filled = 0
+        user_sorted = True
+        last_user = np.iinfo(np.int32).min
+
+        reader = pd.read_csv(ratings_file, usecols=['userId', 'movieId', 'rating'],
+                             dtype=RATINGS_DTYPES, chunksize=chunksize)
+        for chunk in reader:
+            users = chunk['userId'].to_numpy()
+            movies = chunk['movieId'].to_numpy()
+            ratings = chunk['rating'].to_numpy()
+            # movies.csv'de olmayan filmleri at (eski inner join davranışı)
+            in_catalog = movies < len(known)
+            in_catalog[in_catalog] = known[movies[in_catalog]]
+            if not in_catalog.all():
+                users, movies, ratings = users[in_catalog], movies[in_catalog], ratings[in_catalog]
+            n = len(users)
+            if n == 0:
+                continue
+            if user_sorted and (users[0] < last_user or np.any(users[1:] < users[:-1])):
+                user_sorted = False
+            last_user = users[-1]
+            user_col[filled:filled + n] = users
+            movie_col[filled:filled + n] = movies
+            rating_col[filled:filled + n] = ratings
+            filled += n
+            logger.info("  %d puan okundu...", filled)
+
+        return ratings_matrix_from_arrays(user_col[:filled], movie_col[:filled], rating_col[:filled],
+                                          movies_df, user_sorted=user_sorted)
+
+    except FileNotFoundError:
+        logger.error("Veri dosyaları '%s' konumunda bulunamadı.", data_path)
+        return None
+    except Exception as e:
+        logger.error("Veri yüklenirken bir hata oluştu: %s", e)
+        return None
+
+
+def _source_signature(paths):
+    """Kaynak dosyaların boyut ve değiştirilme zamanları (içerik hash'inden önce ucuz kontrol)."""
+    return ';'.join(f"{os.path.basename(p)}:{os.path.getsize(p)}:{os.stat(p).st_mtime_ns}" for p in paths)
+
+
+def _source_hash(paths, block_size=1 << 22):
+    """Kaynak dosyaların içeriğinden hesaplanan hash (önbellek anahtarı)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_cache_manifest(cache_dir):
+    if not is_artifact_dir(cache_dir):
+        return None
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_FILENAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _update_cache_signature(cache_dir, manifest, signature):
+    """
+    Manifest'teki source_signature'ı günceller (içerik aynı, boyut/zaman değişmiş: kopyalama, deploy).
+    Geçici dosyaya yazılıp os.replace ile değiştirilir; sonraki açılışlar yine hash'siz yoldan geçer.
+    """
+    manifest['scalars']['source_signature'] = signature
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILENAME)
+    tmp_path = f"{manifest_path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+    except OSError as e:
+        logger.warning("Puan önbelleği imzası güncellenemedi: %s", e)
+
+
+def load_ratings_matrix_cached(data_path='../data', cache_dir=None, mmap_mode='r', chunksize=DEFAULT_CHUNKSIZE):
+    """
+    load_ratings_matrix'in önbellekli hali. İlk çalıştırmada CSV'ler ayrıştırılır ve CSR dizileri
+    (data, indices, indptr, user_ids, movie_ids) ham .npy dosyaları olarak cache_dir'e yazılır;
+    sonraki çalıştırmalarda bu dosyalar bellek eşlemeli (mmap) açılır, metin ayrıştırma yapılmaz.
+
+    Önbellek, kaynak dosyaların içerik hash'i ve RATINGS_CACHE_SCHEMA_VERSION ile anahtarlanır;
+    ikisinden biri değişirse yeniden kurulur. Dosya boyutu/zamanı değişmediyse hash yeniden hesaplanmaz;
+    değiştiyse ama hash aynıysa manifest'teki imza güncellenir (bir sonraki açılışta hash gerekmez).
+
+    Args:
+        data_path (str): movies.csv ve ratings.csv'nin bulunduğu klasör.
+        cache_dir (str): Önbellek klasörü (varsayılan: <data_path>/cache/ratings_matrix).
+        mmap_mode (str): np.load mmap modu; None ise diziler belleğe okunur.
+
+    Returns:
+        RatingsMatrix: Hata durumunda None.
+    """
+    cache_dir = cache_dir or os.path.join(data_path, RATINGS_CACHE_DIRNAME)
+    sources = [os.path.join(data_path, name) for name in SOURCE_FILES]
+    try:
+        signature = _source_signature(sources)
+    except OSError:
+        logger.error("Veri dosyaları '%s' konumunda bulunamadı.", data_path)
+        return None
+
+    manifest = _read_cache_manifest(cache_dir)
+    source_hash = None
+    if manifest is not None:
+        scalars = manifest.get('scalars', {})
+        if scalars.get('schema_version') != RATINGS_CACHE_SCHEMA_VERSION:
+            logger.info("Puan önbelleği şema sürümü farklı, yeniden oluşturulacak.")
+        else:
+            if scalars.get('source_signature') != signature:
+                source_hash = _source_hash(sources)
+            if scalars.get('source_signature') == signature or scalars.get('source_hash') == source_hash:
+                try:
+                    data, _ = load_artifact_dir(cache_dir, mmap_mode=mmap_mode)
+                    matrix = csr_matrix((data['data'], data['indices'], data['indptr']),
+                                        shape=tuple(data['shape']), copy=False)
+                    logger.info("Puan matrisi önbellekten yüklendi: %s (%d puan, mmap: %s)", cache_dir, matrix.nnz, mmap_mode)
+                    if scalars.get('source_signature') != signature:
+                        _update_cache_signature(cache_dir, manifest, signature)
+                    return RatingsMatrix(matrix, data['user_ids'], data['movie_ids'],
+                                         np.asarray(data['item_titles'], dtype=object))
+                except Exception as e:
+                    logger.warning("Puan önbelleği okunamadı (%s), yeniden oluşturulacak.", e)
+            else:
+                logger.info("Kaynak veri dosyaları değişmiş, puan önbelleği yeniden oluşturulacak.")
+
+    ratings = load_ratings_matrix(data_path, chunksize=chunksize)
+    if ratings is None:
+        return None
+    try:
+        matrix = ratings.matrix
+        save_artifact_dir({
+            'schema_version': RATINGS_CACHE_SCHEMA_VERSION,
+            'source_signature': signature,
+            'source_hash': source_hash or _source_hash(sources),
+            'shape': list(matrix.shape),
+            'data': matrix.data, 'indices': matrix.indices, 'indptr': matrix.indptr,
+            'user_ids': ratings.user_ids, 'movie_ids': ratings.movie_ids,
+            'item_titles': ratings.item_titles.tolist(),
+        }, cache_dir)
+        logger.info("Puan önbelleği yazıldı: %s", cache_dir)
+    except OSError as e:
+        logger.warning("Puan önbelleği yazılamadı: %s", e)
+    return ratings
+
+
+def peak_rss_mb():
+    """Bu sürecin şimdiye kadarki en yüksek RSS değeri (MB, Linux'ta ru_maxrss kB cinsindendir)."""
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
 # Bu dosya doğrudan çalıştırıldığında test amaçlı veri yükleme işlemini yap
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     # preprocess.py, utils klasöründe olduğu için data klasörüne '../data' ile erişiriz.
     prepared_data = load_and_prepare_data(data_path='../data') 
 
@@ -65,4 +383,9 @@ if __name__ == '__main__':
         
         # Bellek kullanımını göster (büyük veri setleri için faydalı)
         print("\nBellek Kullanımı:")
-        prepared_data.info(memory_usage='deep') 
\ No newline at end of file
+        prepared_data.info(memory_usage='deep')
+        print(f"Tepe RSS: {peak_rss_mb():.0f} MB")
+
+    # Büyük veri setleri için akışlı yükleme (merge yok, doğrudan CSR).
+    # İki yöntemin tepe RSS karşılaştırması için: python utils/benchmark.py ingest
+    ratings_matrix = load_ratings_matrix(data_path='../data') 
\ No newline at end of file
@@ -0,0 +1,83 @@
+# Öneri sonuçları için bellek içi LRU cache (puan profili + parametreler + model sürümü ile anahtarlanır)
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def profile_key(ratings, model_version, **params):
+    """
+    Puan profili için kanonik anahtar: {movieId: puan} movieId'ye göre sıralanıp parametreler ve model
+    sürümüyle birlikte JSON'a yazılır ve özetlenir (blake2b, 128 bit). Aynı puanlar farklı sırayla veya
+    '5' / 5.0 gibi farklı biçimlerle gelse de aynı anahtar üretilir.
+    """
+    canonical = json.dumps({
+        'ratings': sorted((int(movie_id), float(rating)) for movie_id, rating in ratings.items()),
+        'params': sorted(params.items()),
+        'model_version': model_version,
+    }, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """
+    Anahtar -> sonuç için boyut sınırlı LRU cache (thread-safe, süreç başına).
+    Model sürümü anahtarın parçası olduğu için yeni model yüklendiğinde eski kayıtlar hiç eşleşmez
+    ve LRU sırasıyla atılır. max_entries=0 cache'i devre dışı bırakır.
+    """
+
+    MISS = object()
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        """Kayıt varsa sonucu, yoksa MISS döndürür."""
+        with self._lock:
+            value = self._entries.get(key, self.MISS)
+            if value is self.MISS:
+                self.stats['misses'] += 1
+            else:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def get_or_compute(self, key, compute):
+        """Kayıt yoksa compute() sonucunu saklar ve döndürür (hesaplama kilit dışında yapılır)."""
+        value = self.get(key)
+        if value is self.MISS:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """Hit/miss sayaçları ve doluluk bilgisi (bu süreç için)."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+        stats['max_entries'] = self.max_entries
+        return stats
@@ -0,0 +1,111 @@
+# Film başlıkları için trigram (3-gram) ters indeksi: alt dize ve önek araması
+from bisect import bisect_left
+import numpy as np
+
+NGRAM = 3
+
+
+def normalize_title(title):
+    """Büyük/küçük harf duyarsız karşılaştırma için başlığı normalleştirir (boş değerler None)."""
+    return title.upper() if isinstance(title, str) else None
+
+
+def _trigrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class TitleSearchIndex:
+    """
+    Başlıklar üzerinde önceden kurulan trigram ters indeksi.
+
+    Her trigram için, o trigramı içeren başlıkların sıralı konum (satır) listesi tutulur
+    (tek bir int32 dizisinde art arda). Sorgunun tüm trigramlarının listeleri kesiştirilerek aday
+    satırlar bulunur, adaylar gerçek alt dize kontrolüyle doğrulanır. Böylece sonuçlar
+    `titles.str.contains(term, case=False, regex=False)` ile birebir aynıdır (str.upper ile
+    karşılaştırma), ama 86k başlığın tamamı taranmaz.
+
+    3 karakterden kısa alt dize sorguları trigram içermediği için normalleştirilmiş başlıklar
+    üzerinde doğrusal olarak taranır. Önek aramaları ise sıralı başlık listesinde ikili arama ile
+    (sorgu uzunluğundan bağımsız) yapılır.
+    """
+
+    def __init__(self, titles):
+        self.normalized = [normalize_title(t) for t in titles]
+        postings = {}
+        for position, title in enumerate(self.normalized):
+            if title is None:
+                continue
+            for gram in _trigrams(title):
+                postings.setdefault(gram, []).append(position)
+
+        self._gram_slices = {} # trigram -> (başlangıç, bitiş) self._postings içinde
+        lengths = [len(p) for p in postings.values()]
+        self._postings = np.empty(sum(lengths), dtype=np.int32)
+        offset = 0
+        for (gram, positions), length in zip(postings.items(), lengths):
+            self._postings[offset:offset + length] = positions # Konumlar artan sırada eklendi
+            self._gram_slices[gram] = (offset, offset + length)
+            offset += length
+
+        # Önek araması için: başlıkların alfabetik sıradaki konumları
+        present = [i for i, title in enumerate(self.normalized) if title is not None]
+        present.sort(key=self.normalized.__getitem__)
+        self._sorted_titles = [self.normalized[i] for i in present]
+        self._sorted_positions = np.asarray(present, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.normalized)
+
+    @property
+    def nbytes(self):
+        return self._postings.nbytes + self._sorted_positions.nbytes
+
+    def _candidates(self, pattern):
+        """Sorgunun tüm trigramlarını içeren satırlar (sıralı); trigram yoksa None (hepsi aday)."""
+        grams = _trigrams(pattern)
+        if not grams:
+            return None
+        slices = []
+        for gram in grams:
+            bounds = self._gram_slices.get(gram)
+            if bounds is None:
+                return np.empty(0, dtype=np.int32)
+            slices.append(bounds)
+        # En kısa listeden başlayarak kesiştir (ara sonuçlar hızla küçülür)
+        slices.sort(key=lambda b: b[1] - b[0])
+        result = self._postings[slices[0][0]:slices[0][1]]
+        for start, end in slices[1:]:
+            result = np.intersect1d(result, self._postings[start:end], assume_unique=True)
+            if len(result) == 0:
+                break
+        return result
+
+    def search(self, term, mode='substring'):
+        """
+        Eşleşen başlıkların konumlarını (orijinal sırada) döndürür.
+
+        Args:
+            term (str): Aranan metin (büyük/küçük harf duyarsız, düz metin; regex değil).
+            mode (str): 'substring' (başlığın herhangi bir yerinde) veya 'prefix' (başlık bununla başlar).
+
+        Returns:
+            np.ndarray: int32 satır konumları, artan sırada.
+        """
+        if mode not in ('substring', 'prefix'):
+            raise ValueError(f"Geçersiz arama modu: {mode}")
+        pattern = normalize_title(term) or ''
+        if mode == 'prefix':
+            # Önekle başlayan başlıklar sıralı listede bitişik bir aralıktır
+            start = bisect_left(self._sorted_titles, pattern)
+            end = start
+            while end < len(self._sorted_titles) and self._sorted_titles[end].startswith(pattern):
+                end += 1
+            return np.sort(self._sorted_positions[start:end])
+
+        candidates = self._candidates(pattern)
+        if candidates is None:
+            # Kısa sorgu: tüm başlıkları tara
+            return np.fromiter((i for i, title in enumerate(self.normalized) if title is not None and pattern in title),
+                               dtype=np.int32)
+        normalized = self.normalized
+        return np.fromiter((i for i in candidates.tolist() if pattern in normalized[i]), dtype=np.int32)
@@ -0,0 +1,184 @@
+# TMDB API istemcisi: bağlantı havuzlu oturum ve paralel (thread pool) poster zenginleştirme
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+from utils.metadata_cache import MetadataCache, extract_metadata
+
+logger = logging.getLogger(__name__)
+
+TMDB_DEFAULT_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_DEFAULT_POSTER_BASE_URL = "https://image.tmdb.org/t/p/w500"
+
+
+class TMDBClient:
+    """
+    TMDB film detaylarını çeken istemci.
+
+    - Tek bir requests.Session ve HTTPAdapter bağlantı havuzu kullanılır (her istekte yeni TCP/TLS yok).
+    - get_poster_paths birden fazla filmi thread pool üzerinden paralel çeker ve toplam bir süre
+      sınırı (deadline) uygular: süresi dolan filmler None döner, istek bloklanmaz. Geç tamamlanan
+      istekler arka planda bitince cache'e yazılır; sonraki istekler onları hazır bulur.
+    - Poster, özet, puan ve çıkış tarihi tek bir MetadataCache'te (LRU + TTL, isteğe bağlı SQLite)
+      tutulur; liste ve detay endpoint'leri aynı kayıtları kullanır.
+    - Oturum ve thread pool süreç başına tembel (lazy) oluşturulur; gunicorn preload modunda
+      fork'tan sonra her worker kendi havuzunu kurar.
+    """
+
+    def __init__(self, api_key, base_url=TMDB_DEFAULT_BASE_URL, poster_base_url=TMDB_DEFAULT_POSTER_BASE_URL,
+                 max_workers=16, request_timeout=2.0, language='en-US', cache=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.poster_base_url = poster_base_url
+        self.max_workers = max_workers
+        self.request_timeout = request_timeout
+        self.language = language
+        self.cache = cache if cache is not None else MetadataCache() # tmdbId -> metadata (başarısızlar None)
+        self._pid = None
+        self._session = None
+        self._executor = None
+        self._pending = {} # tmdbId -> devam eden Future (aynı film için tekrar istek açmamak için)
+        self._lock = threading.Lock()
+        # Süreç başına sayaçlar (/metrics): TMDB'ye giden istekler ve başarısızlık nedenleri
+        self.stats = {'requests': 0, 'request_errors': 0, 'invalid_responses': 0, 'deadline_misses': 0}
+
+    def _count(self, counter, value=1):
+        with self._lock:
+            self.stats[counter] += value
+
+    def _ensure_process_resources(self):
+        """Oturum ve thread pool'u bu süreç için (fork sonrası dahil) bir kez oluşturur."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='tmdb')
+            self._pending = {}
+            self._pid = os.getpid()
+
+    def poster_url(self, poster_path):
+        """poster_path'ten tam afiş URL'sini üretir (yoksa None)."""
+        return f"{self.poster_base_url}{poster_path}" if poster_path else None
+
+    def request_movie(self, tmdb_id, language=None):
+        """
+        TMDB'den tek bir filmin ham detay verisini çeker.
+
+        Returns:
+            tuple: (durum, veri). durum 'ok', 'not_found' (TMDB 404; kalıcı) veya 'error' (API anahtarı yok,
+            zaman aşımı, 429, 5xx, geçersiz yanıt; geçici). veri sadece 'ok' için TMDB yanıtıdır.
+        """
+        if not self.api_key:
+            logger.warning("TMDB API Anahtarı ayarlanmamış. Detaylar alınamıyor.")
+            return 'error', None
+        self._ensure_process_resources()
+        url = f"{self.base_url}/movie/{tmdb_id}"
+        params = {'api_key': self.api_key, 'language': language or self.language}
+        self._count('requests')
+        try:
+            response = self._session.get(url, params=params, timeout=self.request_timeout)
+            if response.status_code == 404:
+                return 'not_found', None
+            response.raise_for_status()
+            return 'ok', response.json()
+        except requests.exceptions.RequestException as tmdb_err:
+            self._count('request_errors')
+            logger.warning("TMDB API request failed (tmdbId: %s): %s", tmdb_id, tmdb_err)
+        except Exception as e:
+            self._count('invalid_responses')
+            logger.warning("Error processing TMDB data (tmdbId: %s): %s", tmdb_id, e)
+        return 'error', None
+
+    def fetch_movie(self, tmdb_id, language=None):
+        """
+        TMDB'den tek bir filmin ham detay verisini çeker.
+
+        Returns:
+            dict: TMDB yanıtı; API anahtarı yoksa, film bulunamazsa veya istek başarısızsa None.
+        """
+        return self.request_movie(tmdb_id, language)[1]
+
+    def _fetch_metadata(self, tmdb_id):
+        """
+        Arka plan görevi: metadata'yı çeker ve cache'e yazar. Sadece TMDB'nin 404 döndürdüğü filmler negatif
+        kayıt olarak (paylaşılan cache'e) yazılır; geçici hatalar yalnızca bu süreçte kısa süre tutulur.
+        """
+        status, data = self.request_movie(tmdb_id)
+        metadata = extract_metadata(data) if status == 'ok' and data else None
+        if status == 'error':
+            self.cache.set_error(tmdb_id)
+        else:
+            self.cache.set(tmdb_id, metadata)
+        with self._lock:
+            self._pending.pop(tmdb_id, None)
+        return metadata
+
+    def get_metadata(self, tmdb_id):
+        """Tek bir film için metadata (cache'li, bloklayan); bulunamazsa None."""
+        return self.get_metadata_many([tmdb_id], deadline=None).get(tmdb_id)
+
+    def get_poster_path(self, tmdb_id):
+        """Tek bir film için poster_path (cache'li, bloklayan)."""
+        metadata = self.get_metadata(tmdb_id)
+        return metadata.get('poster_path') if metadata else None
+
+    def get_poster_paths(self, tmdb_ids, deadline=1.5):
+        """Birden fazla film için {tmdbId: poster_path veya None} (bkz. get_metadata_many)."""
+        return {tmdb_id: metadata.get('poster_path') if metadata else None
+                for tmdb_id, metadata in self.get_metadata_many(tmdb_ids, deadline=deadline).items()}
+
+    def get_metadata_many(self, tmdb_ids, deadline=1.5):
+        """
+        Birden fazla film için metadata'yı cache'ten okur, eksikleri paralel çeker.
+
+        Args:
+            tmdb_ids (iterable): TMDB id'leri (None değerler atlanır).
+            deadline (float): Tüm çağrı için saniye cinsinden üst süre; None ise hepsi beklenir.
+
+        Returns:
+            dict: {tmdbId: metadata veya None}. Süresi dolanlar None döner (cache'e yazılmaz).
+        """
+        results = {}
+        to_fetch = []
+        for tmdb_id in tmdb_ids:
+            if tmdb_id is None or tmdb_id in results:
+                continue
+            metadata = self.cache.get(tmdb_id)
+            if metadata is MetadataCache.MISS:
+                results[tmdb_id] = None
+                to_fetch.append(tmdb_id)
+            else:
+                results[tmdb_id] = metadata
+
+        if not to_fetch:
+            return results
+        if not self.api_key:
+            # Anahtar eklenip uygulama yeniden başlatılınca filmler hemen çekilebilsin diye cache'e yazılmaz
+            logger.debug("TMDB API Anahtarı ayarlanmamış. Film bilgisi alınamıyor.")
+            return results
+
+        self._ensure_process_resources()
+        futures = {}
+        with self._lock:
+            for tmdb_id in to_fetch:
+                future = self._pending.get(tmdb_id)
+                if future is None:
+                    future = self._executor.submit(self._fetch_metadata, tmdb_id)
+                    self._pending[tmdb_id] = future
+                futures[future] = tmdb_id
+
+        done, not_done = wait(futures, timeout=deadline)
+        for future in done:
+            results[futures[future]] = future.result()
+        if not_done:
+            self._count('deadline_misses', len(not_done))
+            logger.warning("%d TMDB isteği süre sınırına (%s sn) yetişmedi; posterUrl boş döndü.", len(not_done), deadline)
+        return results
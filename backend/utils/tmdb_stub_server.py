@@ -0,0 +1,73 @@
+# Yerel test için sahte (stub) TMDB sunucusu
+# Kullanım (backend klasöründen):
+#   python utils/tmdb_stub_server.py --port 8001 --delay 0.3 --fail-rate 0.1
+#   TMDB_BASE_URL=http://127.0.0.1:8001/3 TMDB_API_KEY=stub flask run
+# /3/movie/<tmdbId> isteklerine gecikmeli, deterministik sahte film verisi döndürür.
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOVIE_PATH = re.compile(r'^/3/movie/(\d+)')
+
+
+class StubTMDBHandler(BaseHTTPRequestHandler):
+    delay = 0.0 # Her yanıt öncesi bekleme (saniye)
+    fail_rate = 0.0 # 500 döndürülecek isteklerin oranı
+    request_count = 0
+
+    def do_GET(self):
+        StubTMDBHandler.request_count += 1
+        match = MOVIE_PATH.match(self.path)
+        if self.delay:
+            time.sleep(self.delay)
+        if not match:
+            self._send(404, {'status_message': 'The resource you requested could not be found.'})
+            return
+        if random.random() < self.fail_rate:
+            self._send(500, {'status_message': 'Stub failure.'})
+            return
+        tmdb_id = int(match.group(1))
+        self._send(200, {
+            'id': tmdb_id,
+            'title': f"Stub Movie {tmdb_id}",
+            'poster_path': f"/stub_{tmdb_id}.jpg",
+            'overview': f"Overview of stub movie {tmdb_id}.",
+            'vote_average': round((tmdb_id % 100) / 10, 1),
+            'release_date': '2000-01-01',
+        })
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Her isteği konsola yazma
+
+
+def run_stub_server(host='127.0.0.1', port=8001, delay=0.0, fail_rate=0.0):
+    """Stub sunucuyu başlatır ve döndürür (serve_forever çağrılmaz)."""
+    StubTMDBHandler.delay = delay
+    StubTMDBHandler.fail_rate = fail_rate
+    return ThreadingHTTPServer((host, port), StubTMDBHandler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Yerel sahte TMDB sunucusu")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--delay', type=float, default=0.0, help="Yanıt gecikmesi (saniye)")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="500 döndürülecek isteklerin oranı (0-1)")
+    args = parser.parse_args()
+    server = run_stub_server(args.host, args.port, args.delay, args.fail_rate)
+    print(f"Stub TMDB sunucusu çalışıyor: http://{args.host}:{args.port}/3 (delay={args.delay}, fail_rate={args.fail_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,359 @@
+# Kullanıcı profilleri (puanlar, favoriler, önbelleğe alınmış latent vektör) için kalıcı SQLite deposu
+#
+# data/user_data/user_<handle>_ratings.json ve user_<handle>_favorites.json dosyalarının yerine geçer;
+# dosyalar ilk açılışta depoya aktarılır. WAL modunda birden fazla gunicorn worker'ı aynı dosyaya
+# yazabilir; her yazma BEGIN IMMEDIATE işlemidir ve profilin revizyonunu bir artırır.
+#
+# Profile yazma, profil oluşturulurken bir kez verilen anahtarla (Authorization: Bearer <anahtar>) yapılır;
+# depoda anahtarın sadece SHA-256 hash'i tutulur. JSON dosyalarından aktarılan profillerin anahtarı yoktur,
+# anahtarları yönetim anahtarıyla üretilir (POST /api/users/<handle>).
+#
+# Tablolar:
+#   user_profiles       handle -> revizyon, oluşturma/güncelleme zamanı, yazma anahtarının hash'i
+#   user_ratings        kullanıcının her filme verdiği son puan
+#   user_rating_events  puan değişikliklerinin sadece eklenen (append-only) kaydı: revizyon, yeni ve eski puan
+#   user_favorites      favori filmler
+#   user_vectors        (handle, model_version) -> vektör ve hesaplandığı revizyon
+#
+# Kullanım (JSON dosyalarını elle aktarmak için, backend klasöründen):
+#   python utils/user_store.py import data/user_data [--db data/user_profiles.sqlite3]
+import argparse
+import glob
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+USER_DATA_FILE_PATTERN = re.compile(r'^user_(.+)_(ratings|favorites)\.json$')
+MAX_HANDLE_LENGTH = 64
+
+
+class UserProfileStore:
+    """
+    Kullanıcı tanıtıcısı (handle, ör. '1' veya 'alice') ile anahtarlanan profil deposu.
+
+    Kullanıcı vektörü model sürümüyle (model.model_version) birlikte saklanır. Profil sonradan değişirse
+    SVD modellerinde (vektör puanlarda doğrusal) sadece yeni olaylardaki puan farkları projekte edilip
+    önbellekteki vektöre eklenir; ALS modellerinde veya sürüm değiştiyse vektör tüm puanlardan yeniden
+    hesaplanır.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local() # Thread (ve süreç) başına SQLite bağlantısı
+        self._lock = threading.Lock()
+        self.stats = {'vector_hits': 0, 'vector_incremental': 0, 'vector_recomputed': 0}
+        self._connection() # Tabloları başlangıçta oluştur
+
+    # --- SQLite ---
+    def _connection(self):
+        """Bu thread için SQLite bağlantısı (fork sonrası yeniden açılır)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        # isolation_level=None: işlemler BEGIN IMMEDIATE ile elle açılır (revizyon artışı süreçler arası atomik)
+        conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS user_profiles ("
+            " handle TEXT PRIMARY KEY, revision INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+            " token_hash TEXT);"
+            "CREATE TABLE IF NOT EXISTS user_ratings ("
+            " handle TEXT NOT NULL, movie_id INTEGER NOT NULL, rating REAL NOT NULL, timestamp REAL NOT NULL,"
+            " PRIMARY KEY (handle, movie_id)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS user_rating_events ("
+            " handle TEXT NOT NULL, revision INTEGER NOT NULL, movie_id INTEGER NOT NULL, rating REAL NOT NULL,"
+            " previous_rating REAL, timestamp REAL NOT NULL, PRIMARY KEY (handle, revision, movie_id)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS user_favorites ("
+            " handle TEXT NOT NULL, movie_id INTEGER NOT NULL, added_at REAL NOT NULL,"
+            " PRIMARY KEY (handle, movie_id)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS user_vectors ("
+            " handle TEXT NOT NULL, model_version TEXT NOT NULL, revision INTEGER NOT NULL, vector BLOB NOT NULL,"
+            " updated_at REAL NOT NULL, PRIMARY KEY (handle, model_version)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS user_store_meta (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        # Anahtar sütunu olmadan oluşturulmuş eski depolar
+        if 'token_hash' not in [row[1] for row in conn.execute("PRAGMA table_info(user_profiles)")]:
+            try:
+                conn.execute("ALTER TABLE user_profiles ADD COLUMN token_hash TEXT")
+            except sqlite3.OperationalError:
+                pass # Başka bir worker aynı anda ekledi
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _write(self, func):
+        """func(conn)'u tek bir BEGIN IMMEDIATE işleminde çalıştırır (hata olursa geri alınır)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    @staticmethod
+    def _bump_revision(conn, handle, now):
+        """Profili yoksa oluşturur, revizyonunu bir artırır ve yeni revizyonu döndürür."""
+        conn.execute("INSERT INTO user_profiles (handle, revision, created_at, updated_at) VALUES (?, 0, ?, ?)"
+                     " ON CONFLICT(handle) DO NOTHING", (handle, now, now))
+        conn.execute("UPDATE user_profiles SET revision = revision + 1, updated_at = ? WHERE handle = ?", (now, handle))
+        return conn.execute("SELECT revision FROM user_profiles WHERE handle = ?", (handle,)).fetchone()[0]
+
+    # --- Yazma anahtarı ---
+    def create_profile(self, handle, rotate=False):
+        """
+        Profili oluşturur ve yeni bir yazma anahtarı üretir (depoya sadece hash'i yazılır).
+        Profil zaten varsa rotate=True olmadıkça anahtar üretilmez; rotate=True eski anahtarı geçersiz kılar.
+
+        Returns:
+            str: Anahtar (sadece bu çağrıda görülebilir); profil zaten varsa None.
+        """
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+
+        def write(conn):
+            if not rotate and conn.execute("SELECT 1 FROM user_profiles WHERE handle = ?", (handle,)).fetchone():
+                return None
+            conn.execute("INSERT INTO user_profiles (handle, revision, created_at, updated_at, token_hash)"
+                         " VALUES (?, 0, ?, ?, ?) ON CONFLICT(handle) DO UPDATE SET token_hash = excluded.token_hash",
+                         (handle, now, now, _token_hash(token)))
+            return token
+        return self._write(write)
+
+    def check_token(self, handle, token):
+        """token profilin yazma anahtarı mı? Profil yoksa veya anahtarı yoksa False."""
+        if not token:
+            return False
+        row = self._connection().execute("SELECT token_hash FROM user_profiles WHERE handle = ?", (handle,)).fetchone()
+        return row is not None and row[0] is not None and hmac.compare_digest(row[0], _token_hash(token))
+
+    # --- Yazma ---
+    def add_ratings(self, handle, ratings, timestamp=None):
+        """
+        Puanları profile ekler (aynı filme verilmiş önceki puanın yerine geçer) ve olay kaydına yazar.
+
+        Args:
+            handle (str): Kullanıcı tanıtıcısı.
+            ratings: {movieId: puan} sözlüğü veya (movieId, puan[, zaman damgası]) listesi.
+            timestamp (float): Zaman damgası olmayan puanlar için (varsayılan: şimdi).
+
+        Returns:
+            dict: Yeni revizyon ve değişen puan sayısı.
+        """
+        now = time.time()
+        items = ratings.items() if isinstance(ratings, dict) else ratings
+        rows = {}
+        for item in items:
+            movie_id, rating = int(item[0]), float(item[1])
+            rows[movie_id] = (rating, float(item[2]) if len(item) > 2 and item[2] is not None else timestamp or now)
+
+        def write(conn):
+            previous = dict(conn.execute("SELECT movie_id, rating FROM user_ratings WHERE handle = ?",
+                                         (handle,)).fetchall())
+            changed = {m: v for m, v in rows.items() if previous.get(m) != v[0]}
+            if not changed:
+                row = conn.execute("SELECT revision FROM user_profiles WHERE handle = ?", (handle,)).fetchone()
+                return {'revision': row[0] if row else 0, 'changed': 0}
+            revision = self._bump_revision(conn, handle, now)
+            conn.executemany("INSERT OR REPLACE INTO user_ratings (handle, movie_id, rating, timestamp)"
+                             " VALUES (?, ?, ?, ?)", [(handle, m, r, t) for m, (r, t) in changed.items()])
+            conn.executemany("INSERT INTO user_rating_events (handle, revision, movie_id, rating, previous_rating,"
+                             " timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                             [(handle, revision, m, r, previous.get(m), t) for m, (r, t) in changed.items()])
+            return {'revision': revision, 'changed': len(changed)}
+        return self._write(write)
+
+    def add_favorites(self, handle, movie_ids):
+        """Filmleri favorilere ekler (zaten favori olanlar değişmez). Eklenen sayıyı döndürür."""
+        now = time.time()
+
+        def write(conn):
+            conn.execute("INSERT INTO user_profiles (handle, revision, created_at, updated_at) VALUES (?, 0, ?, ?)"
+                         " ON CONFLICT(handle) DO UPDATE SET updated_at = excluded.updated_at", (handle, now, now))
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO user_favorites (handle, movie_id, added_at) VALUES (?, ?, ?)",
+                             [(handle, int(movie_id), now) for movie_id in movie_ids])
+            return conn.total_changes - before
+        return self._write(write)
+
+    def remove_favorite(self, handle, movie_id):
+        """Filmi favorilerden çıkarır; favori değilse False."""
+        return self._write(lambda conn: conn.execute(
+            "DELETE FROM user_favorites WHERE handle = ? AND movie_id = ?", (handle, int(movie_id))).rowcount > 0)
+
+    # --- Okuma ---
+    def exists(self, handle):
+        return self._connection().execute(
+            "SELECT 1 FROM user_profiles WHERE handle = ?", (handle,)).fetchone() is not None
+
+    def revision(self, handle):
+        """Profilin güncel revizyonu; profil yoksa None."""
+        row = self._connection().execute("SELECT revision FROM user_profiles WHERE handle = ?", (handle,)).fetchone()
+        return None if row is None else row[0]
+
+    def get_ratings(self, handle):
+        """{movieId: puan} sözlüğü."""
+        return dict(self._connection().execute(
+            "SELECT movie_id, rating FROM user_ratings WHERE handle = ?", (handle,)).fetchall())
+
+    def get_favorites(self, handle):
+        """Favori movieId'leri (eklenme sırasıyla)."""
+        return [row[0] for row in self._connection().execute(
+            "SELECT movie_id FROM user_favorites WHERE handle = ? ORDER BY added_at, movie_id", (handle,))]
+
+    def get_profile(self, handle):
+        """Profilin tamamı (puanlar zaman damgalarıyla, favoriler, revizyon); profil yoksa None."""
+        conn = self._connection()
+        row = conn.execute("SELECT revision, created_at, updated_at FROM user_profiles WHERE handle = ?",
+                           (handle,)).fetchone()
+        if row is None:
+            return None
+        ratings = [{'movie_id': movie_id, 'rating': rating, 'timestamp': timestamp}
+                   for movie_id, rating, timestamp in conn.execute(
+                       "SELECT movie_id, rating, timestamp FROM user_ratings WHERE handle = ? ORDER BY timestamp, movie_id",
+                       (handle,))]
+        return {'handle': handle, 'revision': row[0], 'created_at': row[1], 'updated_at': row[2],
+                'ratings': ratings, 'favorites': self.get_favorites(handle)}
+
+    # --- Kullanıcı vektörü ---
+    def _cached_vector(self, handle, model_version):
+        row = self._connection().execute(
+            "SELECT revision, vector FROM user_vectors WHERE handle = ? AND model_version = ?",
+            (handle, model_version)).fetchone()
+        return None if row is None else (row[0], np.frombuffer(row[1], dtype=np.float64).copy())
+
+    def _store_vector(self, handle, model_version, revision, vector):
+        # Sadece daha yeni revizyon yazılır (eşzamanlı isteklerden eskisi yenisinin üzerine yazmasın)
+        self._write(lambda conn: conn.execute(
+            "INSERT INTO user_vectors (handle, model_version, revision, vector, updated_at) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(handle, model_version) DO UPDATE SET revision = excluded.revision,"
+            " vector = excluded.vector, updated_at = excluded.updated_at WHERE excluded.revision > user_vectors.revision",
+            (handle, model_version, revision, np.asarray(vector, dtype=np.float64).tobytes(), time.time())))
+
+    def user_vector(self, handle, model):
+        """
+        Profilin model uzayındaki vektörü (models/fold_in.py projeksiyonu ile). Önbellekteki vektör güncel
+        revizyondaysa doğrudan, SVD modellerinde eski revizyondaysa sonraki olayların puan farkları eklenerek
+        (artımlı) döndürülür; aksi halde tüm puanlardan yeniden hesaplanıp saklanır.
+
+        Returns:
+            np.ndarray veya None (profil yoksa veya modeldeki filmlere hiç puan yoksa).
+        """
+        revision = self.revision(handle)
+        if revision is None:
+            return None
+        cached = self._cached_vector(handle, model.model_version)
+        if cached is not None and cached[0] == revision:
+            with self._lock:
+                self.stats['vector_hits'] += 1
+            return cached[1]
+
+        buffer = model.fold_ins
+        if cached is not None and buffer.linear:
+            events = self._connection().execute(
+                "SELECT movie_id, rating - COALESCE(previous_rating, 0) FROM user_rating_events"
+                " WHERE handle = ? AND revision > ? AND revision <= ?", (handle, cached[0], revision)).fetchall()
+            movie_ids = np.fromiter((m for m, _ in events), dtype=np.int64, count=len(events))
+            deltas = np.fromiter((d for _, d in events), dtype=np.float64, count=len(events))
+            item_indices = model.movie_map.lookup(movie_ids)
+            known = item_indices >= 0
+            vector = cached[1] + buffer.project_user(item_indices[known], deltas[known])
+            counter = 'vector_incremental'
+        else:
+            ratings = self.get_ratings(handle)
+            movie_ids = np.fromiter(ratings, dtype=np.int64, count=len(ratings))
+            item_indices = model.movie_map.lookup(movie_ids)
+            known = item_indices >= 0
+            if not known.any():
+                return None
+            order = np.argsort(item_indices[known])
+            values = np.fromiter(ratings.values(), dtype=np.float64, count=len(ratings))[known][order]
+            vector = buffer.project_user(item_indices[known][order], values).astype(np.float64)
+            counter = 'vector_recomputed'
+        self._store_vector(handle, model.model_version, revision, vector)
+        with self._lock:
+            self.stats[counter] += 1
+        return vector
+
+    # --- JSON dosyalarını aktarma ---
+    def import_user_data_dir(self, directory, once=False):
+        """
+        data/user_data altındaki user_<handle>_ratings.json ([{movie_id, rating, timestamp}]) ve
+        user_<handle>_favorites.json ([movieId, ...]) dosyalarını depoya aktarır.
+        once=True ise depo başına sadece bir kez yapılır (worker'lar aynı anda başlasa bile).
+
+        Returns:
+            int: Aktarılan dosya sayısı.
+        """
+        if once:
+            def claim(conn):
+                return conn.execute("INSERT OR IGNORE INTO user_store_meta (key, value) VALUES ('user_data_imported', ?)",
+                                    (str(time.time()),)).rowcount > 0
+            if not self._write(claim):
+                return 0
+        imported = 0
+        for path in sorted(glob.glob(os.path.join(directory, 'user_*.json'))):
+            match = USER_DATA_FILE_PATTERN.match(os.path.basename(path))
+            if not match:
+                continue
+            handle, kind = match.groups()
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+                if kind == 'ratings':
+                    self.add_ratings(handle, [(r['movie_id'], r['rating'], r.get('timestamp')) for r in data])
+                else:
+                    self.add_favorites(handle, data)
+                imported += 1
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning("Kullanıcı dosyası aktarılamadı (%s): %s", path, e)
+        return imported
+
+    def get_stats(self):
+        """Profil/puan sayıları ve vektör önbelleği sayaçları (sayaçlar bu süreç için)."""
+        conn = self._connection()
+        with self._lock:
+            stats = dict(self.stats)
+        for key, table in (('profiles', 'user_profiles'), ('ratings', 'user_ratings'),
+                           ('rating_events', 'user_rating_events'), ('favorites', 'user_favorites'),
+                           ('cached_vectors', 'user_vectors')):
+            stats[key] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        stats['db_path'] = self.db_path
+        return stats
+
+
+def _token_hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def valid_handle(handle):
+    """Tanıtıcı boş olmayan, en fazla MAX_HANDLE_LENGTH karakterlik harf/rakam/._- dizisi mi?"""
+    return bool(handle) and len(handle) <= MAX_HANDLE_LENGTH and re.fullmatch(r'[A-Za-z0-9._-]+', handle) is not None
+
+
+if __name__ == '__main__':
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="data/user_data JSON dosyalarını kullanıcı profil deposuna aktarır.")
+    parser.add_argument('command', choices=['import'])
+    parser.add_argument('directory', nargs='?', default=os.path.join(backend_dir, 'data', 'user_data'))
+    parser.add_argument('--db', default=os.path.join(backend_dir, 'data', 'user_profiles.sqlite3'))
+    args = parser.parse_args()
+    store = UserProfileStore(args.db)
+    count = store.import_user_data_dir(args.directory)
+    print(f"{count} dosya aktarıldı: {args.db}")
+    print(json.dumps(store.get_stats(), indent=2))